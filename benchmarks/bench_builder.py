@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of rebuilding vs updating the PuLP formulations of models 1-5
+
+For a sweep of inflow scenarios, compares building each model from scratch
+for every scenario with building it once and only updating its parameters,
+re-solving from scratch ("cold") or with the previous solution passed to CBC
+as a start ("warm"). Build, update and solve times are reported separately.
+
+Usage: python benchmarks/bench_builder.py [--scenarios N] [--years N] [--models model1 model4 ...]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from reservoir.formulations import build_model
+from reservoir.loaders import load_inputs
+from reservoir.timeaxis import TimeAxis
+
+# Scalar parameters of the example scripts
+SCALARS = {
+    "model1": dict(K=100000000, S0=50000000),
+    "model2": dict(K=100000000, S0=50000000),
+    "model3": dict(K=10000000, S0=5000000, S_min=1000000),
+    "model4": dict(K=60, S0=30, S_min=2),
+    "model5": dict(K=100000000, S0=50000000),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenarios", type=int, default=20)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--models", nargs="+", default=sorted(SCALARS))
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    axis = TimeAxis.years(args.years)
+    rng = np.random.default_rng(args.seed)
+    print(f"{args.scenarios} inflow scenarios, {axis.n_steps} monthly steps")
+    print("Model\tMethod\t\tBuild (s)\tUpdate (s)\tSolve (s)\tTotal (s)")
+
+    for name in args.models:
+        inputs = load_inputs(os.path.join(ROOT, "data", f"{name}.csv"), axis)
+        scenarios = [inputs["I"] * rng.uniform(0.8, 1.2, axis.n_steps) for _ in range(args.scenarios)]
+
+        # Rebuild the model for every scenario
+        build = solve = 0.0
+        for I in scenarios:
+            model = build_model(name, axis, **{**inputs, "I": I}, **SCALARS[name])
+            result = model.solve()
+            build += result.build_time
+            solve += result.solve_time
+        print(f"{name}\trebuild\t\t{build:.3f}\t\t-\t\t{solve:.3f}\t\t{build + solve:.3f}")
+
+        # Build once, update the inflows in place; re-solve from scratch or from the previous solution
+        for warm_start in (False, True):
+            model = build_model(name, axis, **inputs, **SCALARS[name])
+            build, update, solve = model.build_time, 0.0, 0.0
+            for I in scenarios:
+                start = time.perf_counter()
+                model.update(I=I)
+                update += time.perf_counter() - start
+                solve += model.solve(warm_start=warm_start).solve_time
+            method = "once, warm" if warm_start else "once, cold"
+            print(f"{name}\t{method}\t{build:.3f}\t\t{update:.3f}\t\t{solve:.3f}\t\t{build + update + solve:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the joint network formulations (models 4 and 5)
+
+Builds a binary tree of reservoirs, each with the example inputs of the model
+repeated over the horizon and randomly scaled inflows (scaled up for model 5,
+so that its fixed releases and environmental flows are feasible over
+decades), routes half of each reservoir's spills and hydropower releases to
+each child, and reports the build and solve times of the joint program, and
+then the time of an in-place update of all the inflows (NetworkProgram.update,
+not solved). Fails if a joint program is not solved to optimality.
+
+Usage: python benchmarks/bench_joint.py [--reservoirs N] [--years N] [--models model4 model5]
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from reservoir.joint import assemble_network
+from reservoir.loaders import load_inputs
+from reservoir.network import Network
+from reservoir.timeaxis import TimeAxis
+
+# Scalar parameters of the example scripts, and the range of the inflow scaling
+SCALARS = {
+    "model4": dict(K=60, S0=30, S_min=2),
+    "model5": dict(K=100000000, S0=50000000, S_min=0),
+}
+INFLOW_SCALING = {"model4": (1.0, 1.3), "model5": (3.8, 4.2)}
+
+
+def build_network(name, axis, n_reservoirs, rng):
+    inputs = load_inputs(os.path.join(ROOT, "data", f"{name}.csv"), axis)
+    network = Network()
+    for j in range(n_reservoirs):
+        series = dict(inputs, I=inputs["I"] * rng.uniform(*INFLOW_SCALING[name], axis.n_steps))
+        network.add_reservoir(f"reservoir_{j}", **SCALARS[name], **series, return_flows=(0, 0, 1))
+    for j in range(1, n_reservoirs):
+        network.connect(f"reservoir_{(j - 1) // 2}", f"reservoir_{j}", 0.5)
+    return network
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--reservoirs", type=int, default=50)
+    parser.add_argument("--years", type=int, default=50)
+    parser.add_argument("--models", nargs="+", default=["model4", "model5"])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    axis = TimeAxis.years(args.years)
+    print(f"{args.reservoirs} reservoirs, {axis.n_steps} monthly steps")
+    print("Model\tVariables\tRows\t\tBuild (s)\tUpdate (s)\tSolve (s)\tStatus\t\tObjective")
+    for name in args.models:
+        network = build_network(name, axis, args.reservoirs, np.random.default_rng(args.seed))
+        lp = assemble_network(name, network, axis.n_steps)
+        build_time = lp.build_time
+        result = lp.solve()
+        lp.update(I=[p["I"] * 0.95 for p in network.params])  # Timed only: the drier inflows may be infeasible
+        n_rows = lp.A_ub.shape[0] + lp.A_eq.shape[0]
+        print(f"{name}\t{lp.n_vars}\t\t{n_rows}\t\t{build_time:.3f}\t\t{lp.build_time:.4f}\t\t{result.solve_time:.3f}\t\t"
+              f"{result.status}\t\t{result.objective}")
+        if result.status != "Optimal":
+            raise AssertionError(f"the joint {name} program is {result.status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the priority-cascade kernel against the reference dict loop
+
+Runs the loop of simulation.py (dicts keyed by month), the vectorized
+NumPy engine and the compiled kernel on the same random inputs, checks that
+they agree and reports reservoir-months per second.
+
+Usage: python benchmarks/bench_kernel.py [--scenarios N] [--steps N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from reservoir.engine import simulate_batch
+from reservoir.kernel import HAVE_NUMBA, simulate_compiled
+
+
+def reference_loop(I, O, D_u, D_irr, D_hydro, K, S0, S_min):
+    # The simulation loop of simulation.py, unchanged
+    months = range(1, len(I) + 1)
+    S, R_u, R_irr, R_hydro, Spills = {}, {}, {}, {}, {}
+    for t in months:
+        if t == 1:
+            S[t] = S0 + I[t] - O[t]
+        else:
+            S[t] = S[t - 1] + I[t] - O[t]
+        R_u[t] = min(S[t], D_u[t])
+        S[t] -= R_u[t]
+        R_irr[t] = min(S[t], D_irr[t])
+        S[t] -= R_irr[t]
+        R_hydro[t] = min(S[t], D_hydro[t])
+        S[t] -= R_hydro[t]
+        Spills[t] = max(0, S[t] - K)
+        S[t] = min(max(S_min, S[t]), K)
+    return S, R_u, R_irr, R_hydro, Spills
+
+
+def timed(func, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenarios", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=720)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # Random inputs in the range of the simulation.py example (million m³)
+    rng = np.random.default_rng(args.seed)
+    shape = (args.scenarios, args.steps)
+    I = rng.uniform(15, 90, shape)
+    O = np.full(shape, 10.0)
+    D_u = rng.uniform(5, 9, shape)
+    D_irr = rng.uniform(10, 35, shape)
+    D_hydro = rng.uniform(10, 15, shape)
+    K, S0, S_min = 80.0, 30.0, 15.0
+    n_cells = args.scenarios * args.steps
+
+    # Reference: one dict loop per scenario
+    def run_reference():
+        out = []
+        for i in range(args.scenarios):
+            as_dict = [dict(enumerate(a[i].tolist(), start=1)) for a in (I, O, D_u, D_irr, D_hydro)]
+            out.append(reference_loop(*as_dict, K, S0, S_min))
+        return out
+
+    rows = [("reference dict loop", run_reference),
+            ("numpy engine", lambda: simulate_batch(I, O, D_u, D_irr, D_hydro, K, S0, S_min)),
+            ("python kernel", lambda: simulate_compiled(I, O, D_u, D_irr, D_hydro, K, S0, S_min,
+                                                        use_numba=False))]
+    if HAVE_NUMBA:
+        simulate_compiled(I[:1, :2], O[:1, :2], D_u[:1, :2], D_irr[:1, :2], D_hydro[:1, :2],
+                          K, S0, S_min)  # compile outside the timing
+        rows.append(("numba kernel", lambda: simulate_compiled(I, O, D_u, D_irr, D_hydro,
+                                                               K, S0, S_min)))
+    else:
+        print("numba is not installed - skipping the compiled kernel")
+
+    results = {}
+    print(f"{args.scenarios} scenarios x {args.steps} steps")
+    print("Method\t\t\tTime (s)\tReservoir-months/s")
+    for name, func in rows:
+        seconds, results[name] = timed(func)
+        print(f"{name:<20}\t{seconds:.4f}\t\t{n_cells / seconds:,.0f}")
+
+    # All methods must agree with the reference loop
+    reference_S = np.array([[S[t] for t in sorted(S)] for S, *_ in results["reference dict loop"]])
+    for name, result in results.items():
+        if name != "reference dict loop":
+            assert np.array_equal(result.S, reference_S), f"{name} differs from the reference loop"
+    print("All methods agree with the reference loop.")
+
+
+if __name__ == "__main__":
+    main()
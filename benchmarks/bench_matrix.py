@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the PuLP builders vs the sparse matrix assembly of models 1-5
+
+For each model and horizon, times building the PuLP problem, assembling the
+same problem as sparse arrays (reservoir.matrix), and solving both; checks
+that the two give the same status and objective value.
+
+Usage: python benchmarks/bench_matrix.py [--years 1 10 100] [--models model1 model4 ...]
+"""
+
+import argparse
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from reservoir.formulations import build_model
+from reservoir.loaders import load_inputs
+from reservoir.matrix import assemble
+from reservoir.timeaxis import TimeAxis
+
+# Scalar parameters of the example scripts
+SCALARS = {
+    "model1": dict(K=100000000, S0=50000000),
+    "model2": dict(K=100000000, S0=50000000),
+    "model3": dict(K=10000000, S0=5000000, S_min=1000000),
+    "model4": dict(K=60, S0=30, S_min=2),
+    "model5": dict(K=100000000, S0=50000000),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--models", nargs="+", default=sorted(SCALARS))
+    args = parser.parse_args()
+
+    print("Model\tYears\tPuLP build (s)\tMatrix build (s)\tPuLP solve (s)\tHiGHS solve (s)\tStatus\t\tObjective")
+    for name in args.models:
+        for years in args.years:
+            axis = TimeAxis.years(years)
+            inputs = load_inputs(os.path.join(ROOT, "data", f"{name}.csv"), axis)
+            a = build_model(name, axis, **inputs, **SCALARS[name]).solve()
+            b = assemble(name, axis, **inputs, **SCALARS[name]).solve()
+            if a.status != b.status or (a.objective is not None
+                                        and abs(a.objective - b.objective) > 1e-6 * max(1.0, abs(a.objective))):
+                raise AssertionError(f"{name}, {years} years: PuLP {a.status} {a.objective}, "
+                                     f"matrix {b.status} {b.objective}")
+            print(f"{name}\t{years}\t{a.build_time:.4f}\t\t{b.build_time:.4f}\t\t\t"
+                  f"{a.solve_time:.4f}\t\t{b.solve_time:.4f}\t\t{a.status}\t\t{a.objective}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the streaming output of ensemble simulations
+
+Simulates synthetic inflow traces chunk by chunk, writes every trajectory to
+compressed files and accumulates per-month percentiles and failure counts,
+then reports the throughput, the size on disk and the peak memory, which
+depends on the chunk size rather than on the number of traces. Finally checks
+the streamed percentiles against np.percentile on a small ensemble whose
+first chunk is too dry to spill.
+
+Usage: python benchmarks/bench_output.py [--traces N] [--years N] [--format npz|parquet|zarr] [--out PATH]
+"""
+
+import argparse
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from reservoir.engine import simulate_batch
+from reservoir.ensemble import LognormalInflows
+from reservoir.loaders import load_inputs
+from reservoir.output import TrajectoryStats, TrajectoryWriter, stream
+from reservoir.timeaxis import TimeAxis
+
+# Scalar parameters of simulation.py
+SCALARS = dict(K=80, S0=30, S_min=15)
+
+
+def size_on_disk(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+
+def check_percentiles(inputs, inflows, rng, n_steps, chunk_size=200, q=(5, 25, 50, 75, 95)):
+    # A dry first chunk (no spills, so its Spills range is (0, 1)), then wet ones: the ranges must
+    # grow instead of clipping the later chunks
+    results = []
+    for scale in (0.2, 1.0, 3.0):
+        I = scale * inflows.sample(rng, chunk_size, n_steps)
+        results.append(simulate_batch(I, inputs["O"], inputs["D_u"], inputs["D_irr"], inputs["D_hydro"], **SCALARS))
+    stats = stream(enumerate(results), stats=TrajectoryStats(n_steps))
+    print("\nVariable\tRange\t\t\tMax percentile error\tBin width")
+    for name in ("S", "Spills"):
+        # The histogram locates the order statistic itself, as the inverted-CDF percentile does
+        values = np.concatenate([getattr(r, name) for r in results])
+        exact = np.percentile(values, q, axis=0, method="inverted_cdf")
+        low, high = stats.bounds[name]
+        width = (high - low) / stats.n_bins
+        error = np.abs(stats.percentiles(name, q) - exact).max()
+        print(f"{name}\t\t({low:.1f}, {high:.1f})\t\t{error:.3f}\t\t\t{width:.3f}")
+        if error > 2 * width:
+            raise AssertionError(f"streamed percentiles of {name} are off by {error:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--traces", type=int, default=20000)
+    parser.add_argument("--years", type=int, default=50)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--format", choices=("npz", "parquet", "zarr"), default="npz")
+    parser.add_argument("--out", help="output path (default: a temporary directory, removed afterwards)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    axis = TimeAxis.years(args.years)
+    inputs = load_inputs(os.path.join(ROOT, "data", "simulation.csv"), axis)
+    rng = np.random.default_rng(args.seed)
+    monthly = inputs["I"][:12]
+    inflows = LognormalInflows(np.log(monthly), np.full(12, 0.3))
+    demands = {"R_u": inputs["D_u"], "R_irr": inputs["D_irr"], "R_hydro": inputs["D_hydro"]}
+
+    def chunks():
+        # Inflows are generated chunk by chunk too, so nothing scales with the number of traces
+        for start in range(0, args.traces, args.chunk_size):
+            n = min(args.chunk_size, args.traces - start)
+            I = inflows.sample(rng, n, axis.n_steps)
+            yield start, simulate_batch(I, inputs["O"], inputs["D_u"], inputs["D_irr"], inputs["D_hydro"], **SCALARS)
+
+    tmp = None if args.out else tempfile.mkdtemp()
+    path = args.out or os.path.join(tmp, {"npz": "trajectories", "parquet": "trajectories.parquet",
+                                          "zarr": "trajectories.zarr"}[args.format])
+    try:
+        start = time.perf_counter()
+        stats = TrajectoryStats(axis.n_steps, bounds={"S": (SCALARS["S_min"], SCALARS["K"])}, demands=demands)
+        with TrajectoryWriter(path, axis.n_steps, format=args.format, n_traces=args.traces,
+                              chunk_size=args.chunk_size) as writer:
+            stream(chunks(), writer, stats)
+        elapsed = time.perf_counter() - start
+        raw = 5 * 8 * args.traces * axis.n_steps
+
+        print(f"{args.traces} traces x {axis.n_steps} months, {args.format}, chunks of {args.chunk_size}")
+        print(f"Time: {elapsed:.2f} s ({args.traces * axis.n_steps / elapsed / 1e6:.1f} M trace-months/s)")
+        print(f"On disk: {size_on_disk(path) / 1e6:.1f} MB (raw {raw / 1e6:.1f} MB)")
+        print(f"Peak memory: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+        p5, p50, p95 = stats.percentiles("S", [5, 50, 95])
+        print("Month\tS p5\tS p50\tS p95\tIrrigation failures")
+        for t in range(12):
+            print(f"{t + 1}\t{p5[t]:.2f}\t{p50[t]:.2f}\t{p95[t]:.2f}\t{stats.failures['R_irr'][t]}")
+        check_percentiles(inputs, inflows, rng, axis.n_steps)
+    finally:
+        if tmp:
+            shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
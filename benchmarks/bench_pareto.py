@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the Pareto front sweeps
+
+Assembles model 1 (every demand met; the water left is stored or released)
+once and maps the trade-off between storage, releases and net benefits with
+the epsilon-constraint and weighted-sum methods, in the calling process and
+over a process pool.
+
+Usage: python benchmarks/bench_pareto.py [--points N] [--workers N]
+"""
+
+import argparse
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from reservoir.loaders import load_inputs
+from reservoir.matrix import assemble
+from reservoir.pareto import METHODS, OBJECTIVES, pareto_front
+from reservoir.timeaxis import TimeAxis
+
+SCALARS = dict(K=100000000, S0=50000000)  # Capacity and initial storage of model 1 (m^3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--points", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (0: in-process)")
+    args = parser.parse_args()
+
+    axis = TimeAxis.years(1)
+    lp = assemble("model1", axis, **load_inputs(os.path.join(ROOT, "data", "model1.csv"), axis), **SCALARS)
+    print("Objectives\tMethod\tWorkers\tPoints\tSolved\tNon-dominated\tTime (s)")
+    for objectives in (OBJECTIVES[:2], OBJECTIVES):
+        for method in METHODS:
+            for workers in (0, args.workers):
+                front = pareto_front(lp, objectives, n_points=args.points, method=method, max_workers=workers)
+                print(f"{'/'.join(objectives)}\t{method}\t{workers}\t{front.n_points}\t{front.n_solved}\t"
+                      f"{len(front.values)}\t{front.solve_time:.2f}")
+    print("Payoff table (rows: objective maximized)\n" + "\t".join(OBJECTIVES))
+    for row in front.payoff:
+        print("\t".join(f"{v:.4g}" for v in row))
+
+
+if __name__ == "__main__":
+    main()
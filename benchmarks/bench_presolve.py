@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the feasibility pre-check of models 1-5
+
+Checks every formulation on the bundled data over several horizons and
+compares the verdict and time of the pre-check with a HiGHS solve, printing
+the conflict and its irreducible infeasible subset where there is one. Then
+sweeps the demands and capacity of model 5 with solve_batch, with and
+without the pre-check, and compares the statuses and run times.
+
+Usage: python benchmarks/bench_presolve.py [--years N ...] [--scenarios N] [--sweep-years N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from bench_matrix import SCALARS
+from reservoir.batch import solve_batch
+from reservoir.loaders import load_inputs
+from reservoir.matrix import assemble
+from reservoir.presolve import check_feasibility
+from reservoir.timeaxis import TimeAxis
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 100])
+    parser.add_argument("--models", nargs="+", default=sorted(SCALARS))
+    parser.add_argument("--scenarios", type=int, default=400, help="scenarios of the model 5 sweep")
+    parser.add_argument("--sweep-years", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print("Model\tYears\tCheck (us)\tFeasible\tSolve (s)\tStatus")
+    conflicts = []
+    for name in args.models:
+        for years in args.years:
+            axis = TimeAxis.years(years)
+            params = {**load_inputs(os.path.join(ROOT, "data", f"{name}.csv"), axis), **SCALARS[name]}
+            start = time.perf_counter()
+            for _ in range(args.repeats):
+                report = check_feasibility(name, axis, **params)
+            check_time = (time.perf_counter() - start) / args.repeats
+            result = assemble(name, axis, **params).solve()
+            print(f"{name}\t{years}\t{1e6 * check_time:.0f}\t\t{report.feasible}\t\t{result.solve_time:.4f}\t\t"
+                  f"{result.status}")
+            if not report.feasible and years == args.years[0]:
+                conflicts.append(check_feasibility(name, axis, iis=True, **params))
+    for report in conflicts:
+        print(f"\n{report.message}\nIIS: " + ", ".join(f"{group}_{t}" for group, t in report.iis))
+
+    # Model 5 sweep: demand scalings and capacities, part of them infeasible
+    rng = np.random.default_rng(args.seed)
+    axis = TimeAxis.years(args.sweep_years)
+    inputs = load_inputs(os.path.join(ROOT, "data", "model5.csv"), axis)
+    scale = rng.uniform(0.1, 0.5, args.scenarios)
+    scenarios = {key: scale[:, None] * inputs[key] for key in ("D_u", "D_irr", "D_hydro")}
+    scenarios["K"] = rng.uniform(0.05, 1.0, args.scenarios) * SCALARS["model5"]["K"]
+    base = {**inputs, **SCALARS["model5"]}
+    print(f"\nmodel5 sweep: {args.scenarios} scenarios x {len(axis)} months\n"
+          "Pre-check\tTime (s)\tOptimal\tInfeasible\tPer infeasible scenario (s)")
+    statuses = []
+    for precheck in (False, True):
+        start = time.perf_counter()
+        batch = solve_batch("model5", axis, scenarios, base=base, backend="matrix", max_workers=0,
+                            precheck=precheck)
+        elapsed = time.perf_counter() - start
+        infeasible = batch.status == "Infeasible"
+        per = np.mean(batch.build_time[infeasible] + batch.solve_time[infeasible]) if infeasible.any() else 0.0
+        print(f"{precheck}\t\t{elapsed:.2f}\t\t{batch.ok.sum()}\t{infeasible.sum()}\t\t{per:.2e}")
+        statuses.append(batch.status)
+    if not np.array_equal(statuses[0], statuses[1]):
+        raise AssertionError("the pre-check changed the status of some scenarios")
+
+
+if __name__ == "__main__":
+    main()
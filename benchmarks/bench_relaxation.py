@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark and equivalence check of the LP forms of models 3 and 5
+
+Solves models 3 and 5 (MIPs) and their LP reformulations, model3_lp and
+model5_lp (continuous shortages with tiered / per-unit penalties), as PuLP
+problems (CBC) and as sparse programs (HiGHS). On the bundled data, the LP
+solution is mapped back to the MIP variables (a binary is on where the
+shortage is not used, for model 3, or where it is, for model 5) and checked
+for feasibility and objective against the MIP optimum. Then both are timed
+on longer horizons, with the demands of model 5 scaled so that it stays
+feasible.
+
+Usage: python benchmarks/bench_relaxation.py [--years N ...] [--demand-scale X]
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from bench_matrix import SCALARS
+from reservoir.formulations import build_model
+from reservoir.loaders import load_inputs
+from reservoir.matrix import assemble
+from reservoir.parameters import RELAXATIONS
+from reservoir.timeaxis import TimeAxis
+
+TOL = 1e-6
+
+
+def mip_point(mip, values):
+    """The MIP solution vector implied by the values of an LP reformulation."""
+    values = dict(values)
+    if mip.name == "model3":
+        for binary, shortage in (("Urban_Priority", "Short_u"), ("Agricultural_Priority", "Short_irr"),
+                                 ("Hydropower_Priority", "Short_hydro")):
+            values[binary] = (values[shortage] <= TOL).astype(np.float64)
+    else:
+        values["EF_violation"] = (values["EF_shortage"] > TOL).astype(np.float64)
+    return np.concatenate([values[name] for name in mip.blocks])
+
+
+def check(mip, relaxed):
+    """(feasible, objective) of the LP solution in the MIP; None if the LP has no solution."""
+    if relaxed.status != "Optimal":
+        return None
+    x = mip_point(mip, relaxed.values)
+    scale = 1.0 + np.abs(np.concatenate([mip.b_ub, mip.b_eq]))
+    residual = np.concatenate([np.maximum(mip.A_ub @ x - mip.b_ub, 0.0), np.abs(mip.A_eq @ x - mip.b_eq)])
+    return bool(np.all(residual <= TOL * scale[:len(residual)])), float(mip.c @ x + mip.c0)
+
+
+def cases(axis, demand_scale=1.0):
+    # (label, formulation, parameters): the bundled data, plus a feasible model 3 variant
+    # (its pinned storage leaves no water for irrigation and hydropower)
+    for name in RELAXATIONS:
+        inputs = load_inputs(os.path.join(ROOT, "data", f"{name}.csv"), axis)
+        params = {**inputs, **SCALARS[name]}
+        for key in ("D_u", "D_irr", "D_hydro"):
+            params[key] = demand_scale * params[key]
+        if name == "model3":
+            yield "bundled", name, params
+            yield "urban only", name, dict(params, D_irr=0 * params["D_irr"], D_hydro=0 * params["D_hydro"])
+        else:
+            yield "bundled", name, params
+
+
+def fmt(value):
+    return "-" if value is None else f"{value:.10g}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--years", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--demand-scale", type=float, default=0.2, help="demand scaling for the timed horizons")
+    args = parser.parse_args()
+
+    print("Equivalence on the bundled data (1 year)")
+    print("Case\t\tModel\tForm\tMIP status\tLP status\tMIP objective\tLP objective\tLP point in MIP\tSame optimum")
+    axis = TimeAxis.years(1)
+    for label, name, params in cases(axis):
+        for form, build in (("pulp", build_model), ("matrix", assemble)):
+            mip = build(name, axis, **params).solve()
+            relaxed = build(RELAXATIONS[name], axis, **params).solve()
+            checked = check(assemble(name, axis, **params), relaxed)
+            if checked is None:
+                same = mip.status == relaxed.status
+                point = "-"
+            else:
+                feasible, objective = checked
+                same = mip.status == "Optimal" and feasible and abs(objective - mip.objective) <= TOL * (
+                    1 + abs(mip.objective))
+                point = f"{'feasible' if feasible else 'infeasible'}, {objective:.10g}"
+            print(f"{label:<12}\t{name}\t{form}\t{mip.status:<10}\t{relaxed.status:<10}\t{fmt(mip.objective)}\t"
+                  f"{fmt(relaxed.objective)}\t{point}\t{'yes' if same else 'NO'}")
+
+    print(f"\nSolve times (demands x {args.demand_scale})")
+    print("Case\t\tModel\tYears\tForm\tMIP (s)\t\tLP (s)\t\tMIP objective\tLP objective")
+    for years in args.years:
+        axis = TimeAxis.years(years)
+        for label, name, params in cases(axis, args.demand_scale):
+            for form, build in (("pulp", build_model), ("matrix", assemble)):
+                mip = build(name, axis, **params).solve()
+                relaxed = build(RELAXATIONS[name], axis, **params).solve()
+                print(f"{label:<12}\t{name}\t{years}\t{form}\t{mip.solve_time:.4f}\t\t{relaxed.solve_time:.4f}\t\t"
+                      f"{fmt(mip.objective)}\t{fmt(relaxed.objective)}")
+
+
+if __name__ == "__main__":
+    main()
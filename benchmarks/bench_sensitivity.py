@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the global sensitivity analysis of simulation.py
+
+Samples the hand-edited constants of simulation.py (reservoir parameters,
+unit values and costs, spill shares) and an inflow multiplier, evaluates
+the samples with the batched water balance over a process pool, and prints
+the sensitivity indices of the net benefits and of the irrigation
+reliability, with the evaluation rate.
+
+Usage: python benchmarks/bench_sensitivity.py [--samples N] [--method lhs|sobol|morris] [--workers N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from reservoir.loaders import load_inputs
+from reservoir.sensitivity import METHODS, run_sensitivity
+from reservoir.timeaxis import TimeAxis
+
+# Scalar parameters of simulation.py (its economics are the default of simulate_samples)
+SCALARS = dict(K=80, S0=30, S_min=15)
+RANGES = {
+    "K": (40, 120),
+    "S_min": (5, 25),
+    "Economic_Value_Water": (0.5, 1.5),
+    "Crop_Sales": (2.0, 3.0),
+    "Price_Electricity": (0.10, 0.20),
+    "Spill_Share_Urban": (0.1, 0.3),
+    "Spill_Share_Irrigation": (0.3, 0.7),
+    "Spill_Share_Hydropower": (0.1, 0.5),
+    "I_scale": (0.6, 1.2),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--samples", type=int, default=2 ** 16,
+                        help="samples (lhs), base samples (sobol, a power of 2) or trajectories (morris)")
+    parser.add_argument("--method", choices=METHODS, default="sobol")
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (0: in-process)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    axis = TimeAxis.years(args.years)
+    inputs = load_inputs(os.path.join(ROOT, "data", "simulation.csv"), axis)
+    base = dict(inputs, **SCALARS)
+
+    start = time.perf_counter()
+    result = run_sensitivity(RANGES, args.samples, base, method=args.method, seed=args.seed,
+                             max_workers=args.workers)
+    elapsed = time.perf_counter() - start
+    n = len(result.samples)
+    print(f"{args.method}: {n} evaluations x {axis.n_steps} months in {elapsed:.2f} s ({n / elapsed:,.0f} samples/s)")
+
+    for output in ("net_benefits", "reliability_irrigation"):
+        indices = result.indices[output]
+        print(f"\n{output}\nParameter\t\t" + "\t".join(indices))
+        for j, name in enumerate(result.names):
+            print(f"{name:<24}" + "\t".join(f"{values[j]:.3f}" for values in indices.values()))
+
+
+if __name__ == "__main__":
+    main()
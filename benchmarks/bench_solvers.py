@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the solver backends
+
+Solves models 1-5, as PuLP problems (formulations.py) and as sparse
+LinearPrograms (matrix.py), with every backend of reservoir.solvers and
+prints the build and solve times, iterations and status of each, to pick the
+fastest backend per formulation. Backends that are not installed are listed
+with the status "Error".
+
+Usage: python benchmarks/bench_solvers.py [--years N ...] [--models model1 ...] [--time-limit S]
+"""
+
+import argparse
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from bench_matrix import SCALARS
+from reservoir.formulations import build_model
+from reservoir.loaders import load_inputs
+from reservoir.matrix import assemble
+from reservoir.solvers import BACKENDS, compare_backends
+from reservoir.timeaxis import TimeAxis
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--models", nargs="+", default=sorted(SCALARS))
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS))
+    parser.add_argument("--time-limit", type=float, default=60.0)
+    args = parser.parse_args()
+
+    print("Model\tYears\tForm\tBackend\tBuild (s)\tSolve (s)\tIterations\tNodes\tStatus\t\tObjective")
+    for name in args.models:
+        for years in args.years:
+            axis = TimeAxis.years(years)
+            inputs = load_inputs(os.path.join(ROOT, "data", f"{name}.csv"), axis)
+            for form, build in (("pulp", build_model), ("matrix", assemble)):
+                model = build(name, axis, **inputs, **SCALARS[name])
+                for r in compare_backends(model, args.backends, time_limit=args.time_limit):
+                    objective = "-" if r["objective"] is None else f"{r['objective']:.6g}"
+                    print(f"{name}\t{years}\t{form}\t{r['backend']}\t{r['build_time']:.4f}\t\t{r['solve_time']:.4f}"
+                          f"\t\t{r['iterations']}\t\t{r['nodes']}\t{r['status']:<12}\t{objective}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,96 +5,136 @@ Created on Oct 2023
 @author: Angelos Alamanos
 """
 
-# Change to your path 
+# Import necessary libraries
 import os
-os.chdir("D:/your/path/...")
-
+import time
 
-# Import necessary libraries
+import numpy as np
 import pulp
-import matplotlib.pyplot as plt
 
-# Define the variables
-months = range(1, 13)
+from reservoir.loaders import load_inputs
+from reservoir.results import SolveResult
+from reservoir.solvers import solve_problem
+from reservoir.timeaxis import TimeAxis
+
+# Input time series: one column per series, with 12 rows (January-December) or one row per month
+# (example values - insert data in data/model1.csv; .parquet and .npy files are read the same way)
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "model1.csv")
 
-# Reservoir variables (example values - insert data)
-S = pulp.LpVariable.dicts("Storage", months, lowBound=0, cat='Continuous')
+# Reservoir parameters (example values - insert data)
 K = 100000000  # Reservoir capacity (m^3)
 S0 = 50000000  # Initial storage (m^3)
 
-# Inflows  (example values - insert data)
-I_values = [3000000, 2900000, 2700000, 2600000, 2200000, 2000000, 150000, 900000, 1500000, 1800000, 2000000, 2500000]
-I = {t: I_values[t-1] for t in months}
 
-# Outflows (example values - insert data)
-O_values = [250000, 250000, 250000, 500000, 500000, 500000, 500000, 500000, 500000, 250000, 250000, 250000]
-O = {t: O_values[t-1] for t in months}
+def solve_model1(axis, I, O, D_u, D_irr, D_hydro, K=K, S0=S0, solver="cbc"):
+    """Maximize the total storage with all demands met, and return a SolveResult.
 
-# Releases for urban, agricultural, and hydropower
-R_u = pulp.LpVariable.dicts("Release_Urban", months, lowBound=0, cat='Continuous')
-R_irr = pulp.LpVariable.dicts("Release_Agricultural", months, lowBound=0, cat='Continuous')
-R_hydro = pulp.LpVariable.dicts("Release_Hydropower", months, lowBound=0, cat='Continuous')
+    Inflows I, outflows O and the demands for urban, agricultural and
+    hydropower use hold one value per time step. solver is a backend of
+    reservoir.solvers ("cbc", the default, "highs" or "scipy"; the solver log
+    is kept in the result) or a PuLP solver object.
+    """
+    start = time.perf_counter()
+    months = axis.steps
 
-# Demand values for urban, agricultural, and hydropower (example values - insert data)
-D_u_values = [1100000, 1100000, 1100000, 1200000, 1500000, 1700000, 1800000, 1700000, 1200000, 1100000, 1100000, 1100000]
-D_irr_values = [1500000, 1500000, 2000000, 3000000, 5000000, 5500000, 5800000, 6000000, 4500000, 1500000, 1500000, 1500000]
-D_hydro_values = [900000, 900000, 900000, 900000, 900000, 900000, 900000, 900000, 900000, 900000, 900000, 900000]
+    # Storage and releases for urban, agricultural, and hydropower
+    S = pulp.LpVariable.dicts("Storage", months, lowBound=0, cat='Continuous')
+    R_u = pulp.LpVariable.dicts("Release_Urban", months, lowBound=0, cat='Continuous')
+    R_irr = pulp.LpVariable.dicts("Release_Agricultural", months, lowBound=0, cat='Continuous')
+    R_hydro = pulp.LpVariable.dicts("Release_Hydropower", months, lowBound=0, cat='Continuous')
 
-D_u = {t: D_u_values[t-1] for t in months}
-D_irr = {t: D_irr_values[t-1] for t in months}
-D_hydro = {t: D_hydro_values[t-1] for t in months}
+    # Initialize the optimization model
+    model = pulp.LpProblem("Reservoir_Optimization", pulp.LpMaximize)
 
-# Initialize the optimization model
-model = pulp.LpProblem("Reservoir_Optimization", pulp.LpMaximize)
+    # Define the objective function to maximize total storage
+    model += pulp.lpSum([S[t] for t in months])
 
-# Define the objective function to maximize total storage
-model += pulp.lpSum([S[t] for t in months])
-
-# Add constraints
-for t in months:
-    if t == 1:
-        model += S[t] == S0 + I[t] - O[t] - R_u[t] - R_irr[t] - R_hydro[t]
-    else:
-        model += S[t] == S[t-1] + I[t] - O[t] - R_u[t] - R_irr[t] - R_hydro[t]
-    model += S[t] <= K  # Storage capacity constraint
-    model += R_u[t] >= D_u[t]  # Release constraints for urban
-    model += R_irr[t] >= D_irr[t]  # Release constraints for agriculture
-    model += R_hydro[t] >= D_hydro[t]  # Release constraints for hydropower
-
-# Solve the optimization problem
-model.solve()
-
-# Print the results
-if pulp.LpStatus[model.status] == "Optimal":
-    print("Optimal Solution Found:")
-    print(f"Objective Value (Total Storage): {pulp.value(model.objective)}")
-    print("Decision Variables:")
+    # Add constraints
     for t in months:
-        print(f"Month {t}:")
-        print(f"  Storage: {S[t].varValue}")
-        print(f"  Release - Urban: {R_u[t].varValue}")
-        print(f"  Release - Agricultural: {R_irr[t].varValue}")
-        print(f"  Release - Hydropower: {R_hydro[t].varValue}")
-else:
-    print("No feasible solution found. Check the parameters and constraints.")
-
-# Visualize the results using bar diagrams
-plt.figure(figsize=(12, 6))
-plt.subplot(2, 1, 1)
-plt.bar(months, [S[t].varValue for t in months], color='blue', label='Optimized Storage (m^3)')
-plt.xlabel('Month')
-plt.ylabel('Storage (m^3)')
-plt.title('Optimized Reservoir Storage Over Months')
-plt.grid(True)
-
-plt.subplot(2, 1, 2)
-plt.bar(months, [R_u[t].varValue for t in months], color='blue', label='Optimized Release - Urban (m^3)')
-plt.bar(months, [D_u[t] for t in months], color='red', alpha=0.5, label='Demand - Urban (m^3)')
-plt.xlabel('Month')
-plt.ylabel('Release (m^3)')
-plt.title('Optimized Releases - Urban vs. Demand')
-plt.legend()
-plt.grid(True)
-
-plt.tight_layout()
-plt.show()
+        if t == 0:
+            model += S[t] == S0 + I[t] - O[t] - R_u[t] - R_irr[t] - R_hydro[t]
+        else:
+            model += S[t] == S[t-1] + I[t] - O[t] - R_u[t] - R_irr[t] - R_hydro[t]
+        model += S[t] <= K  # Storage capacity constraint
+        model += R_u[t] >= D_u[t]  # Release constraints for urban
+        model += R_irr[t] >= D_irr[t]  # Release constraints for agriculture
+        model += R_hydro[t] >= D_hydro[t]  # Release constraints for hydropower
+    build_time = time.perf_counter() - start
+
+    # Solve the optimization problem
+    start = time.perf_counter()
+    run = None
+    if isinstance(solver, str):
+        run = solve_problem(model, solver)  # "cbc", "highs" or "scipy", with the solver log captured
+    else:
+        model.solve(solver)
+    solve_time = time.perf_counter() - start
+
+    status = pulp.LpStatus[model.status]
+    objective = pulp.value(model.objective) if status == "Optimal" else None
+    variables = {"S": S, "R_u": R_u, "R_irr": R_irr, "R_hydro": R_hydro}
+    values = {name: np.array([x[t].varValue for t in months], dtype=np.float64) for name, x in variables.items()}
+    details = dict(backend=run.backend, iterations=run.iterations, nodes=run.nodes, log=run.log) if run else {}
+    return SolveResult("model1", status, objective, values, build_time, solve_time, **details)
+
+
+def print_results(result):
+    S, R_u, R_irr, R_hydro = (result.values[name] for name in ("S", "R_u", "R_irr", "R_hydro"))
+
+    # Print the results
+    if result.status == "Optimal":
+        print("Optimal Solution Found:")
+        print(f"Objective Value (Total Storage): {result.objective}")
+        print("Decision Variables:")
+        for t in range(len(S)):
+            print(f"Month {t + 1}:")
+            print(f"  Storage: {S[t]}")
+            print(f"  Release - Urban: {R_u[t]}")
+            print(f"  Release - Agricultural: {R_irr[t]}")
+            print(f"  Release - Hydropower: {R_hydro[t]}")
+    else:
+        print("No feasible solution found. Check the parameters and constraints.")
+
+
+def plot_results(result, D_u):
+    import matplotlib.pyplot as plt  # Only needed for the plots
+
+    # Visualize the results using bar diagrams
+    month_numbers = [t + 1 for t in range(len(result.values["S"]))]
+    plt.figure(figsize=(12, 6))
+    plt.subplot(2, 1, 1)
+    plt.bar(month_numbers, result.values["S"], color='blue', label='Optimized Storage (m^3)')
+    plt.xlabel('Month')
+    plt.ylabel('Storage (m^3)')
+    plt.title('Optimized Reservoir Storage Over Months')
+    plt.grid(True)
+
+    plt.subplot(2, 1, 2)
+    plt.bar(month_numbers, result.values["R_u"], color='blue', label='Optimized Release - Urban (m^3)')
+    plt.bar(month_numbers, D_u, color='red', alpha=0.5, label='Demand - Urban (m^3)')
+    plt.xlabel('Month')
+    plt.ylabel('Release (m^3)')
+    plt.title('Optimized Releases - Urban vs. Demand')
+    plt.legend()
+    plt.grid(True)
+
+    plt.tight_layout()
+    plt.show()
+
+
+def main():
+    # Define the time axis: one year of monthly steps (e.g. TimeAxis.years(50) for a 50-year horizon)
+    axis = TimeAxis.years(1)
+    # Inflows, outflows and demand values for urban, agricultural, and hydropower (from the input file)
+    inputs = load_inputs(DATA, axis)
+
+    result = solve_model1(axis, **inputs)
+    print_results(result)
+    try:
+        plot_results(result, inputs["D_u"])
+    except ImportError:
+        print("\nmatplotlib is not installed: the plots are skipped.")
+
+
+if __name__ == "__main__":
+    main()
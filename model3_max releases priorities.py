@@ -5,125 +5,167 @@ Created on October 2023
 @author: Angelos Alamanos
 """
 
-# Change to your path 
+# Import necessary libraries
 import os
-os.chdir("D:/your/path/...")
+import time
 
-# Import necessary libraries
+import numpy as np
 import pulp
-import matplotlib.pyplot as plt
 
-# Define the variables
-months = range(1, 13)
+from reservoir.loaders import load_inputs
+from reservoir.results import SolveResult
+from reservoir.solvers import solve_problem
+from reservoir.timeaxis import TimeAxis
+
+# Input time series: one column per series, with 12 rows (January-December) or one row per month
+# (example values - insert data in data/model3.csv; .parquet and .npy files are read the same way)
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "model3.csv")
 
-# Reservoir variables (example values - insert data)
-S = pulp.LpVariable.dicts("Storage", months, lowBound=0, cat='Continuous')
+# Reservoir parameters (example values - insert data)
 K = 10000000  # Reservoir capacity (m^3)
 S0 = 5000000  # Initial storage (m^3)
 S_min = 1000000  # Minimum required storage (m^3)
 
-# Inflows (example values - insert data)
-I_values = [8200000, 81000000, 8000000, 8000000, 8500000, 9000000, 9000000, 9000000, 8500000, 8000000, 81000000, 8200000]
-I = {t: I_values[t-1] for t in months}
 
-# Outflows (example values - insert data)
-O_values = [20000, 20000, 20000, 50000, 45000, 45000, 45000, 45000, 45000, 20000,20000, 20000]
-O = {t: O_values[t-1] for t in months}
+def solve_model3(axis, I, O, D_u, D_irr, D_hydro, K=K, S0=S0, S_min=S_min, solver="cbc"):
+    """Maximize the total releases, prioritized with binary variables, and return a SolveResult.
 
-# Releases for urban, agricultural, and hydropower (example values - insert data)
-R_u = pulp.LpVariable.dicts("Release_Urban", months, lowBound=0, cat='Continuous')
-R_irr = pulp.LpVariable.dicts("Release_Agricultural", months, lowBound=0, cat='Continuous')
-R_hydro = pulp.LpVariable.dicts("Release_Hydropower", months, lowBound=0, cat='Continuous')
+    Inflows I, outflows O and the demands for urban, agricultural and
+    hydropower use hold one value per time step. solver is a backend of
+    reservoir.solvers ("cbc", the default, "highs" or "scipy"; the solver log
+    is kept in the result) or a PuLP solver object.
+    """
+    start = time.perf_counter()
+    months = axis.steps
+    summer = axis.in_months(6, 7, 8)  # June-August
 
-# Demand values for urban, agricultural, and hydropower (example values - insert data)
-D_u_values = [100000, 100000, 130000, 140000, 160000, 180000, 190000, 170000, 140000, 120000, 110000, 110000]
-D_irr_values = [900000, 1500000, 2000000, 5500000, 7200000, 7800000, 7800000, 7200000, 6500000, 3500000, 3500000, 900000]
-D_hydro_values = [900000, 900000, 900000, 900000, 900000, 900000, 900000, 900000, 900000, 900000, 900000, 900000]
+    # Storage and releases for urban, agricultural, and hydropower
+    S = pulp.LpVariable.dicts("Storage", months, lowBound=0, cat='Continuous')
+    R_u = pulp.LpVariable.dicts("Release_Urban", months, lowBound=0, cat='Continuous')
+    R_irr = pulp.LpVariable.dicts("Release_Agricultural", months, lowBound=0, cat='Continuous')
+    R_hydro = pulp.LpVariable.dicts("Release_Hydropower", months, lowBound=0, cat='Continuous')
 
-D_u = {t: D_u_values[t-1] for t in months}
-D_irr = {t: D_irr_values[t-1] for t in months}
-D_hydro = {t: D_hydro_values[t-1] for t in months}
+    # Initialize the optimization model
+    model = pulp.LpProblem("Reservoir_Optimization", pulp.LpMaximize)
 
-# Initialize the optimization model
-model = pulp.LpProblem("Reservoir_Optimization", pulp.LpMaximize)
+    # Define the objective function to maximize total releases
+    model += pulp.lpSum([R_u[t] + R_irr[t] + R_hydro[t] for t in months])
 
-# Define the objective function to maximize total releases
-model += pulp.lpSum([R_u[t] + R_irr[t] + R_hydro[t] for t in months])
-
-# Add constraints
-for t in months:
-    if t == 1:
-        model += S[t] == S0 + I[t] - O[t] - R_u[t] - R_irr[t] - R_hydro[t]
-    else:
-        model += S[t] == S[t-1] + I[t] - O[t] - R_u[t] - R_irr[t] - R_hydro[t]
-    model += S_min == S[t]  # Minimum storage constraint (changed to equality)
-    model += S[t] <= K  # Storage capacity constraint
+    # Add constraints
+    for t in months:
+        if t == 0:
+            model += S[t] == S0 + I[t] - O[t] - R_u[t] - R_irr[t] - R_hydro[t]
+        else:
+            model += S[t] == S[t-1] + I[t] - O[t] - R_u[t] - R_irr[t] - R_hydro[t]
+        model += S_min == S[t]  # Minimum storage constraint (changed to equality)
+        model += S[t] <= K  # Storage capacity constraint
 
     # Conditional constraints for prioritizing demands
-    
+
     # Create binary variables for priorities
-Urban_Priority = pulp.LpVariable.dicts("Urban_Priority", months, cat='Binary')
-Agricultural_Priority = pulp.LpVariable.dicts("Agricultural_Priority", months, cat='Binary')
-Hydropower_Priority = pulp.LpVariable.dicts("Hydropower_Priority", months, cat='Binary')
-
-# Priority 1: Urban demand
-for t in months:
-    model += R_u[t] >= D_u[t] - (1 - Urban_Priority[t])
-    model += R_irr[t] == 0
-    model += R_hydro[t] == 0
-
-# Priority 2: Agricultural demand
-for t in months:
-    if t in [6, 7, 8]:
-        model += R_irr[t] >= D_irr[t] * 0.4 - (1 - Agricultural_Priority[t])
-    else:
-        model += R_irr[t] >= D_irr[t] - (1 - Agricultural_Priority[t])
-    model += R_irr[t] <= D_irr[t]  # Upper bound constraint on agricultural demand
-
-# Priority 3: Hydropower demand
-for t in months:
-    model += R_hydro[t] >= D_hydro[t] - (1 - Hydropower_Priority[t])
-    model += R_hydro[t] <= D_hydro[t]  # Upper bound constraint on hydropower demand
-
-# Solve the optimization problem
-model.solve()
-
-# Print the results
-if pulp.LpStatus[model.status] == "Optimal":
-    print("Optimal Solution Found:")
-    print(f"Objective Value (Total Releases): {pulp.value(model.objective)}")
-    print("\nDecision Variables:")
+    Urban_Priority = pulp.LpVariable.dicts("Urban_Priority", months, cat='Binary')
+    Agricultural_Priority = pulp.LpVariable.dicts("Agricultural_Priority", months, cat='Binary')
+    Hydropower_Priority = pulp.LpVariable.dicts("Hydropower_Priority", months, cat='Binary')
+
+    # Priority 1: Urban demand
+    for t in months:
+        model += R_u[t] >= D_u[t] - (1 - Urban_Priority[t])
+        model += R_irr[t] == 0
+        model += R_hydro[t] == 0
+
+    # Priority 2: Agricultural demand
+    for t in months:
+        if summer[t]:
+            model += R_irr[t] >= D_irr[t] * 0.4 - (1 - Agricultural_Priority[t])
+        else:
+            model += R_irr[t] >= D_irr[t] - (1 - Agricultural_Priority[t])
+        model += R_irr[t] <= D_irr[t]  # Upper bound constraint on agricultural demand
+
+    # Priority 3: Hydropower demand
     for t in months:
-        print(f"Month {t}:")
-        print(f"Storage (S_{t}): {S[t].varValue} m^3")
-        print(f"Release - Urban (R_u_{t}): {R_u[t].varValue} m^3")
-        print(f"Release - Agricultural (R_irr_{t}): {R_irr[t].varValue} m^3")
-        print(f"Release - Hydropower (R_hydro_{t}): {R_hydro[t].varValue} m^3")
-else:
-    print("No feasible solution found. Check the parameters and constraints.")
-
-# Visualize the results (storage and releases)
-plt.figure(figsize=(12, 8))
-
-# Storage plot
-plt.subplot(2, 1, 1)
-plt.bar(months, [S[t].varValue for t in months])
-plt.title("Optimized Storage over Time")
-plt.xlabel("Month")
-plt.ylabel("Storage (m^3)")
-
-# Releases plot
-plt.subplot(2, 1, 2)
-plt.bar(months, [R_u[t].varValue for t in months], label="Urban")
-plt.bar(months, [R_irr[t].varValue for t in months], bottom=[R_u[t].varValue for t in months], label="Agricultural")
-plt.bar(months, [R_hydro[t].varValue for t in months], bottom=[R_u[t].varValue + R_irr[t].varValue for t in months], label="Hydropower")
-plt.title("Optimized Releases over Time")
-plt.xlabel("Month")
-plt.ylabel("Release (m^3)")
-plt.legend(loc="upper right")
-
-plt.tight_layout()
-plt.show()
+        model += R_hydro[t] >= D_hydro[t] - (1 - Hydropower_Priority[t])
+        model += R_hydro[t] <= D_hydro[t]  # Upper bound constraint on hydropower demand
+    build_time = time.perf_counter() - start
+
+    # Solve the optimization problem
+    start = time.perf_counter()
+    run = None
+    if isinstance(solver, str):
+        run = solve_problem(model, solver)  # "cbc", "highs" or "scipy", with the solver log captured
+    else:
+        model.solve(solver)
+    solve_time = time.perf_counter() - start
+
+    status = pulp.LpStatus[model.status]
+    objective = pulp.value(model.objective) if status == "Optimal" else None
+    variables = {"S": S, "R_u": R_u, "R_irr": R_irr, "R_hydro": R_hydro, "Urban_Priority": Urban_Priority,
+                 "Agricultural_Priority": Agricultural_Priority, "Hydropower_Priority": Hydropower_Priority}
+    values = {name: np.array([x[t].varValue for t in months], dtype=np.float64) for name, x in variables.items()}
+    details = dict(backend=run.backend, iterations=run.iterations, nodes=run.nodes, log=run.log) if run else {}
+    return SolveResult("model3", status, objective, values, build_time, solve_time, **details)
+
+
+def print_results(result):
+    S, R_u, R_irr, R_hydro = (result.values[name] for name in ("S", "R_u", "R_irr", "R_hydro"))
+
+    # Print the results
+    if result.status == "Optimal":
+        print("Optimal Solution Found:")
+        print(f"Objective Value (Total Releases): {result.objective}")
+        print("\nDecision Variables:")
+        for t in range(len(S)):
+            print(f"Month {t + 1}:")
+            print(f"Storage (S_{t + 1}): {S[t]} m^3")
+            print(f"Release - Urban (R_u_{t + 1}): {R_u[t]} m^3")
+            print(f"Release - Agricultural (R_irr_{t + 1}): {R_irr[t]} m^3")
+            print(f"Release - Hydropower (R_hydro_{t + 1}): {R_hydro[t]} m^3")
+    else:
+        print("No feasible solution found. Check the parameters and constraints.")
+
+
+def plot_results(result):
+    import matplotlib.pyplot as plt  # Only needed for the plots
+
+    S, R_u, R_irr, R_hydro = (result.values[name] for name in ("S", "R_u", "R_irr", "R_hydro"))
+
+    # Visualize the results (storage and releases)
+    month_numbers = [t + 1 for t in range(len(S))]
+    plt.figure(figsize=(12, 8))
+
+    # Storage plot
+    plt.subplot(2, 1, 1)
+    plt.bar(month_numbers, S)
+    plt.title("Optimized Storage over Time")
+    plt.xlabel("Month")
+    plt.ylabel("Storage (m^3)")
+
+    # Releases plot
+    plt.subplot(2, 1, 2)
+    plt.bar(month_numbers, R_u, label="Urban")
+    plt.bar(month_numbers, R_irr, bottom=R_u, label="Agricultural")
+    plt.bar(month_numbers, R_hydro, bottom=R_u + R_irr, label="Hydropower")
+    plt.title("Optimized Releases over Time")
+    plt.xlabel("Month")
+    plt.ylabel("Release (m^3)")
+    plt.legend(loc="upper right")
+
+    plt.tight_layout()
+    plt.show()
+
+
+def main():
+    # Define the time axis: one year of monthly steps (e.g. TimeAxis.years(50) for a 50-year horizon)
+    axis = TimeAxis.years(1)
+    # Inflows, outflows and demand values for urban, agricultural, and hydropower (from the input file)
+    inputs = load_inputs(DATA, axis)
 
+    result = solve_model3(axis, **inputs)
+    print_results(result)
+    try:
+        plot_results(result)
+    except ImportError:
+        print("\nmatplotlib is not installed: the plots are skipped.")
 
 
+if __name__ == "__main__":
+    main()
@@ -6,217 +6,227 @@ Created on OCTOBER 2023
 
 """
 
-# Define your folder path 
 import os
-os.chdir("D:/your/path/...")
+import time
 
+import numpy as np
 import pulp
 
+from reservoir.economics import Economics
+from reservoir.loaders import load_inputs
+from reservoir.results import SolveResult
+from reservoir.solvers import solve_problem
+from reservoir.timeaxis import TimeAxis
+
 # Define the variables
 n_users = 3
-months = range(1, 13)
-
-# Reservoir variables (example values - insert data)
-S = pulp.LpVariable.dicts("Storage", months, lowBound=0, cat='Continuous')
-K = 100000000  # Reservoir capacity (m^3)
-
-# User demands (12 different values for each month JAN-DEC) (example values - insert data)
-D_u_values = [1100000, 1100000, 1100000, 1200000, 1500000, 1700000, 1800000, 1700000, 1200000, 1100000, 1100000, 1100000]
-D_irr_values = [1500000, 1500000, 2000000, 3000000, 5000000, 5500000, 5800000, 6000000, 4500000, 1500000, 1500000, 1500000]
-D_hydro_values = [900000, 900000, 900000, 900000, 900000, 900000, 900000, 900000, 900000, 900000, 900000, 900000]
 
-D_u = {t: D_u_values[t-1] for t in months}
-D_irr = {t: D_irr_values[t-1] for t in months}
-D_hydro = {t: D_hydro_values[t-1] for t in months}
+# Input time series: one column per series, with 12 rows (January-December) or one row per month
+# (example values - insert data in data/model5.csv; .parquet and .npy files are read the same way)
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "model5.csv")
 
-# Spills and environmental flows
-Sp = pulp.LpVariable.dicts("Spills", months, lowBound=0, cat='Continuous')
-EF = pulp.LpVariable.dicts("Env_Flows", months, lowBound=0, cat='Continuous')
-
-# 12 different values for MinEF, Inflows (I), Evaporation losses (E) and Precipitation (P) (example values - insert data)
-MinEF_values = [500000, 500000, 750000, 750000, 750000, 1000000, 1000000, 1000000, 750000, 750000, 750000, 500000]
-I_values = [3000000, 2900000, 2700000, 2600000, 2200000, 2000000, 150000, 900000, 1500000, 1800000, 2000000, 2500000]
-E_values = [250000, 250000, 250000, 500000, 500000, 500000, 500000, 500000, 500000, 250000, 250000, 250000]
-P_values = [1000000, 800000, 600000, 300000, 200000, 100000, 50000, 60000, 150000, 400000, 700000, 900000]
-
-MinEF = {t: MinEF_values[t-1] for t in months}
-I = {t: I_values[t-1] for t in months}
-E = {t: E_values[t-1] for t in months}
-P = {t: P_values[t-1] for t in months}
+# Reservoir parameters (example values - insert data)
+K = 100000000  # Reservoir capacity (m^3)
 
 # Input data (here used just as an initial condition, it is not released later on) (example values - insert data)
 S0 = 50000000
 
-# Release variables
-R_u = pulp.LpVariable.dicts("Release_Urban", months, lowBound=0, cat='Continuous')
-R_irr = pulp.LpVariable.dicts("Release_Agricultural", months, lowBound=0, cat='Continuous')
-R_hydro = pulp.LpVariable.dicts("Release_Hydropower", months, lowBound=0, cat='Continuous')
+# Benefits and costs (example values - insert data): unit values of the releases, spill costs and the
+# penalty for environmental flow violations, shared with reservoir.formulations and reservoir.matrix
+# (see MODEL5_DEFAULTS in reservoir/parameters.py; e.g. Economics(Price_Electricity=0.20) to change one)
+ECONOMICS = Economics()
 
-# Benefits and costs (example values - insert data)
-Economic_Value_Water = 1  # $/m^3
-Cost_Treatment = 0.2  # $/m^3
 
-Crop_Sales = {'A': 2.50, 'B': 2.00, 'C': 1.50, 'D': 1.10}  # $/kg
-Crop_Yields = {'A': 700, 'B': 950, 'C': 800, 'D': 600}    # kg
-Irrigation_Costs = 0.30  # $/m^3
+def solve_model5(axis, I, E, P, MinEF, D_u, D_irr, D_hydro, K=K, S0=S0, solver="cbc", economics=ECONOMICS):
+    """Maximize the net benefits of the releases and return a SolveResult.
 
-Electricity_Produced = 14.705  #  = 1/0.068 kWh/m3
-Price_Electricity = 0.15  # $/kWh
-Hydropower_Operation_Costs = 0.03  # $/m^3
+    Inflows I, evaporation losses E, precipitation P, minimum environmental
+    flows MinEF and the user demands hold one value per time step. solver is
+    a backend of reservoir.solvers ("cbc", the default, "highs" or "scipy";
+    the solver log is kept in the result) or a PuLP solver object. economics
+    holds the benefits and costs (an Economics).
+    """
+    start = time.perf_counter()
+    months = axis.steps
 
-# Cost Function for Environmental Flow Violations
-PenaltyRate = 10  # $/m^3
+    # Storage, spills, environmental flows and release variables
+    S = pulp.LpVariable.dicts("Storage", months, lowBound=0, cat='Continuous')
+    Sp = pulp.LpVariable.dicts("Spills", months, lowBound=0, cat='Continuous')
+    EF = pulp.LpVariable.dicts("Env_Flows", months, lowBound=0, cat='Continuous')
+    R_u = pulp.LpVariable.dicts("Release_Urban", months, lowBound=0, cat='Continuous')
+    R_irr = pulp.LpVariable.dicts("Release_Agricultural", months, lowBound=0, cat='Continuous')
+    R_hydro = pulp.LpVariable.dicts("Release_Hydropower", months, lowBound=0, cat='Continuous')
 
-# Define Objective Function
-model = pulp.LpProblem("Reservoir_Optimization", pulp.LpMaximize)
+    # Define Objective Function
+    model = pulp.LpProblem("Reservoir_Optimization", pulp.LpMaximize)
 
-# Benefits from releases
-B_R_u = sum(Economic_Value_Water * R_u[t] - Cost_Treatment * R_u[t] for t in months)
-B_R_irr = sum(Crop_Sales[crop] * Crop_Yields[crop] for crop in Crop_Sales) - Irrigation_Costs * sum(R_irr[t] for t in months)
-B_R_hydro = sum(Electricity_Produced * Price_Electricity * R_hydro[t] - Hydropower_Operation_Costs * R_hydro[t] for t in months)
-B_R = B_R_u + B_R_irr + B_R_hydro
+    # Binary variables for environmental flow violation
+    EF_violation = pulp.LpVariable.dicts("EF_Violation", months, cat='Binary')
 
-# Calculate spill shares for each month
-Sp_u = {t: 0.3 * Sp[t] for t in months}
-Sp_irr = {t: 0.5 * Sp[t] for t in months}
-Sp_hydro = {t: 0.2 * Sp[t] for t in months}
+    # Cost for not meeting environmental flow
+    for t in months:
+        model += EF[t] >= MinEF[t] - EF_violation[t]
 
-# Costs for spills (updated)
-C_sp_u = Economic_Value_Water * sum(Sp_u[t] for t in months)
-C_sp_irr = Irrigation_Costs * sum(Sp_irr[t] for t in months)
-C_sp_hydro = Hydropower_Operation_Costs * sum(R_hydro[t] for t in months)
-C_sp = C_sp_u + C_sp_irr + C_sp_hydro
+    # Objective function: benefits from releases (B_R), minus the costs for spills (C_sp) and for not
+    # meeting the environmental flow (C_EF), with the coefficients of the package formulations
+    c = economics.coefficients()
+    model += (pulp.lpSum(c["R_u"] * R_u[t] + c["R_irr"] * R_irr[t] + c["R_hydro"] * R_hydro[t] + c["Sp"] * Sp[t]
+                         + c["EF_violation"] * EF_violation[t] for t in months) + economics.Crop_Revenue)
 
+    # Constraints
+    # Storage balance equation
+    for t in months:
+        if t == 0:
+            model += S[t] == S0 + I[t] - E[t] + P[t] - (R_u[t] + R_irr[t] + R_hydro[t]) - Sp[t] - EF[t]
+        else:
+            model += S[t] == S[t - 1] + I[t] - E[t] + P[t] - (R_u[t] + R_irr[t] + R_hydro[t]) - Sp[t] - EF[t]
 
-# Binary variables for environmental flow violation
-EF_violation = pulp.LpVariable.dicts("EF_Violation", months, cat='Binary')
+    # Storage capacity constraint
+    for t in months:
+        model += S[t] <= K
 
-# Cost for not meeting environmental flow
-for t in months:
-    model += EF[t] >= MinEF[t] - EF_violation[t]
+    # Release constraints
+    for t in months:
+        model += R_u[t] == D_u[t]
+        model += R_irr[t] == D_irr[t]
+        model += R_hydro[t] == D_hydro[t]
 
-C_EF = PenaltyRate * sum(EF_violation[t] for t in months)
+    # Spill constraints
+    for t in months:
+        model += Sp[t] <= S0
 
-# Objective function
-model += B_R - C_sp - C_EF
+    # Environmental flow constraints
+    model += EF[t] >= MinEF[t] - EF_violation[t]
+    build_time = time.perf_counter() - start
 
-# Constraints
-# Storage balance equation
-for t in months:
-    if t == 1:
-        model += S[t] == S0 + I[t] - E[t] + P[t] - (R_u[t] + R_irr[t] + R_hydro[t]) - Sp[t] - EF[t]
+    # Solve the problem
+    start = time.perf_counter()
+    run = None
+    if isinstance(solver, str):
+        run = solve_problem(model, solver)  # "cbc", "highs" or "scipy", with the solver log captured
     else:
-        model += S[t] == S[t - 1] + I[t] - E[t] + P[t] - (R_u[t] + R_irr[t] + R_hydro[t]) - Sp[t] - EF[t]
-
-# Storage capacity constraint
-for t in months:
-    model += S[t] <= K
-
-# Release constraints
-for t in months:
-    model += R_u[t] == D_u[t]
-    model += R_irr[t] == D_irr[t]
-    model += R_hydro[t] == D_hydro[t]
-
-# Spill constraints
-for t in months:
-    model += Sp[t] <= S0
-
-# Environmental flow constraints
-model += EF[t] >= MinEF[t] - EF_violation[t]
-
-# Solve the problem
-model.solve()
-
-# Print the results
-if pulp.LpStatus[model.status] == "Optimal":
-    print("Optimal Solution Found:")
-    print(f"Objective Value: {pulp.value(model.objective)}")
-    print("Storage:")
-    for t in months:
-        print(f"Month {t}: {S[t].varValue}")
-    print("Spills:")
-    for t in months:
-        print(f"Month {t}: {Sp[t].varValue}")
-    print("Env Flows:")
-    for t in months:
-        print(f"Month {t}: {EF[t].varValue}")
-    print("Releases - Urban:")
-    for t in months:
-        print(f"Month {t}: {R_u[t].varValue}")
-    print("Releases - Agriculture:")
-    for t in months:
-        print(f"Month {t}: {R_irr[t].varValue}")
-    print("Releases - Hydropower:")
-    for t in months:
-        print(f"Month {t}: {R_hydro[t].varValue}")
-else:
-    print("No feasible solution found. Check the parameters and constraints.")
+        model.solve(solver)
+    solve_time = time.perf_counter() - start
+
+    status = pulp.LpStatus[model.status]
+    objective = pulp.value(model.objective) if status == "Optimal" else None
+    variables = {"S": S, "Sp": Sp, "EF": EF, "R_u": R_u, "R_irr": R_irr, "R_hydro": R_hydro,
+                 "EF_violation": EF_violation}
+    values = {name: np.array([x[t].varValue for t in months], dtype=np.float64) for name, x in variables.items()}
+    details = dict(backend=run.backend, iterations=run.iterations, nodes=run.nodes, log=run.log) if run else {}
+    return SolveResult("model5", status, objective, values, build_time, solve_time, **details)
+
+
+def print_results(result):
+    S, Sp, EF, R_u, R_irr, R_hydro = (result.values[name] for name in ("S", "Sp", "EF", "R_u", "R_irr", "R_hydro"))
+    months = range(len(S))
+
+    # Print the results
+    if result.status == "Optimal":
+        print("Optimal Solution Found:")
+        print(f"Objective Value: {result.objective}")
+        print("Storage:")
+        for t in months:
+            print(f"Month {t + 1}: {S[t]}")
+        print("Spills:")
+        for t in months:
+            print(f"Month {t + 1}: {Sp[t]}")
+        print("Env Flows:")
+        for t in months:
+            print(f"Month {t + 1}: {EF[t]}")
+        print("Releases - Urban:")
+        for t in months:
+            print(f"Month {t + 1}: {R_u[t]}")
+        print("Releases - Agriculture:")
+        for t in months:
+            print(f"Month {t + 1}: {R_irr[t]}")
+        print("Releases - Hydropower:")
+        for t in months:
+            print(f"Month {t + 1}: {R_hydro[t]}")
+    else:
+        print("No feasible solution found. Check the parameters and constraints.")
 
 # -----------------------------------------------------------
 
 #  Plots - results & optimized vs initial values
 
-import matplotlib.pyplot as plt
-
-# Assuming you have already solved the optimization problem and have the results
-# Replace the following with your actual data
-optimized_storage = [S[t].varValue for t in months]
-optimized_spills = [Sp[t].varValue for t in months]
-optimized_env_flows = [EF[t].varValue for t in months]
-optimized_releases_urban = [R_u[t].varValue for t in months]
-optimized_releases_agriculture = [R_irr[t].varValue for t in months]
-optimized_releases_hydropower = [R_hydro[t].varValue for t in months]
-
-initial_demand_urban = [D_u[t] for t in months]
-initial_demand_agriculture = [D_irr[t] for t in months]
-initial_demand_hydropower = [D_hydro[t] for t in months]
-
-# Create subplots
-fig, axes = plt.subplots(nrows=3, ncols=2, figsize=(12, 10))
-
-# Plot Storage
-axes[0, 0].bar(months, optimized_storage, color='blue')
-axes[0, 0].set_title('Optimized Storage (m³)')
-axes[0, 0].set_xlabel('Month')
-axes[0, 0].set_ylabel('Storage (m³)')
-
-# Plot Spills
-axes[0, 1].bar(months, optimized_spills, color='blue')
-axes[0, 1].set_title('Optimized Spills (m³)')
-axes[0, 1].set_xlabel('Month')
-axes[0, 1].set_ylabel('Spills (m³)')
-
-# Plot Env Flows
-axes[1, 0].bar(months, optimized_env_flows, color='blue')
-axes[1, 0].set_title('Optimized Environmental Flows (m³)')
-axes[1, 0].set_xlabel('Month')
-axes[1, 0].set_ylabel('Env Flows (m³)')
-
-# Plot Releases - Urban
-axes[1, 1].bar(months, optimized_releases_urban, color='blue', label='Optimized')
-axes[1, 1].bar(months, initial_demand_urban, color='red', label='Initial Demand', alpha=0.5)
-axes[1, 1].set_title('Urban Releases and Initial Demand (m³)')
-axes[1, 1].set_xlabel('Month')
-axes[1, 1].set_ylabel('Releases (m³)')
-axes[1, 1].legend()
-
-# Plot Releases - Agriculture
-axes[2, 0].bar(months, optimized_releases_agriculture, color='blue', label='Optimized')
-axes[2, 0].bar(months, initial_demand_agriculture, color='red', label='Initial Demand', alpha=0.5)
-axes[2, 0].set_title('Agriculture Releases and Initial Demand (m³)')
-axes[2, 0].set_xlabel('Month')
-axes[2, 0].set_ylabel('Releases (m³)')
-axes[2, 0].legend()
-
-# Plot Releases - Hydropower
-axes[2, 1].bar(months, optimized_releases_hydropower, color='blue', label='Optimized')
-axes[2, 1].bar(months, initial_demand_hydropower, color='red', label='Initial Demand', alpha=0.5)
-axes[2, 1].set_title('Hydropower Releases and Initial Demand (m³)')
-axes[2, 1].set_xlabel('Month')
-axes[2, 1].set_ylabel('Releases (m³)')
-axes[2, 1].legend()
-
-plt.tight_layout()
-plt.show()
-
+def plot_results(result, D_u, D_irr, D_hydro):
+    import matplotlib.pyplot as plt  # Only needed for the plots
+
+    optimized_storage = result.values["S"]
+    optimized_spills = result.values["Sp"]
+    optimized_env_flows = result.values["EF"]
+    optimized_releases_urban = result.values["R_u"]
+    optimized_releases_agriculture = result.values["R_irr"]
+    optimized_releases_hydropower = result.values["R_hydro"]
+
+    initial_demand_urban = D_u
+    initial_demand_agriculture = D_irr
+    initial_demand_hydropower = D_hydro
+    month_numbers = [t + 1 for t in range(len(optimized_storage))]
+
+    # Create subplots
+    fig, axes = plt.subplots(nrows=3, ncols=2, figsize=(12, 10))
+
+    # Plot Storage
+    axes[0, 0].bar(month_numbers, optimized_storage, color='blue')
+    axes[0, 0].set_title('Optimized Storage (m³)')
+    axes[0, 0].set_xlabel('Month')
+    axes[0, 0].set_ylabel('Storage (m³)')
+
+    # Plot Spills
+    axes[0, 1].bar(month_numbers, optimized_spills, color='blue')
+    axes[0, 1].set_title('Optimized Spills (m³)')
+    axes[0, 1].set_xlabel('Month')
+    axes[0, 1].set_ylabel('Spills (m³)')
+
+    # Plot Env Flows
+    axes[1, 0].bar(month_numbers, optimized_env_flows, color='blue')
+    axes[1, 0].set_title('Optimized Environmental Flows (m³)')
+    axes[1, 0].set_xlabel('Month')
+    axes[1, 0].set_ylabel('Env Flows (m³)')
+
+    # Plot Releases - Urban
+    axes[1, 1].bar(month_numbers, optimized_releases_urban, color='blue', label='Optimized')
+    axes[1, 1].bar(month_numbers, initial_demand_urban, color='red', label='Initial Demand', alpha=0.5)
+    axes[1, 1].set_title('Urban Releases and Initial Demand (m³)')
+    axes[1, 1].set_xlabel('Month')
+    axes[1, 1].set_ylabel('Releases (m³)')
+    axes[1, 1].legend()
+
+    # Plot Releases - Agriculture
+    axes[2, 0].bar(month_numbers, optimized_releases_agriculture, color='blue', label='Optimized')
+    axes[2, 0].bar(month_numbers, initial_demand_agriculture, color='red', label='Initial Demand', alpha=0.5)
+    axes[2, 0].set_title('Agriculture Releases and Initial Demand (m³)')
+    axes[2, 0].set_xlabel('Month')
+    axes[2, 0].set_ylabel('Releases (m³)')
+    axes[2, 0].legend()
+
+    # Plot Releases - Hydropower
+    axes[2, 1].bar(month_numbers, optimized_releases_hydropower, color='blue', label='Optimized')
+    axes[2, 1].bar(month_numbers, initial_demand_hydropower, color='red', label='Initial Demand', alpha=0.5)
+    axes[2, 1].set_title('Hydropower Releases and Initial Demand (m³)')
+    axes[2, 1].set_xlabel('Month')
+    axes[2, 1].set_ylabel('Releases (m³)')
+    axes[2, 1].legend()
+
+    plt.tight_layout()
+    plt.show()
+
+
+def main():
+    # Define the time axis: one year of monthly steps (e.g. TimeAxis.years(50) for a 50-year horizon)
+    axis = TimeAxis.years(1)
+    # User demands, MinEF, Inflows (I), Evaporation losses (E) and Precipitation (P) (from the input file)
+    inputs = load_inputs(DATA, axis)
+
+    result = solve_model5(axis, **inputs)
+    print_results(result)
+    try:
+        plot_results(result, inputs["D_u"], inputs["D_irr"], inputs["D_hydro"])
+    except ImportError:
+        print("\nmatplotlib is not installed: the plots are skipped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Reservoir simulation and optimization toolkit
+
+Array-based building blocks behind the example scripts in the repository root.
+The submodules are imported on first attribute access, so `import reservoir`
+stays cheap in worker processes that only need part of the package.
+"""
+
+import importlib
+
+# Public name -> submodule defining it
+_EXPORTS = {
+    "SimulationResult": "engine",
+    "simulate_batch": "engine",
+    "simulate_chunks": "engine",
+    "simulate_compiled": "kernel",
+    "run_ensemble": "ensemble",
+    "Network": "network",
+    "TimeAxis": "timeaxis",
+    "load_inputs": "loaders",
+    "load_series": "loaders",
+    "SolveResult": "results",
+    "BatchResult": "results",
+    "build_model": "formulations",
+    "assemble": "matrix",
+    "assemble_network": "joint",
+    "rolling_horizon": "rolling",
+    "InflowMarkovChain": "sdp",
+    "solve_sdp": "sdp",
+    "TrajectoryWriter": "output",
+    "TrajectoryStats": "output",
+    "Reporter": "report",
+    "render_report": "report",
+    "Economics": "economics",
+    "run_sensitivity": "sensitivity",
+    "yield_curves": "sizing",
+    "pareto_front": "pareto",
+    "solve_problem": "solvers",
+    "compare_backends": "solvers",
+    "HighsModel": "solvers",
+    "solve_decomposed": "decomposition",
+    "check_feasibility": "presolve",
+    "find_iis": "presolve",
+    "simulate_fine": "finestep",
+    "solve_batch": "batch",
+    "SolveCache": "cache",
+    "cached_solve": "cache",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    try:
+        module = _EXPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value  # Later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
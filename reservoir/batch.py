@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Batch solving of the optimization models over scenario tables
+
+A table of scenarios (climate, demand, capacity, ... variants of the model
+parameters) is split into chunks and solved over a process pool. Each worker
+builds its formulation once per chunk and only updates the parameters from
+one scenario to the next. Failed or infeasible scenarios are recorded in the
+results table; they never stop the batch. Scenarios that the feasibility
+pre-check (presolve.py) proves infeasible are rejected without building or
+solving a model.
+"""
+
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from .cache import SolveCache, formulation_version, cache_key
+from .presolve import check_feasibility
+from .results import BatchResult
+
+BACKENDS = ("pulp", "matrix")
+
+
+def scenario_rows(scenarios):
+    """Turn a scenario table into a list of (label, parameters) rows.
+
+    The table is either a sequence of dicts, one per scenario, or a dict of
+    columns with one entry per scenario (e.g. {"I": array [n_scenarios,
+    n_steps], "K": [...]}). A "scenario" entry, if present, labels the row;
+    otherwise rows are labelled by their position.
+    """
+    if isinstance(scenarios, dict):
+        lengths = {len(column) for column in scenarios.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"scenario columns differ in length: {sorted(lengths)}")
+        n = lengths.pop() if lengths else 0
+        scenarios = [{key: column[i] for key, column in scenarios.items()} for i in range(n)]
+    rows = []
+    for i, params in enumerate(scenarios):
+        params = dict(params)
+        rows.append((params.pop("scenario", i), params))
+    return rows
+
+
+def _build(backend, name, axis, params):
+    if backend == "matrix":
+        from .matrix import assemble
+        return assemble(name, axis, **params)
+    from .formulations import build_model
+    return build_model(name, axis, **params)
+
+
+def _solve_chunk(backend, name, axis, base, chunk, threads, time_limit, cache, precheck=False):
+    # Worker task: solve the scenarios of one chunk, reusing one model between them
+    out = []
+    model = None
+    options = {"backend": backend, "time_limit": time_limit}
+    for i, params in chunk:
+        params = {**base, **params}
+        start = time.perf_counter()
+        try:
+            if precheck:
+                report = check_feasibility(name, axis, **params)
+                if not report.feasible:
+                    out.append((i, "Infeasible", None, {}, report.check_time, 0.0, report.message))
+                    continue
+            if cache is not None:
+                key = cache_key(name, axis, params, options)
+                result = cache.get(name, key)
+                if result is not None:
+                    out.append((i, result.status, result.objective, result.values, 0.0, 0.0, None))
+                    continue
+            if model is None:
+                model = _build(backend, name, axis, params)
+            else:
+                model.update(**params)
+            build_time = time.perf_counter() - start
+            if backend == "matrix":
+                result = model.solve(time_limit=time_limit)
+            else:
+                result = model.solve(threads=threads, time_limit=time_limit)
+            if cache is not None:
+                cache.put(name, key, result, formulation_version(name))
+            out.append((i, result.status, result.objective, result.values, build_time, result.solve_time, None))
+        except Exception:
+            # The model may be half-updated: start the next scenario from a fresh build
+            model = None
+            out.append((i, "Error", None, {}, time.perf_counter() - start, 0.0, traceback.format_exc()))
+    return out
+
+
+def solve_batch(name, axis, scenarios, base=None, backend="pulp", max_workers=None, threads=1,
+                time_limit=None, chunk_size=None, cache=None, precheck=True):
+    """Solve formulation `name` ("model1" ... "model5") for every scenario of a table.
+
+    Each scenario's parameters (see scenario_rows) override `base`, the
+    parameters shared by all scenarios; together they must give every
+    parameter of the formulation. backend is "pulp" (CBC, through
+    reservoir.formulations) or "matrix" (HiGHS, through reservoir.matrix).
+    threads is the number of CBC threads per solve, so max_workers * threads
+    should not exceed the number of cores; time_limit is in seconds per solve.
+    Scenarios are sent to the workers in chunks of chunk_size (by default,
+    about four chunks per worker). max_workers=0 solves everything in the
+    calling process. With a cache (a SolveCache or a folder path), scenarios
+    solved before are read from disk instead of being solved again. With
+    precheck, scenarios that presolve.check_feasibility proves infeasible get
+    the status "Infeasible" and the conflict in BatchResult.errors, without
+    being solved.
+
+    Returns a BatchResult. A scenario that raises (bad parameters, solver
+    failure, a crashed worker) gets the status "Error" and its traceback in
+    BatchResult.errors; infeasible scenarios keep the solver status.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend {backend!r}, expected one of {BACKENDS}")
+    rows = scenario_rows(scenarios)
+    base = dict(base or {})
+    n = len(rows)
+    workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+    if chunk_size is None:
+        chunk_size = max(1, -(-n // (4 * max(workers, 1))))
+    chunks = [[(i, rows[i][1]) for i in range(start, min(start + chunk_size, n))]
+              for start in range(0, n, chunk_size)]
+    if cache is not None and not isinstance(cache, SolveCache):
+        cache = SolveCache(cache)
+    args = (backend, name, axis, base)
+    options = (threads, time_limit, cache, precheck)
+    solved = []
+
+    if max_workers == 0:
+        for chunk in chunks:
+            solved += _solve_chunk(*args, chunk, *options)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            pending = {pool.submit(_solve_chunk, *args, chunk, *options): chunk
+                       for chunk in chunks}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = pending.pop(future)
+                    try:
+                        solved += future.result()
+                    except Exception:
+                        # The worker itself failed (e.g. it was killed): report the whole chunk
+                        message = traceback.format_exc()
+                        solved += [(i, "Error", None, {}, 0.0, 0.0, message) for i, _ in chunk]
+
+    status = np.empty(n, dtype=object)
+    objective = np.full(n, np.nan)
+    build_time, solve_time = np.zeros(n), np.zeros(n)
+    values, errors = {}, {}
+    for i, s, obj, vals, build, solve, error in solved:
+        status[i], build_time[i], solve_time[i] = s, build, solve
+        if s == "Optimal":
+            objective[i] = obj
+            for key, v in vals.items():
+                if key not in values:
+                    values[key] = np.full((n, len(v)), np.nan)
+                values[key][i] = v
+        if error is not None:
+            errors[i] = error
+    return BatchResult(name, [label for label, _ in rows], status, objective, values,
+                       build_time, solve_time, errors)
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+On-disk cache of optimization results
+
+Results of models 1-5 are stored under a content hash of the formulation ID
+and version, the calendar months of the time axis, every parameter value and
+the solver options, so a repeated scenario is answered from disk without
+calling the solver. Entries are .npz files in one folder per formulation;
+the least recently used ones are deleted once the cache exceeds its size
+limit. Increasing a formulation's `version` makes its old entries
+unreachable, and invalidate() deletes them.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from .parameters import prepare_params
+from .results import SolveResult
+
+
+def formulation_version(name):
+    """Current version of formulation `name` (see ReservoirModel.version)."""
+    from .formulations import FORMULATIONS
+    return FORMULATIONS[name].version
+
+
+def cache_key(name, axis, params, solver_options=None, version=None):
+    """Hex digest identifying one solve of formulation `name`.
+
+    params are the model parameters (as for build_model); they are validated
+    and converted to float64 first, so equal values give equal keys whatever
+    their input type. version defaults to the formulation class's version.
+    """
+    if version is None:
+        version = formulation_version(name)
+    params = prepare_params(name, len(axis), params)
+    h = hashlib.sha256()
+    h.update(json.dumps([name, version, sorted((solver_options or {}).items())], default=repr).encode())
+    h.update(np.ascontiguousarray(axis.month, dtype=np.int64).tobytes())
+    for key in sorted(params):
+        value = params[key]
+        h.update(key.encode())
+        h.update(np.ascontiguousarray(value, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+class SolveCache:
+    """Content-addressed store of SolveResults with size-based LRU eviction."""
+
+    def __init__(self, directory, max_bytes=1 << 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name, key):
+        return os.path.join(self.directory, name, key + ".npz")
+
+    def _entries(self):
+        # (last use, size, path) of every entry
+        entries = []
+        for name in os.listdir(self.directory):
+            folder = os.path.join(self.directory, name)
+            if not os.path.isdir(folder):
+                continue
+            for file in os.listdir(folder):
+                if file.endswith(".npz"):
+                    path = os.path.join(folder, file)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:  # Evicted by another process
+                        continue
+                    entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def get(self, name, key):
+        """The cached SolveResult of `key`, or None."""
+        path = self._path(name, key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(str(data["__meta__"]))
+                values = {k: data[k] for k in data.files if k != "__meta__"}
+        except (FileNotFoundError, OSError, ValueError, KeyError):
+            return None
+        try:
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            pass
+        return SolveResult(meta["formulation"], meta["status"], meta["objective"], values,
+                           meta["build_time"], meta["solve_time"], meta.get("backend"), meta.get("iterations"),
+                           meta.get("nodes"))
+
+    def put(self, name, key, result, version=None):
+        """Store a SolveResult under `key`, then evict the least recently used entries if needed."""
+        folder = os.path.join(self.directory, name)
+        os.makedirs(folder, exist_ok=True)
+        meta = {"formulation": result.formulation, "version": version, "status": result.status,
+                "objective": result.objective, "build_time": result.build_time,
+                "solve_time": result.solve_time, "backend": result.backend, "iterations": result.iterations,
+                "nodes": result.nodes}
+        # Write to a temporary file and rename it, so readers never see a partial entry
+        fd, tmp = tempfile.mkstemp(suffix=".npz", dir=folder)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, __meta__=np.array(json.dumps(meta)), **result.values)
+            os.replace(tmp, self._path(name, key))
+        except BaseException:
+            os.remove(tmp)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Delete the least recently used entries until the cache fits in max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def invalidate(self, name=None, stale_only=False):
+        """Delete the entries of formulation `name` (of every formulation if None).
+
+        With stale_only=True, only entries stored under another version than
+        the formulation's current one are deleted. Returns the number deleted.
+        """
+        removed = 0
+        for _, _, path in self._entries():
+            folder = os.path.basename(os.path.dirname(path))
+            if name is not None and folder != name:
+                continue
+            if stale_only:
+                try:
+                    with np.load(path, allow_pickle=False) as data:
+                        version = json.loads(str(data["__meta__"]))["version"]
+                except (OSError, ValueError, KeyError):
+                    version = None
+                if version == formulation_version(folder):
+                    continue
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    @property
+    def size(self):
+        """Total size of the entries, in bytes."""
+        return sum(size for _, size, _ in self._entries())
+
+
+def cached_solve(cache, name, axis, solver_options=None, **params):
+    """Solve formulation `name` through a SolveCache: from disk on a hit, with CBC on a miss.
+
+    solver_options are passed to ReservoirModel.solve (e.g. threads,
+    time_limit) and are part of the key. A cache given as a path is opened
+    with the default size limit.
+    """
+    from .formulations import build_model
+
+    if not isinstance(cache, SolveCache):
+        cache = SolveCache(cache)
+    solver_options = dict(solver_options or {})
+    version = formulation_version(name)
+    key = cache_key(name, axis, params, solver_options, version)
+    result = cache.get(name, key)
+    if result is None:
+        result = build_model(name, axis, **params).solve(**solver_options)
+        cache.put(name, key, result, version)
+    return result
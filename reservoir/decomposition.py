@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Time decomposition of model 4 for very long horizons
+
+The horizon is split into blocks of block_size steps. Each block is solved
+as its own model 4 (matrix.py) from the storage at its start, the boundary
+storage. Every block keeps the storage above the least level from which the
+rest of the horizon stays feasible (required_storage, one backward pass over
+the whole record), so a block never leaves the next one short of water. The
+blocks are linked through the boundaries in one of two ways:
+
+    "coordination"  each block also looks `overlap` steps past its end, so
+                    it does not empty the reservoir just before the next
+                    block; the storage at the end of a block becomes the
+                    boundary of the next one, and blocks whose boundary
+                    changed are solved again until every boundary agrees
+                    with the block before it
+    "targets"       the boundary storages are given (e.g. by a coarser
+                    model or a release policy); every block runs from its
+                    target to the next one, in a single pass
+
+The blocks of an iteration are independent, so they are solved in chunks by
+a process pool; a worker builds one program per block length and only
+updates its right-hand sides from one block to the next. The stitched
+trajectories are scored with the model 4 objective (total unmet demand) and
+can be compared with the monolithic solve.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from .timeaxis import TimeAxis
+
+METHODS = ("coordination", "targets")
+RELEASES = ("R_u", "R_irr", "R_hydro")
+
+
+@dataclass
+class DecompositionResult:
+    """Stitched trajectories of a decomposed model 4 solve, one value per step."""
+    S: np.ndarray
+    R_u: np.ndarray
+    R_irr: np.ndarray
+    R_hydro: np.ndarray
+    objective: float  # Total unmet demand of the stitched trajectories (None unless every block solved)
+    status: str  # "Optimal" if every block solved and the boundaries agree, "Infeasible" or "Not Solved"
+    block_status: np.ndarray  # Solver status of each block
+    boundaries: np.ndarray  # Storage at the start of each block (S0 first)
+    iterations: int  # Rounds of block solves
+    n_solves: int  # Block solves over all rounds
+    mismatch: float  # Largest gap between the end storage of a block and the next boundary
+    solve_time: float  # Seconds for the whole decomposition
+    monolithic_objective: float = None  # Objective of the whole horizon solved at once, if requested
+    monolithic_time: float = None
+    gap: float = None  # (objective - monolithic_objective) / max(1, |monolithic_objective|)
+
+
+def required_storage(I, O, D_u, D_irr, D_hydro, S_min):
+    """Least storage at the end of each step from which model 4 stays feasible to the end of the horizon.
+
+    Every step must release at least max(D_u, D_irr, D_hydro) (R_u = D_u,
+    then R_irr and R_hydro top up the irrigation and hydropower demands) and
+    keep S >= S_min, so the storage must cover the worst cumulative deficit
+    ahead. Every feasible solution stays at or above these levels; where
+    they exceed K, or the first exceeds what S0 can reach, model 4 is
+    infeasible.
+    """
+    I, O, D_u, D_irr, D_hydro = np.broadcast_arrays(*(np.asarray(a, dtype=np.float64)
+                                                      for a in (I, O, D_u, D_irr, D_hydro)))
+    P = np.cumsum(np.maximum(np.maximum(D_u, D_irr), D_hydro) - (I - O))  # Cumulative deficit
+    ahead = np.maximum.accumulate(P[::-1])[::-1]  # Worst cumulative deficit from each step on
+    ahead = np.append(ahead[1:], -np.inf)
+    return S_min + np.maximum(0.0, ahead - P)
+
+
+def _solve_blocks(freq, K, S_min, tasks, backend):
+    # Worker task: solve (block, core length, parameters, storage floor, end target) tasks,
+    # one program per window length
+    from .matrix import assemble
+
+    programs = {}
+    out = []
+    for k, core, params, floor, target in tasks:
+        n = len(params["I"])
+        lp = programs.get(n)
+        if lp is None:
+            lp = programs[n] = assemble("model4", TimeAxis(n, freq), K=K, S_min=S_min, **params)
+        else:
+            lp.update(**params)
+        S = lp.blocks["S"]
+        lp.lb[S] = np.minimum(floor, K)
+        if target is not None:
+            lp.lb[S.start + core - 1] = lp.ub[S.start + core - 1] = target
+        result = lp.solve(backend=backend)
+        lp.lb[S], lp.ub[S] = 0.0, np.inf
+        out.append((k, result.status, {name: result.values[name][:core] for name in ("S",) + RELEASES}))
+    return out
+
+
+def solve_decomposed(axis, I, O, D_u, D_irr, D_hydro, K, S0, S_min, block_size=1000, overlap=None,
+                     method="coordination", targets=None, max_iter=None, tol=1e-6, max_workers=None,
+                     backend="scipy", monolithic=False):
+    """Solve model 4 over `axis` block by block and stitch the blocks together.
+
+    overlap (default: block_size // 4) is the look-ahead of each block for
+    "coordination"; boundaries are compared with a tolerance of tol * max(1,
+    K), and at most max_iter rounds are run (default: the number of blocks,
+    enough for the boundaries to settle one block per round). For "targets",
+    targets holds the storage at the end of every block but the last. Block
+    solves are spread over a process pool (max_workers=0: in the calling
+    process); backend is one of solvers.BACKENDS. monolithic=True also solves
+    the whole horizon at once and reports the gap. Returns a
+    DecompositionResult.
+    """
+    if method not in METHODS:
+        raise ValueError(f"unknown method {method!r}, expected one of {METHODS}")
+    start = time.perf_counter()
+    n_steps = len(axis)
+    series = {name: np.broadcast_to(np.asarray(a, dtype=np.float64), (n_steps,))
+              for name, a in zip(("I", "O", "D_u", "D_irr", "D_hydro"), (I, O, D_u, D_irr, D_hydro))}
+    starts = np.arange(0, n_steps, block_size)
+    ends = np.minimum(starts + block_size, n_steps)
+    n_blocks = len(starts)
+    if method == "targets":
+        if targets is None or len(targets) != n_blocks - 1:
+            raise ValueError(f"targets must hold the storage at the end of each of the first {n_blocks - 1} blocks")
+        overlap = 0
+        end_targets = list(np.asarray(targets, dtype=np.float64)) + [None]
+        boundaries = np.concatenate([[S0], targets]).astype(np.float64)
+        max_iter = 1
+    else:
+        overlap = block_size // 4 if overlap is None else overlap
+        end_targets = [None] * n_blocks
+        boundaries = np.full(n_blocks, float(S0))
+        max_iter = n_blocks if max_iter is None else max_iter
+
+    floor = required_storage(S_min=S_min, **series)
+    S, R_u, R_irr, R_hydro = (np.full(n_steps, np.nan) for _ in range(4))
+    first = S0 + series["I"][0] - series["O"][0] - max(series[d][0] for d in ("D_u", "D_irr", "D_hydro"))
+    if np.any(floor > K + tol * max(1.0, K)) or first < floor[0] - tol * max(1.0, K):
+        # No storage path can meet the demands: infeasible without solving any block
+        return DecompositionResult(S, R_u, R_irr, R_hydro, None, "Infeasible",
+                                   np.full(n_blocks, "Infeasible", dtype=object), boundaries, 0, 0, np.nan,
+                                   time.perf_counter() - start)
+
+    def task(k):
+        window = slice(starts[k], min(ends[k] + overlap, n_steps))
+        params = {name: values[window] for name, values in series.items()}
+        params["S0"] = boundaries[k]
+        return k, ends[k] - starts[k], params, floor[window], end_targets[k]
+
+    trajectories = {"S": S, "R_u": R_u, "R_irr": R_irr, "R_hydro": R_hydro}
+    block_status = np.full(n_blocks, "Not Solved", dtype=object)
+    pending = list(range(n_blocks))
+    iterations = n_solves = 0
+    workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers and n_blocks > 1 else None
+    try:
+        while pending and iterations < max_iter:
+            tasks = [task(k) for k in pending]
+            if pool is None:
+                solved = _solve_blocks(axis.freq, K, S_min, tasks, backend)
+            else:
+                size = -(-len(tasks) // workers)
+                futures = [pool.submit(_solve_blocks, axis.freq, K, S_min, tasks[i:i + size], backend)
+                           for i in range(0, len(tasks), size)]
+                solved = [block for future in futures for block in future.result()]
+            iterations += 1
+            n_solves += len(tasks)
+            for k, status, values in solved:
+                block_status[k] = status
+                for name, out in trajectories.items():
+                    out[starts[k]:ends[k]] = values[name]
+            # Boundaries: the end storage of the block before, where that block solved
+            pending = []
+            for k in range(1, n_blocks):
+                end = S[ends[k - 1] - 1]
+                if method == "coordination" and np.isfinite(end) and abs(end - boundaries[k]) > tol * max(1.0, K):
+                    boundaries[k] = end
+                    pending.append(k)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    mismatch = float(np.max(np.abs(S[ends[:-1] - 1] - boundaries[1:]), initial=0.0))
+    solved = np.all(block_status == "Optimal")
+    ok = solved and mismatch <= tol * max(1.0, K)
+    demand = sum(series[d].sum() for d in ("D_u", "D_irr", "D_hydro"))
+    objective = float(demand - R_u.sum() - R_irr.sum() - R_hydro.sum()) if solved else None
+    result = DecompositionResult(S, R_u, R_irr, R_hydro, objective, "Optimal" if ok else "Not Solved", block_status,
+                                 boundaries, iterations, n_solves, mismatch, time.perf_counter() - start)
+    if monolithic:
+        from .matrix import assemble
+
+        mono_start = time.perf_counter()
+        whole = assemble("model4", axis, K=K, S0=S0, S_min=S_min, **series).solve(backend=backend)
+        result.monolithic_time = time.perf_counter() - mono_start
+        result.monolithic_objective = whole.objective
+        if whole.objective is not None and objective is not None:
+            result.gap = (objective - whole.objective) / max(1.0, abs(whole.objective))
+    return result
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Benefits of the releases and opportunity costs of the spills
+
+The economics of simulation.py and of the model 5 objective in one place.
+Every term is linear in the trajectories:
+
+    BR_urban   = (Economic_Value_Water - Cost_Treatment) * R_u
+    BR_irr     = crop revenue - Irrigation_Costs * R_irr
+    BR_hydro   = (Electricity_Produced * Price_Electricity - Hydropower_Operation_Costs) * R_hydro
+    C_sp_urb   = Economic_Value_Water * Spill_Share_Urban * Spills
+    C_sp_irr   = Irrigation_Costs * Spill_Share_Irrigation * Spills
+    C_sp_hydro = Electricity_Produced * Price_Electricity * Spill_Share_Hydropower * Spills
+                 + Spill_Hydropower_Operation * Hydropower_Operation_Costs * R_hydro
+
+so the same coefficients give the objective of model 5 (formulations.py,
+matrix.py, joint.py) and the per-step values of simulated trajectories of
+any shape, e.g. [scenario, node, time]. Each output is a scaled copy of one
+input, written straight into its own array, and the totals per trajectory
+are weighted sums of the inputs, so post-processing runs at memory speed.
+"""
+
+from dataclasses import dataclass, fields
+
+import numpy as np
+
+from .parameters import MODEL5_DEFAULTS
+
+TERMS = ("BR_urban", "BR_irr", "BR_hydro", "C_sp_urb", "C_sp_irr", "C_sp_hydro")
+
+
+@dataclass(frozen=True)
+class Economics:
+    """Unit values and costs; the defaults are those of model 5 (parameters.MODEL5_DEFAULTS)."""
+    Economic_Value_Water: float = MODEL5_DEFAULTS["Economic_Value_Water"]  # $/m^3
+    Cost_Treatment: float = MODEL5_DEFAULTS["Cost_Treatment"]  # $/m^3
+    Crop_Revenue: float = MODEL5_DEFAULTS["Crop_Revenue"]  # $ per trajectory
+    Irrigation_Costs: float = MODEL5_DEFAULTS["Irrigation_Costs"]  # $/m^3
+    Electricity_Produced: float = MODEL5_DEFAULTS["Electricity_Produced"]  # kWh/m^3
+    Price_Electricity: float = MODEL5_DEFAULTS["Price_Electricity"]  # $/kWh
+    Hydropower_Operation_Costs: float = MODEL5_DEFAULTS["Hydropower_Operation_Costs"]  # $/m^3
+    PenaltyRate: float = MODEL5_DEFAULTS["PenaltyRate"]  # $ per environmental flow violation
+    Spill_Share_Urban: float = MODEL5_DEFAULTS["Spill_Share_Urban"]
+    Spill_Share_Irrigation: float = MODEL5_DEFAULTS["Spill_Share_Irrigation"]
+    Spill_Share_Hydropower: float = MODEL5_DEFAULTS["Spill_Share_Hydropower"]
+    Spill_Hydropower_Operation: float = MODEL5_DEFAULTS["Spill_Hydropower_Operation"]
+
+    @classmethod
+    def from_params(cls, params):
+        """The economics of a parameter dict (e.g. the prepared parameters of model 5)."""
+        return cls(**{f.name: float(params[f.name]) for f in fields(cls) if f.name in params})
+
+    def coefficients(self):
+        """Coefficient of each variable in the net benefits BR - C_sp - C_EF (the model 5 objective).
+
+        The objective constant is Crop_Revenue.
+        """
+        hydropower_value = self.Electricity_Produced * self.Price_Electricity
+        return {
+            "R_u": self.Economic_Value_Water - self.Cost_Treatment,
+            "R_irr": -self.Irrigation_Costs,
+            "R_hydro": hydropower_value - (1 + self.Spill_Hydropower_Operation) * self.Hydropower_Operation_Costs,
+            "Sp": -(self.Economic_Value_Water * self.Spill_Share_Urban
+                    + self.Irrigation_Costs * self.Spill_Share_Irrigation
+                    + hydropower_value * self.Spill_Share_Hydropower),
+            "EF_violation": -self.PenaltyRate,
+        }
+
+    def evaluate(self, R_u, R_irr, R_hydro, Spills, crop_revenue=0.0):
+        """Benefits and costs of every step, as a dict of the TERMS arrays.
+
+        The trajectories may have any (common) shape, e.g. [scenario, node,
+        time]; float32 inputs give float32 outputs. crop_revenue is added to
+        BR_irr at every step (simulation.py: Crop_Sales * Crop_Yields per
+        month) and broadcasts against the trajectories.
+        """
+        R_u, R_irr, R_hydro, Spills = (np.asarray(a) for a in (R_u, R_irr, R_hydro, Spills))
+        dtype = np.result_type(R_u, R_irr, R_hydro, Spills, np.float32)
+        hydropower_value = self.Electricity_Produced * self.Price_Electricity
+
+        def term(x, coef):
+            return np.multiply(x, dtype.type(coef), out=np.empty(x.shape, dtype), casting="unsafe")
+
+        out = {
+            "BR_urban": term(R_u, self.Economic_Value_Water - self.Cost_Treatment),
+            "BR_irr": term(R_irr, -self.Irrigation_Costs),
+            "BR_hydro": term(R_hydro, hydropower_value - self.Hydropower_Operation_Costs),
+            "C_sp_urb": term(Spills, self.Economic_Value_Water * self.Spill_Share_Urban),
+            "C_sp_irr": term(Spills, self.Irrigation_Costs * self.Spill_Share_Irrigation),
+            "C_sp_hydro": term(Spills, hydropower_value * self.Spill_Share_Hydropower),
+        }
+        if np.any(crop_revenue):
+            out["BR_irr"] += np.asarray(crop_revenue, dtype=dtype)
+        if self.Spill_Hydropower_Operation:
+            out["C_sp_hydro"] += term(R_hydro, self.Spill_Hydropower_Operation * self.Hydropower_Operation_Costs)
+        return out
+
+    def net_benefits(self, R_u, R_irr, R_hydro, Spills, EF_violation=None, axis=-1):
+        """Total BR - C_sp - C_EF of each trajectory (summed over `axis`), as in the model 5 objective.
+
+        Crop_Revenue is counted once per trajectory. Only the sums of the
+        trajectories are formed, no per-step arrays.
+        """
+        c = self.coefficients()
+        total = (c["R_u"] * np.sum(R_u, axis=axis) + c["R_irr"] * np.sum(R_irr, axis=axis)
+                 + c["R_hydro"] * np.sum(R_hydro, axis=axis) + c["Sp"] * np.sum(Spills, axis=axis))
+        if EF_violation is not None:
+            total = total + c["EF_violation"] * np.sum(EF_violation, axis=axis)
+        return total + self.Crop_Revenue
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized water-balance engine
+
+The same monthly water balance and urban -> irrigation -> hydropower priority
+cascade as simulation.py, evaluated on NumPy arrays. Time series are shaped
+[n_scenarios, n_steps]; only the recursion in time is sequential, every step
+is computed for all scenarios at once.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class SimulationResult:
+    """Trajectories of a simulation run, each shaped [n_scenarios, n_steps]."""
+    S: np.ndarray  # Storage at the end of each step
+    R_u: np.ndarray  # Releases for urban use
+    R_irr: np.ndarray  # Releases for agricultural use
+    R_hydro: np.ndarray  # Releases for hydropower use
+    Spills: np.ndarray  # Spills from the reservoir
+
+
+def _as_series(*arrays):
+    # Broadcast time series to a common [n_scenarios, n_steps] shape
+    arrays = [np.atleast_2d(np.asarray(a, dtype=np.float64)) for a in arrays]
+    return np.broadcast_arrays(*arrays)
+
+
+def _as_scenario_param(value, n_scenarios):
+    # Scalars (K, S0, S_min) may be given once or per scenario
+    return np.broadcast_to(np.asarray(value, dtype=np.float64).reshape(-1), (n_scenarios,))
+
+
+def simulate_batch(I, O, D_u, D_irr, D_hydro, K, S0, S_min):
+    """Run the water-balance simulation for a batch of scenarios.
+
+    I, O, D_u, D_irr and D_hydro are arrays of shape [n_steps] (shared by all
+    scenarios) or [n_scenarios, n_steps]. K, S0 and S_min are scalars or
+    arrays of shape [n_scenarios]. If every time series is 1-D the result is
+    returned 1-D as well.
+
+    The arithmetic follows the loop in simulation.py operation by operation,
+    so on the built-in example the results are identical to the last bit.
+    """
+    squeeze = all(np.ndim(a) <= 1 for a in (I, O, D_u, D_irr, D_hydro))
+    I, O, D_u, D_irr, D_hydro = _as_series(I, O, D_u, D_irr, D_hydro)
+    n_scenarios, n_steps = I.shape
+    K = _as_scenario_param(K, n_scenarios)
+    S_min = _as_scenario_param(S_min, n_scenarios)
+    s = _as_scenario_param(S0, n_scenarios).copy()
+
+    # Work in time-major buffers, so that each step touches contiguous memory
+    S = np.empty((n_steps, n_scenarios))
+    R_u = np.empty((n_steps, n_scenarios))
+    R_irr = np.empty((n_steps, n_scenarios))
+    R_hydro = np.empty((n_steps, n_scenarios))
+    Spills = np.empty((n_steps, n_scenarios))
+    I, O = I.T, O.T
+    D_u, D_irr, D_hydro = D_u.T, D_irr.T, D_hydro.T
+
+    for t in range(n_steps):
+        # Storage balance equation
+        s = s + I[t] - O[t]
+
+        # Urban releases (meet urban demand first)
+        np.minimum(s, D_u[t], out=R_u[t])
+        s -= R_u[t]
+
+        # Agricultural releases (if any surplus is available)
+        np.minimum(s, D_irr[t], out=R_irr[t])
+        s -= R_irr[t]
+
+        # Hydropower releases (if any surplus is available)
+        np.minimum(s, D_hydro[t], out=R_hydro[t])
+        s -= R_hydro[t]
+
+        # Spills and storage capacity constraints
+        np.maximum(0, s - K, out=Spills[t])
+        s = np.minimum(np.maximum(S_min, s), K)
+        S[t] = s
+
+    result = SimulationResult(S.T, R_u.T, R_irr.T, R_hydro.T, Spills.T)
+    if squeeze:
+        result = SimulationResult(*(a[0] for a in (result.S, result.R_u, result.R_irr,
+                                                  result.R_hydro, result.Spills)))
+    return result
+
+
+def simulate_chunks(I, O, D_u, D_irr, D_hydro, K, S0, S_min, chunk_size=1000):
+    """Simulate a large inflow ensemble chunk by chunk.
+
+    I is shaped [n_scenarios, n_steps] and may be a memory-mapped array (see
+    loaders.load_series), or the path of a .npy file or of a Parquet file
+    with one row per scenario (see loaders.iter_chunks); the other arguments
+    are as for simulate_batch and must be shared by all scenarios. Yields
+    (start, SimulationResult) for scenarios start .. start + chunk_size - 1,
+    so only one chunk of inflows and results is held in memory at a time.
+    """
+    from .loaders import iter_chunks
+
+    for start, I_chunk in iter_chunks(I, chunk_size):
+        yield start, simulate_batch(I_chunk, O, D_u, D_irr, D_hydro, K, S0, S_min)
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Stochastic inflow ensembles and Monte Carlo reliability analysis
+
+Synthetic inflow traces are drawn from a seeded lognormal or (log-space)
+Thomas-Fiering model fitted to a historical series, run through the water
+balance in chunks spread over a process pool, and reduced on the fly to
+reliability, resilience and vulnerability statistics per demand class.
+"""
+
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+
+import numpy as np
+
+from .engine import simulate_batch
+from .kernel import HAVE_NUMBA, simulate_compiled
+
+DEMAND_CLASSES = ("urban", "irrigation", "hydropower")
+
+_simulate = simulate_compiled if HAVE_NUMBA else simulate_batch
+
+
+def _by_season(historical, period):
+    # Reshape a historical series to [n_years, period], starting at season 1
+    q = np.asarray(historical, dtype=np.float64)
+    if q.ndim != 1 or q.size % period or q.size < 2 * period:
+        raise ValueError(f"historical series must cover at least two whole cycles of {period} steps")
+    if np.any(q <= 0):
+        raise ValueError("historical inflows must be positive to fit a log-space model")
+    return np.log(q).reshape(-1, period)
+
+
+@dataclass
+class LognormalInflows:
+    """Independent lognormal inflows with seasonal (e.g. monthly) parameters."""
+    mu: np.ndarray  # Mean of log inflows per season
+    sigma: np.ndarray  # Standard deviation of log inflows per season
+
+    @classmethod
+    def fit(cls, historical, period=12):
+        logq = _by_season(historical, period)
+        return cls(logq.mean(axis=0), logq.std(axis=0, ddof=1))
+
+    def sample(self, rng, n_traces, n_steps):
+        season = np.arange(n_steps) % len(self.mu)
+        z = rng.standard_normal((n_traces, n_steps))
+        return np.exp(self.mu[season] + self.sigma[season] * z)
+
+
+@dataclass
+class ThomasFieringInflows:
+    """Thomas-Fiering lag-1 seasonal model, fitted on log inflows."""
+    mu: np.ndarray  # Mean of log inflows per season
+    sigma: np.ndarray  # Standard deviation of log inflows per season
+    rho: np.ndarray  # Correlation between season j and season j + 1
+
+    @classmethod
+    def fit(cls, historical, period=12):
+        logq = _by_season(historical, period)
+        mu, sigma = logq.mean(axis=0), logq.std(axis=0, ddof=1)
+        # Pairs (season j, season j + 1), wrapping December into the next January
+        flat = logq.reshape(-1)
+        current, following = flat[:-1], flat[1:]
+        seasons = np.arange(current.size) % period
+        rho = np.empty(period)
+        for j in range(period):
+            rho[j] = np.corrcoef(current[seasons == j], following[seasons == j])[0, 1]
+        return cls(mu, sigma, np.clip(np.nan_to_num(rho), -0.99, 0.99))
+
+    def sample(self, rng, n_traces, n_steps):
+        period = len(self.mu)
+        z = rng.standard_normal((n_steps, n_traces))
+        logq = np.empty((n_steps, n_traces))
+        logq[0] = self.mu[0] + self.sigma[0] * z[0]
+        for t in range(1, n_steps):
+            j, k = (t - 1) % period, t % period
+            b = self.rho[j] * self.sigma[k] / self.sigma[j]
+            logq[t] = (self.mu[k] + b * (logq[t - 1] - self.mu[j])
+                       + z[t] * self.sigma[k] * np.sqrt(1 - self.rho[j] ** 2))
+        return np.exp(logq.T)
+
+
+@dataclass
+class EnsembleStats:
+    """Reliability, resilience and vulnerability of one demand class over the ensemble."""
+    reliability: float  # Share of steps with the demand fully met
+    resilience: float  # Probability that a failure step is followed by a success
+    vulnerability: float  # Mean relative shortage (D - R) / D over failure steps
+    n_failures: int  # Number of failure steps over all traces
+
+
+def _failure_counts(D, R, tol):
+    # Partial sums for one chunk: failures, recoveries and relative shortage
+    D = np.broadcast_to(D, R.shape)
+    fail = R < D - tol
+    recover = fail[:, :-1] & ~fail[:, 1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shortage = np.where(fail, (D - R) / D, 0.0)
+    return np.array([fail.sum(), recover.sum(), fail[:, :-1].sum(), shortage.sum()]), fail.mean(axis=1)
+
+
+def _run_chunk(inflow_model, seed, n_traces, n_steps, O, D_u, D_irr, D_hydro, K, S0, S_min, tol):
+    # Worker task: generate one chunk of traces, simulate it and reduce it
+    rng = np.random.default_rng(seed)
+    I = inflow_model.sample(rng, n_traces, n_steps)
+    result = _simulate(I, O, D_u, D_irr, D_hydro, K, S0, S_min)
+    counts, trace_reliability = [], []
+    for D, R in ((D_u, result.R_u), (D_irr, result.R_irr), (D_hydro, result.R_hydro)):
+        c, f = _failure_counts(np.asarray(D, dtype=np.float64), R, tol)
+        counts.append(c)
+        trace_reliability.append(1 - f)
+    return np.array(counts), np.column_stack(trace_reliability)
+
+
+def run_ensemble(inflow_model, n_traces, n_steps, O, D_u, D_irr, D_hydro, K, S0, S_min,
+                 seed=None, chunk_size=1000, max_workers=None, on_chunk=None, tol=1e-9):
+    """Simulate n_traces synthetic inflow traces and aggregate reliability statistics.
+
+    inflow_model is a fitted LognormalInflows or ThomasFieringInflows. O and the
+    demands are arrays of length n_steps (or broadcastable to it). Traces are
+    generated inside the workers, chunk by chunk, from seeds spawned off `seed`,
+    so the result does not depend on max_workers. At most two chunks per worker
+    are in flight, and only per-trace reliabilities come back, so memory stays
+    bounded whatever n_traces is. on_chunk(first_trace, trace_reliability) is
+    called as each chunk completes, with trace_reliability shaped [chunk, 3].
+    max_workers=0 runs everything in the calling process.
+
+    Returns a dict mapping each demand class to its EnsembleStats.
+    """
+    n_chunks = -(-n_traces // chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    tasks = [(seeds[c], min(chunk_size, n_traces - c * chunk_size)) for c in range(n_chunks)]
+    args = (n_steps, O, D_u, D_irr, D_hydro, K, S0, S_min, tol)
+    totals = np.zeros((len(DEMAND_CLASSES), 4))
+
+    def collect(c, counts, trace_reliability):
+        totals[:] += counts
+        if on_chunk is not None:
+            on_chunk(c * chunk_size, trace_reliability)
+
+    if max_workers == 0:
+        for c, (chunk_seed, n) in enumerate(tasks):
+            collect(c, *_run_chunk(inflow_model, chunk_seed, n, *args))
+    else:
+        max_in_flight = 2 * (max_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            pending, next_task = {}, 0
+            while next_task < len(tasks) or pending:
+                while next_task < len(tasks) and len(pending) < max_in_flight:
+                    chunk_seed, n = tasks[next_task]
+                    pending[pool.submit(_run_chunk, inflow_model, chunk_seed, n, *args)] = next_task
+                    next_task += 1
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(pending.pop(future), *future.result())
+
+    n_total = n_traces * n_steps
+    stats = {}
+    for name, (n_fail, n_recover, n_fail_before_last, shortage) in zip(DEMAND_CLASSES, totals):
+        stats[name] = EnsembleStats(
+            reliability=float(1 - n_fail / n_total),
+            resilience=float(n_recover / n_fail_before_last) if n_fail_before_last else 1.0,
+            vulnerability=float(shortage / n_fail) if n_fail else 0.0,
+            n_failures=int(n_fail),
+        )
+    return stats
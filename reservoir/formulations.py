@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""
+Reusable PuLP formulations of models 1-5
+
+Each model is built once for a time axis. Inflows, demands, capacities and
+the initial storage only appear on the right-hand side of its constraints, so
+update() rewrites those values in place and solve() can be called again
+without rebuilding the problem.
+"""
+
+import time
+
+import numpy as np
+import pulp
+
+from .economics import Economics
+from .parameters import (LABELS, SHORTAGE_BOUND, SPECS, SUMMER_MONTHS, objective_constant, prepare_params,
+                         right_hand_sides)
+from .results import SolveResult
+from .solvers import solve_problem
+
+SENSES = {"==": pulp.LpConstraintEQ, "<=": pulp.LpConstraintLE, ">=": pulp.LpConstraintGE}
+
+
+class ReservoirModel:
+    """Base class of the formulations: a PuLP problem built once, re-solved many times."""
+    name = None  # Formulation ID, also the key of its parameters in parameters.SPECS
+    version = 1  # Increase when the formulation changes
+    sense = pulp.LpMinimize
+
+    def __init__(self, axis, **params):
+        self.axis = axis
+        self.n_steps = len(axis)
+        self.summer = axis.in_months(*SUMMER_MONTHS)
+        self.params = prepare_params(self.name, self.n_steps, params)
+        self._build()
+
+    def _structure(self):
+        # Anything in the parameters that changes the set of constraints
+        return None
+
+    def _build(self):
+        start = time.perf_counter()
+        self.problem = pulp.LpProblem(f"Reservoir_Optimization_{self.name}", self.sense)
+        self.variables = {}
+        self._rows = {}
+        self._formulate()
+        self._set_rhs()
+        self._solved = False
+        self.build_time = time.perf_counter() - start
+
+    def _variables(self, *names, cat="Continuous", upBound=None):
+        lowBound = None if cat == "Binary" else 0
+        for name in names:
+            self.variables[name] = [pulp.LpVariable(f"{LABELS[name]}_{t}", lowBound=lowBound, upBound=upBound,
+                                                    cat=cat)
+                                    for t in range(self.n_steps)]
+        return [self.variables[name] for name in names]
+
+    def _constraint(self, group, t, expr, sense):
+        # Constraint `expr <sense> rhs`, with the rhs filled in by _set_rhs
+        name, k = f"{group}_{t}", 1
+        while name in self.problem.constraints:
+            name, k = f"{group}_{t}_{k}", k + 1
+        c = pulp.LpConstraint(expr, sense=SENSES[sense], name=name)
+        self.problem += c
+        self._rows.setdefault(group, []).append((t, c))
+
+    def _balance(self, S, outflows):
+        # S[t] - S[t-1] + outflows[t] == rhs[t]; the initial storage goes to the rhs of t = 0
+        for t in range(self.n_steps):
+            expr = S[t] + pulp.lpSum(x[t] for x in outflows)
+            if t > 0:
+                expr -= S[t - 1]
+            self._constraint("balance", t, expr, "==")
+
+    def _set_rhs(self):
+        rhs = right_hand_sides(self.name, self.params, self.summer)
+        for group, rows in self._rows.items():
+            values = rhs[group]
+            for t, c in rows:
+                c.changeRHS(float(values[t]))
+
+    def update(self, **params):
+        """Change parameters in place; the model is rebuilt only if its structure changes."""
+        structure = self._structure()
+        self.params = prepare_params(self.name, self.n_steps, params, current=self.params)
+        if self._structure() != structure:
+            self._build()
+        else:
+            self._set_rhs()
+
+    def solve(self, solver=None, warm_start=True, threads=None, time_limit=None, backend="cbc", mip_gap=None):
+        """Solve the model and return a SolveResult.
+
+        backend is one of solvers.BACKENDS ("cbc", "highs", "scipy"); its log
+        is captured in the result. With CBC and warm_start=True, the previous
+        solution is passed to CBC as a MIP start for the next solve
+        (benchmarks/bench_builder.py compares warm and cold re-solves).
+        threads, time_limit (in seconds) and mip_gap (relative) are passed to
+        the backend. A PuLP solver object given as `solver` is used instead.
+        """
+        start = time.perf_counter()
+        run = None
+        if solver is not None:
+            self.problem.solve(solver)
+        else:
+            run = solve_problem(self.problem, backend, time_limit, mip_gap, threads,
+                                warm_start=warm_start and self._solved)
+        solve_time = time.perf_counter() - start
+        self._solved = True
+        status = pulp.LpStatus[self.problem.status]
+        values = {name: np.array([np.nan if v.varValue is None else v.varValue for v in variables])
+                  for name, variables in self.variables.items()}
+        objective = pulp.value(self.problem.objective) if status == "Optimal" else None
+        if run is None:
+            return SolveResult(self.name, status, objective, values, self.build_time, solve_time)
+        return SolveResult(self.name, status, objective, values, self.build_time, solve_time, run.backend,
+                           run.iterations, run.nodes, run.log)
+
+
+class MinShortageModel(ReservoirModel):
+    """Model 1: maximum storage, with all demands met."""
+    name = "model1"
+    sense = pulp.LpMaximize
+
+    def _formulate(self):
+        S, R_u, R_irr, R_hydro = self._variables("S", "R_u", "R_irr", "R_hydro")
+        self.problem += pulp.lpSum(S)
+        self._balance(S, (R_u, R_irr, R_hydro))
+        for t in range(self.n_steps):
+            self._constraint("capacity", t, S[t], "<=")
+            self._constraint("urban", t, R_u[t], ">=")
+            self._constraint("irrigation", t, R_irr[t], ">=")
+            self._constraint("hydropower", t, R_hydro[t], ">=")
+
+
+class MinShortagePrioritiesModel(MinShortageModel):
+    """Model 2: maximum storage, with releases prioritized urban -> irrigation -> hydropower."""
+    name = "model2"
+
+    def _structure(self):
+        p = self.params
+        return tuple((p[d] > 0).tobytes() for d in ("D_u", "D_irr", "D_hydro"))
+
+    def _formulate(self):
+        p = self.params
+        S, R_u, R_irr, R_hydro = self._variables("S", "R_u", "R_irr", "R_hydro")
+        self.problem += pulp.lpSum(S)
+        self._balance(S, (R_u, R_irr, R_hydro))
+        for t in range(self.n_steps):
+            self._constraint("capacity", t, S[t], "<=")
+
+            # Priority 1: Urban demand
+            if p["D_u"][t] > 0:
+                self._constraint("urban", t, R_u[t], "==")
+                self._constraint("zero", t, R_irr[t] - S[t] + R_u[t], "<=")
+                self._constraint("zero", t, R_hydro[t] - S[t] + R_u[t], "<=")
+            else:
+                for x in (R_u, R_irr, R_hydro):
+                    self._constraint("zero", t, x[t], "==")
+
+            # Priority 2: Agricultural demand (minimum 40% coverage in summer)
+            if p["D_irr"][t] > 0:
+                self._constraint("irrigation", t, R_irr[t], "==")
+                self._constraint("zero", t, R_hydro[t] - S[t] + R_u[t] + R_irr[t], "<=")
+            else:
+                self._constraint("zero", t, R_irr[t], "==")
+
+            # Priority 3: Hydropower demand
+            if p["D_hydro"][t] > 0:
+                self._constraint("zero", t, R_hydro[t] - S[t] + R_u[t] + R_irr[t], "<=")
+            else:
+                self._constraint("zero", t, R_hydro[t], "==")
+
+
+class MaxReleasesPrioritiesModel(ReservoirModel):
+    """Model 3: maximum total releases, prioritized with binary variables, storage pinned to S_min."""
+    name = "model3"
+    sense = pulp.LpMaximize
+
+    def _formulate(self):
+        S, R_u, R_irr, R_hydro = self._variables("S", "R_u", "R_irr", "R_hydro")
+        U, A, H = self._variables("Urban_Priority", "Agricultural_Priority", "Hydropower_Priority",
+                                  cat="Binary")
+        self.problem += pulp.lpSum(R_u) + pulp.lpSum(R_irr) + pulp.lpSum(R_hydro)
+        self._balance(S, (R_u, R_irr, R_hydro))
+        for t in range(self.n_steps):
+            self._constraint("minimum_storage", t, S[t], "==")
+            self._constraint("capacity", t, S[t], "<=")
+            # R >= D - (1 - priority), written as R - priority >= D - 1
+            self._constraint("urban", t, R_u[t] - U[t], ">=")
+            self._constraint("zero", t, R_irr[t], "==")
+            self._constraint("zero", t, R_hydro[t], "==")
+            self._constraint("irrigation", t, R_irr[t] - A[t], ">=")
+            self._constraint("irrigation_max", t, R_irr[t], "<=")
+            self._constraint("hydropower", t, R_hydro[t] - H[t], ">=")
+            self._constraint("hydropower_max", t, R_hydro[t], "<=")
+
+
+class MaxReleasesShortageModel(ReservoirModel):
+    """Model 3 as an LP: the priority binaries become shortages (at most SHORTAGE_BOUND) with tiered penalties."""
+    name = "model3_lp"
+    sense = pulp.LpMaximize
+
+    def _structure(self):
+        # The weights are objective coefficients
+        return tuple(self.params[name] for name in SPECS[self.name].defaults)
+
+    def _formulate(self):
+        p = self.params
+        S, R_u, R_irr, R_hydro = self._variables("S", "R_u", "R_irr", "R_hydro")
+        U, A, H = self._variables("Short_u", "Short_irr", "Short_hydro", upBound=SHORTAGE_BOUND)
+        self.problem += (pulp.lpSum(R_u) + pulp.lpSum(R_irr) + pulp.lpSum(R_hydro)
+                         - p["Weight_Urban"] * pulp.lpSum(U) - p["Weight_Irrigation"] * pulp.lpSum(A)
+                         - p["Weight_Hydropower"] * pulp.lpSum(H))
+        self._balance(S, (R_u, R_irr, R_hydro))
+        for t in range(self.n_steps):
+            self._constraint("minimum_storage", t, S[t], "==")
+            self._constraint("capacity", t, S[t], "<=")
+            # R + shortage >= D
+            self._constraint("urban", t, R_u[t] + U[t], ">=")
+            self._constraint("zero", t, R_irr[t], "==")
+            self._constraint("zero", t, R_hydro[t], "==")
+            self._constraint("irrigation", t, R_irr[t] + A[t], ">=")
+            self._constraint("irrigation_max", t, R_irr[t], "<=")
+            self._constraint("hydropower", t, R_hydro[t] + H[t], ">=")
+            self._constraint("hydropower_max", t, R_hydro[t], "<=")
+
+
+class MinUnmetDemandModel(ReservoirModel):
+    """Model 4: minimum unmet demand, urban demand always met."""
+    name = "model4"
+    sense = pulp.LpMinimize
+
+    def _formulate(self):
+        S, R_u, R_irr, R_hydro = self._variables("S", "R_u", "R_irr", "R_hydro")
+        # Unmet demand sum(D - R): the demand total is the objective constant, set in _set_rhs
+        self.problem += -(pulp.lpSum(R_u) + pulp.lpSum(R_irr) + pulp.lpSum(R_hydro))
+        self._balance(S, (R_u, R_irr, R_hydro))
+        for t in range(self.n_steps):
+            self._constraint("minimum_storage", t, S[t], ">=")
+            self._constraint("capacity", t, S[t], "<=")
+            self._constraint("urban", t, R_u[t], "==")
+            self._constraint("irrigation", t, R_irr[t] + R_u[t], ">=")
+            self._constraint("hydropower", t, R_hydro[t] + R_u[t] + R_irr[t], ">=")
+
+    def _set_rhs(self):
+        super()._set_rhs()
+        self.problem.objective.constant = objective_constant(self.name, self.params)
+
+
+class BenefitsCostsModel(ReservoirModel):
+    """Model 5: maximum net benefits of releases, minus spill and environmental-flow costs."""
+    name = "model5"
+    sense = pulp.LpMaximize
+
+    def _structure(self):
+        # The objective coefficients are built into the model
+        return tuple(self.params[name] for name in SPECS[self.name].defaults)
+
+    def _violation(self):
+        (V,) = self._variables("EF_violation", cat="Binary")
+        return V
+
+    def _formulate(self):
+        p = self.params
+        S, Sp, EF, R_u, R_irr, R_hydro = self._variables("S", "Sp", "EF", "R_u", "R_irr", "R_hydro")
+        V = self._violation()
+
+        # Benefits from releases, minus the spill costs and the environmental flow penalty
+        c = Economics.from_params(p).coefficients()
+        self.problem += (c["R_u"] * pulp.lpSum(R_u) + c["R_irr"] * pulp.lpSum(R_irr)
+                         + c["R_hydro"] * pulp.lpSum(R_hydro) + c["Sp"] * pulp.lpSum(Sp)
+                         + c["EF_violation"] * pulp.lpSum(V) + p["Crop_Revenue"])
+
+        for t in range(self.n_steps):
+            self._constraint("environmental_flow", t, EF[t] + V[t], ">=")
+        self._balance(S, (R_u, R_irr, R_hydro, Sp, EF))
+        for t in range(self.n_steps):
+            self._constraint("capacity", t, S[t], "<=")
+            self._constraint("urban", t, R_u[t], "==")
+            self._constraint("irrigation", t, R_irr[t], "==")
+            self._constraint("hydropower", t, R_hydro[t], "==")
+            self._constraint("spill", t, Sp[t], "<=")
+
+
+class BenefitsCostsShortageModel(BenefitsCostsModel):
+    """Model 5 as an LP: the environmental-flow violation binary becomes a shortage with a per-unit penalty."""
+    name = "model5_lp"
+
+    def _violation(self):
+        (V,) = self._variables("EF_shortage", upBound=SHORTAGE_BOUND)
+        return V
+
+
+FORMULATIONS = {cls.name: cls for cls in (MinShortageModel, MinShortagePrioritiesModel,
+                                          MaxReleasesPrioritiesModel, MinUnmetDemandModel,
+                                          BenefitsCostsModel, MaxReleasesShortageModel,
+                                          BenefitsCostsShortageModel)}
+
+
+def build_model(name, axis, **params):
+    """Build formulation `name` ("model1" ... "model5", "model3_lp", "model5_lp") on a time axis."""
+    try:
+        cls = FORMULATIONS[name]
+    except KeyError:
+        raise ValueError(f"unknown formulation {name!r}, expected one of {sorted(FORMULATIONS)}") from None
+    return cls(axis, **params)
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Joint optimization of a network of reservoirs
+
+Generalizes the model 4 (minimum unmet demand) and model 5 (benefits and
+costs) formulations of reservoir.matrix to the reservoirs of a
+reservoir.network.Network. Every variable is indexed by (node, t), stored
+node-major in its block, and every reservoir's water balance gains the
+routed outflows of the reservoirs upstream:
+
+    S[i, t] - S[i, t-1] + outflows[i, t] - sum_j f[j, i] * outflows[j, t] = rhs[i, t]
+
+where f[j, i] is the fraction of node j's outflow routed to node i (times
+the return share of each release). Each constraint group is a handful of
+sparse blocks (identities, a lag operator, and kron(routing, identity)), so
+nothing is looped over nodes or time steps in Python.
+"""
+
+import copy
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from scipy import sparse
+
+from .economics import Economics
+from .matrix import BINARY, BLOCKS, LinearProgram
+from .network import DEMAND, RESERVOIR, Network
+from .parameters import MODEL5_DEFAULTS
+
+
+# Reservoir parameters that NetworkProgram.update accepts (besides the model 5 economics)
+PARAMETERS = {
+    "model4": ("K", "S0", "S_min", "I", "O", "D_u", "D_irr", "D_hydro", "return_flows"),
+    "model5": ("K", "S0", "S_min", "I", "O", "D_u", "D_irr", "D_hydro", "return_flows", "E", "P", "MinEF"),
+}
+
+
+@dataclass
+class NetworkProgram(LinearProgram):
+    """A joint formulation in matrix form; solution values are shaped [n_nodes, n_steps]."""
+    nodes: list = None  # Reservoir names, in the order of the rows
+    network: Network = None  # Copy of the Network it was assembled from
+    economics: dict = None  # Overrides of parameters.MODEL5_DEFAULTS
+
+    def split(self, x):
+        return {name: x[s].reshape(len(self.nodes), self.n_steps) for name, s in self.blocks.items()}
+
+    def update(self, **params):
+        """Change reservoir parameters; only b_ub, b_eq and c0 are recomputed unless the structure changes.
+
+        Each value is a dict {reservoir name: value}, a scalar shared by all
+        reservoirs, or one value per reservoir in the order of `nodes` (shaped
+        [n_nodes] for K, S0 and S_min, [n_nodes, n_steps] or [n_nodes] for the
+        time series); a single (urban, irrigation, hydropower) return_flows is
+        shared by all reservoirs. return_flows and the economic parameters
+        (model 5) are in the matrix or the objective, so changing them
+        assembles the program again.
+        """
+        allowed = PARAMETERS[self.name] + (tuple(MODEL5_DEFAULTS) if self.name == "model5" else ())
+        unknown = sorted(set(params) - set(allowed))
+        if unknown:
+            raise ValueError(f"unknown parameters {unknown} for {self.name}, expected some of {allowed}")
+        economics = {key: params.pop(key) for key in list(params) if key in MODEL5_DEFAULTS}
+        for key, value in params.items():
+            shared = np.ndim(value) == (1 if key == "return_flows" else 0)
+            if shared and not isinstance(value, dict):
+                value = dict.fromkeys(self.nodes, value)
+            elif not isinstance(value, dict):
+                if len(value) != len(self.nodes):
+                    raise ValueError(f"{key} has {len(value)} entries, expected one per reservoir ({len(self.nodes)})")
+                value = dict(zip(self.nodes, value))
+            for node, v in value.items():
+                self.network.params[self.network.names.index(node)][key] = v
+        if economics or "return_flows" in params:
+            new = assemble_network(self.name, self.network, self.n_steps, **{**self.economics, **economics})
+            self.__dict__.update(new.__dict__)
+            return self
+        start = time.perf_counter()
+        self.b_ub, self.b_eq, self.c0 = _right_hand_sides(self.name, self.network, self.n_steps, self.economics,
+                                                          self.ub_rows, self.eq_rows)
+        self.build_time = time.perf_counter() - start
+        return self
+
+    def _label(self, k):
+        return f"{self.nodes[k // self.n_steps]}_{k % self.n_steps}"
+
+
+def _rhs(name, network, T, economics):
+    # Right-hand side of every constraint group (node-major), and the objective constant
+    N = len(network.names)
+
+    def series(key, default=0.0):
+        # Node-major flat array of one time series
+        return network._series(key, T, RESERVOIR, default).T.reshape(-1)
+
+    def scalar(key):
+        return np.repeat(network._scalar(key, RESERVOIR), T)
+
+    first = np.tile(np.arange(T), N) == 0
+    S0 = scalar("S0")
+    rhs = dict(capacity=scalar("K"), urban=series("D_u"), irrigation=series("D_irr"), hydropower=series("D_hydro"))
+    if name == "model4":
+        rhs.update(balance=series("I") - series("O") + np.where(first, S0, 0.0), minimum_storage=scalar("S_min"))
+        # Unmet demand sum(D - R): the demand total is the objective constant
+        c0 = float(rhs["urban"].sum() + rhs["irrigation"].sum() + rhs["hydropower"].sum())
+    else:
+        E = np.concatenate([np.broadcast_to(np.asarray(params.get("E", params["O"]), dtype=np.float64), (T,))
+                            for params in network.params])
+        rhs.update(balance=series("I") - E + series("P") + np.where(first, S0, 0.0),
+                   environmental_flow=series("MinEF"), spill=S0)
+        c0 = dict(MODEL5_DEFAULTS, **economics)["Crop_Revenue"] * N
+    return rhs, c0
+
+
+def _right_hand_sides(name, network, T, economics, ub_rows, eq_rows):
+    rhs, c0 = _rhs(name, network, T, economics)
+
+    def gather(rows):
+        # Every group fills len(network.names) * T consecutive rows
+        groups = rows[::len(network.names) * T]
+        return np.concatenate([sign * rhs[group] for group, _, sign in groups]) if groups else np.zeros(0)
+
+    return gather(ub_rows), gather(eq_rows), c0
+
+
+def assemble_network(name, network, n_steps, **economics):
+    """Assemble formulation `name` ("model4" or "model5") jointly for all reservoirs of a Network.
+
+    Each reservoir brings its own K, S0, S_min, I, O and demands (model 5 also
+    reads E, P and MinEF, given as extra series to Network.add_reservoir; E
+    defaults to O, P and MinEF to 0). Spills and environmental flows are
+    routed downstream in full, releases in the shares of the reservoir's
+    return_flows. economics overrides the model 5 parameters
+    (parameters.MODEL5_DEFAULTS), which are shared by all reservoirs; the crop
+    revenue is counted once per reservoir.
+    """
+    if name not in ("model4", "model5"):
+        raise ValueError(f"joint formulations exist for model4 and model5, not {name!r}")
+    if DEMAND in network.kind:
+        raise ValueError("joint formulations support reservoir nodes only")
+    start = time.perf_counter()
+    network = copy.deepcopy(network)
+    N, T = len(network.names), n_steps
+    n = N * T
+
+    # Building blocks: identity, lag S[i, t-1] (not across nodes) and routing
+    eye = sparse.identity(n, format="csr")
+    k = np.flatnonzero(np.tile(np.arange(T), N) > 0)
+    lag = sparse.csr_matrix((np.ones(k.size), (k, k - 1)), shape=(n, n))
+    edges = np.array(network.edges, dtype=np.float64).reshape(-1, 3)
+    src, dst, fraction = edges[:, 0].astype(int), edges[:, 1].astype(int), edges[:, 2]
+    ret = np.array([p["return_flows"] for p in network.params], dtype=np.float64).reshape(N, 3)
+
+    def routed(share):
+        # eye minus the routed outflow of the upstream nodes, same time step
+        G = sparse.csr_matrix((fraction * share[src], (dst, src)), shape=(N, N))
+        return eye - sparse.kron(G, sparse.identity(T), format="csr")
+
+    blocks = BLOCKS[name]
+    rhs, c0 = _rhs(name, network, T, economics)
+    if name == "model4":
+        groups = [  # (group, {block: matrix}, sense); the right-hand sides come from _rhs
+            ("balance", {"S": eye - lag, "R_u": routed(ret[:, 0]), "R_irr": routed(ret[:, 1]),
+                         "R_hydro": routed(ret[:, 2])}, "=="),
+            ("minimum_storage", {"S": eye}, ">="),
+            ("capacity", {"S": eye}, "<="),
+            ("urban", {"R_u": eye}, "=="),
+            ("irrigation", {"R_irr": eye, "R_u": eye}, ">="),
+            ("hydropower", {"R_hydro": eye, "R_u": eye, "R_irr": eye}, ">="),
+        ]
+        c = {"R_u": -1.0, "R_irr": -1.0, "R_hydro": -1.0}
+    else:
+        everything = np.ones(N)
+        groups = [
+            ("environmental_flow", {"EF": eye, "EF_violation": eye}, ">="),
+            ("balance", {"S": eye - lag, "R_u": routed(ret[:, 0]), "R_irr": routed(ret[:, 1]),
+                         "R_hydro": routed(ret[:, 2]), "Sp": routed(everything), "EF": routed(everything)}, "=="),
+            ("capacity", {"S": eye}, "<="),
+            ("urban", {"R_u": eye}, "=="),
+            ("irrigation", {"R_irr": eye}, "=="),
+            ("hydropower", {"R_hydro": eye}, "=="),
+            ("spill", {"Sp": eye}, "<="),
+        ]
+        # Benefits from releases, minus the spill costs and the environmental flow penalty
+        c = Economics.from_params(dict(MODEL5_DEFAULTS, **economics)).coefficients()
+
+    # Stack the groups: "==" rows into A_eq, "<=" and (negated) ">=" rows into A_ub
+    empty = sparse.csr_matrix((n, n))
+    A = {"ub": [], "eq": []}
+    b = {"ub": [], "eq": []}
+    rows = {"ub": [], "eq": []}
+    for group, terms, sense in groups:
+        kind, sign = ("eq", 1.0) if sense == "==" else ("ub", -1.0 if sense == ">=" else 1.0)
+        A[kind].append(sign * sparse.hstack([terms.get(block, empty) for block in blocks], format="csr"))
+        b[kind].append(sign * rhs[group])
+        rows[kind] += [(group, i, sign) for i in range(n)]
+    n_vars = len(blocks) * n
+    A_ub = sparse.vstack(A["ub"], format="csr") if A["ub"] else sparse.csr_matrix((0, n_vars))
+    A_eq = sparse.vstack(A["eq"], format="csr") if A["eq"] else sparse.csr_matrix((0, n_vars))
+
+    cost = np.zeros(n_vars)
+    for j, block in enumerate(blocks):
+        cost[j * n:(j + 1) * n] = c.get(block, 0.0)
+    binary = np.repeat([block in BINARY for block in blocks], n)
+    lp = NetworkProgram(name, name == "model5", cost, c0, A_ub, np.concatenate(b["ub"]), A_eq,
+                        np.concatenate(b["eq"]), np.zeros(n_vars), np.where(binary, 1.0, np.inf),
+                        binary.astype(np.uint8),
+                        {block: slice(j * n, (j + 1) * n) for j, block in enumerate(blocks)},
+                        T, rows["ub"], rows["eq"], nodes=list(network.names),
+                        network=network, economics=dict(economics))
+    lp.build_time = time.perf_counter() - start
+    return lp
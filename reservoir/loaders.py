@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Time-series input loaders
+
+Inflows, evaporation, precipitation, environmental flows and demands are read
+from CSV, Parquet or .npy files into contiguous float64 arrays. Large
+ensembles can be processed chunk by chunk without reading the whole file into
+RAM: .npy files are memory-mapped, and Parquet files (one row per trace, one
+column per step) are streamed batch by batch with iter_chunks.
+"""
+
+import csv
+import os
+
+import numpy as np
+
+
+def _read_csv(path, columns):
+    # One header row with the column names, then numeric rows
+    with open(path, newline="") as f:
+        header = [name.strip() for name in next(csv.reader(f))]
+    columns = header if columns is None else list(columns)
+    missing = [c for c in columns if c not in header]
+    if missing:
+        raise KeyError(f"{path}: missing columns {missing}")
+    data = np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2, dtype=np.float64,
+                      usecols=[header.index(c) for c in columns])
+    return {c: np.ascontiguousarray(data[:, j]) for j, c in enumerate(columns)}
+
+
+def _read_parquet(path, columns, mmap):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ImportError("reading Parquet files requires the pyarrow package") from exc
+    table = pq.read_table(path, columns=columns, memory_map=mmap)
+    return {name: np.ascontiguousarray(table.column(name).to_numpy(), dtype=np.float64)
+            for name in table.column_names}
+
+
+def load_series(path, columns=None, mmap=True):
+    """Read time series from a CSV, Parquet or .npy file.
+
+    CSV and Parquet files are tables: the result is a dict mapping each column
+    name (all of them, or those listed in `columns`) to a float64 array.
+    Parquet tables are read into memory whole (mmap only maps the file while
+    it is decoded); pass the path to iter_chunks to stream a large one.
+    A .npy file holds one array, e.g. an inflow ensemble shaped
+    [n_traces, n_steps]; it is returned memory-mapped (read-only) when mmap is
+    True, so only the slices actually used are read from disk.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return _read_csv(path, columns)
+    if ext in (".parquet", ".pq"):
+        return _read_parquet(path, columns, mmap)
+    if ext == ".npy":
+        array = np.load(path, mmap_mode="r" if mmap else None)
+        if array.dtype != np.float64:
+            raise TypeError(f"{path}: expected float64 data, got {array.dtype}")
+        return array
+    raise ValueError(f"unsupported file type {ext!r} (expected .csv, .parquet or .npy)")
+
+
+def load_inputs(path, axis=None, columns=None, method="step"):
+    """Read the input table of a model and map it onto a time axis.
+
+    The table has one column per input, named like the variables of the
+    scripts (I, O, E, P, MinEF, D_u, D_irr, D_hydro, ...), and either 12 rows
+    (January-December) or one row per month of the axis. A `month` column,
+    if present, is only a label and is dropped. With a TimeAxis the columns
+    are returned per step (see TimeAxis.from_monthly; method="linear" for
+    smooth daily or hourly values); without one they are returned as read.
+    """
+    table = load_series(path, columns)
+    table.pop("month", None)
+    if axis is None:
+        return table
+    return {name: axis.from_monthly(values, method=method) for name, values in table.items()}
+
+
+def _iter_parquet(path, chunk_size, columns):
+    # Row batches of a Parquet ensemble, stacked to [rows, columns]
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ImportError("reading Parquet files requires the pyarrow package") from exc
+    start = 0
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+        block = np.empty((batch.num_rows, batch.num_columns), dtype=np.float64)
+        for j, column in enumerate(batch.columns):
+            block[:, j] = column.to_numpy()
+        yield start, block
+        start += batch.num_rows
+
+
+def iter_chunks(array, chunk_size, columns=None):
+    """Yield (start, block) pieces of an array along its first axis.
+
+    Each block is read into memory as a contiguous float64 array, so a
+    memory-mapped ensemble is only ever held one chunk at a time. `array` may
+    also be a path: a .npy file is memory-mapped (load_series), and a Parquet
+    file with one row per trace and one column per step (all of them, or
+    those listed in `columns`) is streamed chunk_size rows at a time without
+    loading the rest of the file.
+    """
+    if isinstance(array, (str, os.PathLike)):
+        ext = os.path.splitext(array)[1].lower()
+        if ext in (".parquet", ".pq"):
+            yield from _iter_parquet(array, chunk_size, columns)
+            return
+        if ext != ".npy":
+            raise ValueError(f"cannot stream {ext!r} files in chunks (expected .npy or .parquet)")
+        array = load_series(array, mmap=True)
+    for start in range(0, len(array), chunk_size):
+        yield start, np.ascontiguousarray(array[start:start + chunk_size], dtype=np.float64)
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+"""
+Matrix-form assembly of models 1-5
+
+The same problems as formulations.py, written directly as sparse arrays:
+
+    optimize  c @ x + c0
+    subject to  A_ub @ x <= b_ub,  A_eq @ x == b_eq,  lb <= x <= ub
+
+The variables are stored block by block (S[0..n-1], R_u[0..n-1], ...), so
+every constraint group is a sum of shifted identity matrices: the water
+balance S[t] - S[t-1] + R[t] is (I - I_shifted) on the storage block plus I
+on each release block. Nothing is looped over time steps in Python, so a
+100-year monthly model assembles in a few milliseconds. The program is solved
+with SciPy's HiGHS interface (linprog, or milp for the binary variables of
+models 3 and 5) or another backend of solvers.py, and can be written to an
+MPS file for any other solver.
+"""
+
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+from scipy import sparse
+
+from .economics import Economics
+from .parameters import (LABELS, SHORTAGE_BOUND, SPECS, SUMMER_MONTHS, objective_constant, prepare_params,
+                         right_hand_sides)
+from .results import SolveResult
+from .solvers import solve_form
+
+# Variable blocks of each formulation, in the order of the PuLP builders
+BLOCKS = {
+    "model1": ("S", "R_u", "R_irr", "R_hydro"),
+    "model2": ("S", "R_u", "R_irr", "R_hydro"),
+    "model3": ("S", "R_u", "R_irr", "R_hydro", "Urban_Priority", "Agricultural_Priority",
+               "Hydropower_Priority"),
+    "model4": ("S", "R_u", "R_irr", "R_hydro"),
+    "model5": ("S", "Sp", "EF", "R_u", "R_irr", "R_hydro", "EF_violation"),
+    "model3_lp": ("S", "R_u", "R_irr", "R_hydro", "Short_u", "Short_irr", "Short_hydro"),
+    "model5_lp": ("S", "Sp", "EF", "R_u", "R_irr", "R_hydro", "EF_shortage"),
+}
+BINARY = {"Urban_Priority", "Agricultural_Priority", "Hydropower_Priority", "EF_violation"}
+SHORTAGES = {"Short_u", "Short_irr", "Short_hydro", "EF_shortage"}  # Bounded by SHORTAGE_BOUND
+
+
+@dataclass
+class LinearProgram:
+    """One formulation in matrix form (see the module docstring)."""
+    name: str  # Formulation ID, e.g. "model4"
+    maximize: bool
+    c: np.ndarray
+    c0: float
+    A_ub: sparse.csr_matrix
+    b_ub: np.ndarray
+    A_eq: sparse.csr_matrix
+    b_eq: np.ndarray
+    lb: np.ndarray
+    ub: np.ndarray
+    integrality: np.ndarray  # 1 for binary variables, 0 for continuous ones
+    blocks: dict  # Variable name -> slice of x
+    n_steps: int
+    # Constraint group and time step of every row, and the sign it was stored with
+    # (-1 for ">=" rows, negated into A_ub)
+    ub_rows: list = field(default_factory=list)
+    eq_rows: list = field(default_factory=list)
+    params: dict = field(default_factory=dict)
+    summer: np.ndarray = None
+    build_time: float = 0.0
+
+    @property
+    def n_vars(self):
+        return len(self.c)
+
+    def split(self, x):
+        """Split a solution vector into one array per variable."""
+        return {name: x[s] for name, s in self.blocks.items()}
+
+    def update(self, **params):
+        """Change parameters; only b_ub, b_eq and c0 are recomputed unless the structure changes."""
+        if any(key in SPECS[self.name].defaults for key in params):
+            structure_changed = True  # The economic parameters and weights are objective coefficients
+        elif self.name == "model2":
+            new = prepare_params(self.name, self.n_steps, params, current=self.params)
+            structure_changed = any(not np.array_equal(new[d] > 0, self.params[d] > 0)
+                                    for d in ("D_u", "D_irr", "D_hydro"))
+        else:
+            structure_changed = False
+        params = prepare_params(self.name, self.n_steps, params, current=self.params)
+        if structure_changed:
+            new = _assemble(self.name, self.summer, params)
+            self.__dict__.update(new.__dict__)
+            return self
+        start = time.perf_counter()
+        self.params = params
+        self.b_ub, self.b_eq = _right_hand_sides(self.name, params, self.summer, self.ub_rows, self.eq_rows)
+        self.c0 = objective_constant(self.name, params)
+        self.build_time = time.perf_counter() - start
+        return self
+
+    def solve(self, time_limit=None, mip_gap=None, backend="scipy", threads=None):
+        """Solve with one of the solvers.BACKENDS (default: HiGHS through SciPy) and return a SolveResult."""
+        run = solve_form(self, backend, time_limit, mip_gap, threads)
+        objective = float(self.c @ run.x + self.c0) if run.status == "Optimal" else None
+        return SolveResult(self.name, run.status, objective, self.split(run.x), self.build_time, run.solve_time,
+                           run.backend, run.iterations, run.nodes, run.log)
+
+    def row_names(self):
+        """Unique names of the A_ub and A_eq rows, as the PuLP builders name the constraints."""
+        seen = set()
+
+        def unique(rows):
+            names = []
+            for group, t, _ in rows:
+                label = self._label(t)
+                name, k = f"{group}_{label}", 1
+                while name in seen:
+                    name, k = f"{group}_{label}_{k}", k + 1
+                seen.add(name)
+                names.append(name)
+            return names
+
+        return unique(self.ub_rows), unique(self.eq_rows)
+
+    def _label(self, k):
+        # Name suffix of the k-th entry of a variable block (or constraint group)
+        return k
+
+    def column_names(self):
+        names = [None] * self.n_vars
+        for block, s in self.blocks.items():
+            names[s] = [f"{LABELS[block]}_{self._label(k)}" for k in range(s.stop - s.start)]
+        return names
+
+    def write_mps(self, path):
+        """Write the program to a free-format MPS file (maximization kept as OBJSENSE MAX)."""
+        ub_names, eq_names = self.row_names()
+        rows = ub_names + eq_names
+        columns = self.column_names()
+        A = sparse.vstack([self.A_ub, self.A_eq]).tocsc()
+        lines = [f"NAME Reservoir_Optimization_{self.name}"]
+        if self.maximize:
+            lines += ["OBJSENSE", "    MAX"]
+        lines += ["ROWS", " N  OBJ"]
+        lines += [f" L  {name}" for name in ub_names] + [f" E  {name}" for name in eq_names]
+
+        lines.append("COLUMNS")
+        integer = False
+        for j, column in enumerate(columns):
+            if self.integrality[j] != integer:
+                integer = bool(self.integrality[j])
+                lines.append(f"    MARKER  'MARKER'  '{'INTORG' if integer else 'INTEND'}'")
+            if self.c[j]:
+                lines.append(f"    {column}  OBJ  {self.c[j]:.17g}")
+            for k in range(A.indptr[j], A.indptr[j + 1]):
+                lines.append(f"    {column}  {rows[A.indices[k]]}  {A.data[k]:.17g}")
+        if integer:
+            lines.append("    MARKER  'MARKER'  'INTEND'")
+
+        lines.append("RHS")
+        if self.c0:
+            lines.append(f"    RHS  OBJ  {-self.c0:.17g}")  # MPS stores minus the objective constant
+        b = np.concatenate([self.b_ub, self.b_eq])
+        lines += [f"    RHS  {rows[i]}  {b[i]:.17g}" for i in np.flatnonzero(b)]
+
+        lines.append("BOUNDS")
+        for j, column in enumerate(columns):
+            lb, ub = self.lb[j], self.ub[j]
+            if self.integrality[j] and lb == 0 and ub == 1:
+                lines.append(f" BV BND  {column}")
+                continue
+            if lb != 0:
+                lines.append(f" MI BND  {column}" if lb == -np.inf else f" LO BND  {column}  {lb:.17g}")
+            if ub != np.inf:
+                lines.append(f" UP BND  {column}  {ub:.17g}")
+        lines.append("ENDATA")
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+class _Assembly:
+    # Collects the constraint groups of one formulation as sparse blocks
+    def __init__(self, blocks, n_steps):
+        self.n = n_steps
+        self.offset = {name: k * n_steps for k, name in enumerate(blocks)}
+        self.n_vars = len(blocks) * n_steps
+        self.ub, self.eq = [], []  # (group, matrix, step indices) per group
+
+    def var(self, name, coef=1.0, lag=0):
+        # n x n_vars matrix with `coef` at (t, name[t - lag]), for every t >= lag
+        t = np.arange(lag, self.n)
+        return sparse.csr_matrix((np.full(t.size, coef), (t, self.offset[name] + t - lag)),
+                                 shape=(self.n, self.n_vars))
+
+    def add(self, group, expr, sense, mask=None):
+        # Rows `expr[t] <sense> rhs[group][t]`, for the steps where mask is True
+        t = np.arange(self.n) if mask is None else np.flatnonzero(mask)
+        expr = expr[t]
+        if sense == "==":
+            self.eq.append((group, expr, t, 1.0))
+        else:
+            sign = -1.0 if sense == ">=" else 1.0
+            self.ub.append((group, expr * sign, t, sign))
+
+    def balance(self, outflows):
+        # S[t] - S[t-1] + outflows[t] == rhs[t]; the initial storage is on the rhs of t = 0
+        expr = self.var("S") - self.var("S", lag=1)
+        for name in outflows:
+            expr = expr + self.var(name)
+        self.add("balance", expr, "==")
+
+
+def _stack(groups, n_vars):
+    if not groups:
+        return sparse.csr_matrix((0, n_vars)), []
+    A = sparse.vstack([expr for _, expr, _, _ in groups], format="csr")
+    rows = [(group, int(t), sign) for group, _, steps, sign in groups for t in steps]
+    return A, rows
+
+
+def _right_hand_sides(name, params, summer, ub_rows, eq_rows):
+    rhs = right_hand_sides(name, params, summer)
+
+    def gather(rows):
+        return np.array([sign * rhs[group][t] for group, t, sign in rows], dtype=np.float64)
+
+    return gather(ub_rows), gather(eq_rows)
+
+
+def _formulate(name, a, p):
+    # Constraint groups and objective coefficients, mirroring the PuLP builders
+    c = {}
+    if name in ("model1", "model2"):
+        c["S"] = 1.0
+        a.balance(("R_u", "R_irr", "R_hydro"))
+        a.add("capacity", a.var("S"), "<=")
+        if name == "model1":
+            a.add("urban", a.var("R_u"), ">=")
+            a.add("irrigation", a.var("R_irr"), ">=")
+            a.add("hydropower", a.var("R_hydro"), ">=")
+        else:
+            u, i, h = (p[d] > 0 for d in ("D_u", "D_irr", "D_hydro"))
+            S, R_u, R_irr, R_hydro = (a.var(v) for v in ("S", "R_u", "R_irr", "R_hydro"))
+            # Priority 1: Urban demand
+            a.add("urban", R_u, "==", u)
+            a.add("zero", R_irr - S + R_u, "<=", u)
+            a.add("zero", R_hydro - S + R_u, "<=", u)
+            for x in (R_u, R_irr, R_hydro):
+                a.add("zero", x, "==", ~u)
+            # Priority 2: Agricultural demand (minimum 40% coverage in summer)
+            a.add("irrigation", R_irr, "==", i)
+            a.add("zero", R_hydro - S + R_u + R_irr, "<=", i)
+            a.add("zero", R_irr, "==", ~i)
+            # Priority 3: Hydropower demand
+            a.add("zero", R_hydro - S + R_u + R_irr, "<=", h)
+            a.add("zero", R_hydro, "==", ~h)
+    elif name == "model3":
+        c.update(R_u=1.0, R_irr=1.0, R_hydro=1.0)
+        a.balance(("R_u", "R_irr", "R_hydro"))
+        a.add("minimum_storage", a.var("S"), "==")
+        a.add("capacity", a.var("S"), "<=")
+        # R >= D - (1 - priority), written as R - priority >= D - 1
+        a.add("urban", a.var("R_u") - a.var("Urban_Priority"), ">=")
+        a.add("zero", a.var("R_irr"), "==")
+        a.add("zero", a.var("R_hydro"), "==")
+        a.add("irrigation", a.var("R_irr") - a.var("Agricultural_Priority"), ">=")
+        a.add("irrigation_max", a.var("R_irr"), "<=")
+        a.add("hydropower", a.var("R_hydro") - a.var("Hydropower_Priority"), ">=")
+        a.add("hydropower_max", a.var("R_hydro"), "<=")
+    elif name == "model3_lp":
+        # The binaries of model 3 as shortages: R + shortage >= D, with tiered penalties
+        c.update(R_u=1.0, R_irr=1.0, R_hydro=1.0, Short_u=-p["Weight_Urban"], Short_irr=-p["Weight_Irrigation"],
+                 Short_hydro=-p["Weight_Hydropower"])
+        a.balance(("R_u", "R_irr", "R_hydro"))
+        a.add("minimum_storage", a.var("S"), "==")
+        a.add("capacity", a.var("S"), "<=")
+        a.add("urban", a.var("R_u") + a.var("Short_u"), ">=")
+        a.add("zero", a.var("R_irr"), "==")
+        a.add("zero", a.var("R_hydro"), "==")
+        a.add("irrigation", a.var("R_irr") + a.var("Short_irr"), ">=")
+        a.add("irrigation_max", a.var("R_irr"), "<=")
+        a.add("hydropower", a.var("R_hydro") + a.var("Short_hydro"), ">=")
+        a.add("hydropower_max", a.var("R_hydro"), "<=")
+    elif name == "model4":
+        # Unmet demand sum(D - R): the demand total is the objective constant
+        c.update(R_u=-1.0, R_irr=-1.0, R_hydro=-1.0)
+        a.balance(("R_u", "R_irr", "R_hydro"))
+        a.add("minimum_storage", a.var("S"), ">=")
+        a.add("capacity", a.var("S"), "<=")
+        a.add("urban", a.var("R_u"), "==")
+        a.add("irrigation", a.var("R_irr") + a.var("R_u"), ">=")
+        a.add("hydropower", a.var("R_hydro") + a.var("R_u") + a.var("R_irr"), ">=")
+    elif name in ("model5", "model5_lp"):
+        # Benefits from releases, minus the spill costs and the environmental flow penalty
+        c.update(Economics.from_params(p).coefficients())
+        violation = "EF_violation" if name == "model5" else "EF_shortage"
+        c[violation] = c.pop("EF_violation")
+        a.add("environmental_flow", a.var("EF") + a.var(violation), ">=")
+        a.balance(("R_u", "R_irr", "R_hydro", "Sp", "EF"))
+        a.add("capacity", a.var("S"), "<=")
+        a.add("urban", a.var("R_u"), "==")
+        a.add("irrigation", a.var("R_irr"), "==")
+        a.add("hydropower", a.var("R_hydro"), "==")
+        a.add("spill", a.var("Sp"), "<=")
+    return c
+
+
+def _assemble(name, summer, params):
+    start = time.perf_counter()
+    n_steps = len(summer)
+    blocks = BLOCKS[name]
+    a = _Assembly(blocks, n_steps)
+    coefficients = _formulate(name, a, params)
+
+    c = np.zeros(a.n_vars)
+    for block, coef in coefficients.items():
+        c[a.offset[block]:a.offset[block] + n_steps] = coef
+    A_ub, ub_rows = _stack(a.ub, a.n_vars)
+    A_eq, eq_rows = _stack(a.eq, a.n_vars)
+    b_ub, b_eq = _right_hand_sides(name, params, summer, ub_rows, eq_rows)
+
+    binary = np.repeat([block in BINARY for block in blocks], n_steps)
+    lb = np.zeros(a.n_vars)
+    ub = np.where(binary, 1.0, np.inf)
+    ub[np.repeat([block in SHORTAGES for block in blocks], n_steps)] = SHORTAGE_BOUND
+    lp = LinearProgram(name, name not in ("model4",), c,
+                       objective_constant(name, params), A_ub, b_ub, A_eq, b_eq, lb, ub,
+                       binary.astype(np.uint8),
+                       {block: slice(a.offset[block], a.offset[block] + n_steps) for block in blocks},
+                       n_steps, ub_rows, eq_rows, params, summer)
+    lp.build_time = time.perf_counter() - start
+    return lp
+
+
+def assemble(name, axis, **params):
+    """Assemble formulation `name` ("model1" ... "model5", "model3_lp", "model5_lp") on a time axis as a LinearProgram."""
+    if name not in BLOCKS:
+        raise ValueError(f"unknown formulation {name!r}, expected one of {sorted(BLOCKS)}")
+    summer = axis.in_months(*SUMMER_MONTHS)
+    return _assemble(name, summer, prepare_params(name, len(axis), params))
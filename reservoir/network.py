@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Multi-reservoir network simulation
+
+A basin is a directed acyclic graph of reservoirs and demand nodes. Each
+reservoir runs the water balance and urban -> irrigation -> hydropower
+cascade of simulation.py; its spills and (the returning share of) its
+releases flow to the nodes downstream, split by the edge fractions. A demand
+node takes what it can of its demand from the water reaching it and passes
+on the rest, plus its return flow.
+
+The nodes are grouped in topological levels: no node depends on another node
+of its own level, so each time step is evaluated level by level, with all
+the reservoirs (and all the demand nodes) of a level updated by one set of
+array operations.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+RESERVOIR, DEMAND = 0, 1
+
+
+@dataclass
+class NetworkResult:
+    """Trajectories of a network simulation, each shaped [n_nodes, n_steps].
+
+    Variables that do not apply to a node (e.g. storage at a demand node) are 0.
+    """
+    nodes: list  # Node names, in the order of the rows
+    S: np.ndarray  # Storage at the end of each step
+    R_u: np.ndarray  # Releases for urban use
+    R_irr: np.ndarray  # Releases for agricultural use
+    R_hydro: np.ndarray  # Releases for hydropower use
+    Spills: np.ndarray  # Spills from the reservoir
+    Delivered: np.ndarray  # Water delivered at demand nodes
+    Inflow: np.ndarray  # Local plus upstream inflow
+    Outflow: np.ndarray  # Water passed downstream
+
+    def node(self, name):
+        """Row index of node `name`."""
+        return self.nodes.index(name)
+
+
+class Network:
+    """A basin of reservoirs and demand nodes linked by routing edges.
+
+    Time series (I, O, demands) are given per node, as scalars or arrays with
+    one value per time step. Reservoir releases return downstream in the
+    shares given by return_flows (urban, irrigation, hydropower): the default
+    (1, 1, 1) routes all releases, as in a cascade of in-stream reservoirs;
+    e.g. (0, 0, 1) treats urban and irrigation releases as consumed.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.kind = []
+        self.params = []  # Per-node dict of parameters
+        self.edges = []  # (upstream index, downstream index, fraction)
+
+    def _add(self, name, kind, params):
+        if name in self.names:
+            raise ValueError(f"duplicate node {name!r}")
+        self.names.append(name)
+        self.kind.append(kind)
+        self.params.append(params)
+        return name
+
+    def add_reservoir(self, name, K, S0, S_min, I=0.0, O=0.0, D_u=0.0, D_irr=0.0, D_hydro=0.0,
+                      return_flows=(1.0, 1.0, 1.0), **series):
+        """Add a reservoir with capacity K, initial storage S0 and minimum storage S_min.
+
+        Other keyword arguments are time series used by the joint formulations
+        (reservoir.joint), e.g. E, P and MinEF for model 5.
+        """
+        return self._add(name, RESERVOIR, dict(K=K, S0=S0, S_min=S_min, I=I, O=O, D_u=D_u, D_irr=D_irr,
+                                               D_hydro=D_hydro, return_flows=return_flows, **series))
+
+    def add_demand(self, name, D, I=0.0, return_flow=0.0):
+        """Add a demand node (an abstraction point) with demand D and local inflow I."""
+        return self._add(name, DEMAND, dict(D=D, I=I, return_flow=return_flow))
+
+    def connect(self, upstream, downstream, fraction=1.0):
+        """Route `fraction` of the outflow of `upstream` to `downstream`."""
+        self.edges.append((self.names.index(upstream), self.names.index(downstream), float(fraction)))
+
+    def levels(self):
+        """Topological levels: lists of node indices, sources first.
+
+        A node's level is the length of the longest path reaching it, so every
+        node comes after all the nodes upstream of it.
+        """
+        n = len(self.names)
+        indegree = np.zeros(n, dtype=int)
+        downstream = [[] for _ in range(n)]
+        for up, down, _ in self.edges:
+            indegree[down] += 1
+            downstream[up].append(down)
+        current = [i for i in range(n) if indegree[i] == 0]
+        levels, seen = [], 0
+        while current:
+            levels.append(current)
+            seen += len(current)
+            following = []
+            for i in current:
+                for j in downstream[i]:
+                    indegree[j] -= 1
+                    if indegree[j] == 0:
+                        following.append(j)
+            current = following
+        if seen != n:
+            raise ValueError("the network has a cycle")
+        return levels
+
+    def _series(self, key, n_steps, kind, default=0.0):
+        # [n_steps, n_nodes] array of one time series, 0 at nodes of the other kind
+        out = np.zeros((n_steps, len(self.names)))
+        for i, params in enumerate(self.params):
+            if self.kind[i] == kind:
+                out[:, i] = np.broadcast_to(np.asarray(params.get(key, default), dtype=np.float64), (n_steps,))
+        return out
+
+    def _scalar(self, key, kind, default=0.0):
+        return np.array([params[key] if k == kind else default for k, params in zip(self.kind, self.params)],
+                        dtype=np.float64)
+
+    def simulate(self, n_steps):
+        """Simulate the network over n_steps time steps and return a NetworkResult."""
+        n = len(self.names)
+        kind = np.array(self.kind)
+
+        # Time-major inputs, so each step reads contiguous rows
+        I = self._series("I", n_steps, RESERVOIR) + self._series("I", n_steps, DEMAND)
+        O = self._series("O", n_steps, RESERVOIR)
+        D_u = self._series("D_u", n_steps, RESERVOIR)
+        D_irr = self._series("D_irr", n_steps, RESERVOIR)
+        D_hydro = self._series("D_hydro", n_steps, RESERVOIR)
+        D = self._series("D", n_steps, DEMAND)
+        K, S_min = self._scalar("K", RESERVOIR), self._scalar("S_min", RESERVOIR)
+        flows = np.array([p["return_flows"] if k == RESERVOIR else (0.0, 0.0, 0.0)
+                          for k, p in zip(self.kind, self.params)], dtype=np.float64).reshape(n, 3)
+        ret_u, ret_irr, ret_hydro = flows.T
+        ret_d = self._scalar("return_flow", DEMAND)
+
+        # Per level: reservoir and demand nodes, and the edges feeding the level
+        edges = np.array(self.edges, dtype=np.float64).reshape(-1, 3)
+        plan = []
+        for level in self.levels():
+            level = np.array(level)
+            res, dem = level[kind[level] == RESERVOIR], level[kind[level] == DEMAND]
+            position = np.full(n, -1)
+            position[level] = np.arange(len(level))
+            feeding = position[edges[:, 1].astype(int)] >= 0
+            plan.append((level, res, dem, edges[feeding, 0].astype(int),
+                         position[edges[feeding, 1].astype(int)], edges[feeding, 2]))
+
+        S = np.zeros((n_steps, n))
+        R_u, R_irr, R_hydro = np.zeros((n_steps, n)), np.zeros((n_steps, n)), np.zeros((n_steps, n))
+        Spills, Delivered = np.zeros((n_steps, n)), np.zeros((n_steps, n))
+        Inflow, Outflow = np.zeros((n_steps, n)), np.zeros((n_steps, n))
+        s = self._scalar("S0", RESERVOIR)
+
+        for t in range(n_steps):
+            # Row views of step t: every update below is an array operation over the nodes of a level
+            I_t, O_t, D_t = I[t], O[t], D[t]
+            D_u_t, D_irr_t, D_hydro_t = D_u[t], D_irr[t], D_hydro[t]
+            S_t, Spills_t, Delivered_t = S[t], Spills[t], Delivered[t]
+            R_u_t, R_irr_t, R_hydro_t = R_u[t], R_irr[t], R_hydro[t]
+            in_t, out_t = Inflow[t], Outflow[t]
+            for level, res, dem, src, dst, fraction in plan:
+                # Local inflow plus the routed outflow of the nodes upstream
+                in_t[level] = I_t[level] + np.bincount(dst, weights=out_t[src] * fraction, minlength=len(level))
+
+                if len(res):
+                    # Storage balance equation, then the releases in order of priority
+                    x = s[res] + in_t[res] - O_t[res]
+                    r_u = np.minimum(x, D_u_t[res])
+                    x -= r_u
+                    r_irr = np.minimum(x, D_irr_t[res])
+                    x -= r_irr
+                    r_hydro = np.minimum(x, D_hydro_t[res])
+                    x -= r_hydro
+
+                    # Spills and storage capacity constraints
+                    spills = np.maximum(0.0, x - K[res])
+                    x = np.minimum(np.maximum(S_min[res], x), K[res])
+                    s[res] = S_t[res] = x
+                    Spills_t[res] = spills
+                    R_u_t[res], R_irr_t[res], R_hydro_t[res] = r_u, r_irr, r_hydro
+                    out_t[res] = spills + ret_u[res] * r_u + ret_irr[res] * r_irr + ret_hydro[res] * r_hydro
+
+                if len(dem):
+                    available = in_t[dem]
+                    delivered = np.minimum(available, D_t[dem])
+                    Delivered_t[dem] = delivered
+                    out_t[dem] = available - delivered + ret_d[dem] * delivered
+
+        return NetworkResult(list(self.names), *(np.ascontiguousarray(a.T) for a in
+                                                 (S, R_u, R_irr, R_hydro, Spills, Delivered, Inflow, Outflow)))
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming output of simulation trajectories
+
+Long or ensemble simulations produce their results chunk by chunk (see
+engine.simulate_chunks). Instead of collecting every trajectory and printing
+it, each chunk is written to compressed columnar files by a TrajectoryWriter
+and folded into a TrajectoryStats, which keeps per-month histograms (for
+percentiles), running means and extremes, and failure counts. Memory use is
+set by the chunk size, not by the number of traces.
+
+Formats: a directory of compressed .npz chunks (NumPy only), a Parquet file
+(pyarrow) or a Zarr store (zarr).
+"""
+
+import os
+
+import numpy as np
+
+VARIABLES = ("S", "R_u", "R_irr", "R_hydro", "Spills")
+FORMATS = ("npz", "parquet", "zarr")
+
+
+def _format(path, format):
+    if format is None:
+        ext = os.path.splitext(path)[1].lower()
+        format = {".parquet": "parquet", ".pq": "parquet", ".zarr": "zarr"}.get(ext, "npz")
+    if format not in FORMATS:
+        raise ValueError(f"unknown format {format!r}, expected one of {FORMATS}")
+    return format
+
+
+def _import(name):
+    try:
+        if name == "parquet":
+            import pyarrow
+            import pyarrow.parquet
+            return pyarrow
+        import zarr
+        return zarr
+    except ImportError as exc:
+        package = "pyarrow" if name == "parquet" else "zarr"
+        raise ImportError(f"writing {name} output requires the {package} package") from exc
+
+
+class TrajectoryWriter:
+    """Write simulation results chunk by chunk to compressed columnar files.
+
+    path is a directory of .npz chunks, a .parquet file or a .zarr store
+    (format=None picks the format from the extension). Parquet rows are
+    (trace, step, S, R_u, ...), one row group per chunk; Zarr and .npz hold
+    one [n_traces, n_steps] array per variable, and a Zarr store needs
+    n_traces in advance. compression is the Parquet codec; .npz chunks are
+    zlib-compressed unless compression is None, and Zarr arrays use zarr's
+    default compressor. Use as a context manager, or call close().
+    """
+
+    def __init__(self, path, n_steps, format=None, n_traces=None, variables=VARIABLES, compression="zstd",
+                 chunk_size=1000):
+        self.path = path
+        self.n_steps = n_steps
+        self.format = _format(path, format)
+        self.variables = tuple(variables)
+        self.compression = compression
+        self._parquet = None
+        self._zarr = {}
+        if self.format == "npz":
+            os.makedirs(path, exist_ok=True)
+        elif self.format == "zarr":
+            zarr = _import("zarr")
+            if n_traces is None:
+                raise ValueError("a Zarr store needs n_traces in advance")
+            for name in self.variables:
+                self._zarr[name] = zarr.open_array(os.path.join(path, name), mode="w", shape=(n_traces, n_steps),
+                                                   chunks=(chunk_size, n_steps), dtype="f8")
+
+    def write(self, start, result):
+        """Write traces start .. start + n - 1 of a SimulationResult shaped [n, n_steps]."""
+        arrays = {name: np.atleast_2d(getattr(result, name)) for name in self.variables}
+        n = len(arrays[self.variables[0]])
+        if self.format == "npz":
+            save = np.savez if self.compression is None else np.savez_compressed
+            save(os.path.join(self.path, f"chunk_{start:09d}.npz"), start=start, **arrays)
+        elif self.format == "zarr":
+            for name, values in arrays.items():
+                self._zarr[name][start:start + n] = values
+        else:
+            pa = _import("parquet")
+            columns = {"trace": np.repeat(np.arange(start, start + n, dtype=np.int64), self.n_steps),
+                       "step": np.tile(np.arange(self.n_steps, dtype=np.int32), n)}
+            columns.update((name, values.reshape(-1)) for name, values in arrays.items())
+            table = pa.table(columns)
+            if self._parquet is None:
+                self._parquet = pa.parquet.ParquetWriter(self.path, table.schema, compression=self.compression)
+            self._parquet.write_table(table)
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+            self._parquet = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_trajectories(path, format=None, variables=VARIABLES, chunk_size=1000):
+    """Read back what a TrajectoryWriter wrote, as (start, {variable: [n, n_steps]}) chunks."""
+    format = _format(path, format)
+    if format == "npz":
+        for name in sorted(f for f in os.listdir(path) if f.startswith("chunk_") and f.endswith(".npz")):
+            with np.load(os.path.join(path, name)) as chunk:
+                yield int(chunk["start"]), {v: chunk[v] for v in variables}
+    elif format == "zarr":
+        zarr = _import("zarr")
+        arrays = {v: zarr.open_array(os.path.join(path, v), mode="r") for v in variables}
+        n_traces = arrays[variables[0]].shape[0]
+        for start in range(0, n_traces, chunk_size):
+            yield start, {v: a[start:start + chunk_size] for v, a in arrays.items()}
+    else:
+        pa = _import("parquet")
+        f = pa.parquet.ParquetFile(path)
+        for i in range(f.num_row_groups):
+            group = f.read_row_group(i, columns=["trace", "step", *variables])
+            n_steps = int(group.column("step").to_numpy().max()) + 1
+            yield (int(group.column("trace")[0].as_py()),
+                   {v: group.column(v).to_numpy().reshape(-1, n_steps) for v in variables})
+
+
+class TrajectoryStats:
+    """Per-step statistics of an ensemble, accumulated chunk by chunk.
+
+    Percentiles come from n_bins-bin histograms per step and variable: bounds
+    maps a variable to its initial (low, high) range (e.g. (S_min, K) for
+    storage); variables without bounds start from the range of the first
+    chunk, widened by half. When a chunk falls outside the range, the range
+    grows to cover it and the counts are merged into the wider bins, so no
+    value is ever clipped. Percentiles are clipped to the exact running
+    minimum and maximum. The resolution is (high - low) / n_bins of the
+    final range. demands maps release variables (R_u, R_irr,
+    R_hydro) to their demand per step; a failure is a release below it.
+    """
+
+    def __init__(self, n_steps, variables=VARIABLES, bounds=None, n_bins=512, demands=None, tol=1e-9):
+        self.n_steps = n_steps
+        self.variables = tuple(variables)
+        self.bounds = dict(bounds or {})
+        self.n_bins = n_bins
+        self.demands = {name: np.broadcast_to(np.asarray(D, dtype=np.float64), (n_steps,))
+                        for name, D in (demands or {}).items()}
+        self.tol = tol
+        self.n_traces = 0
+        self.counts = {name: np.zeros((n_steps, n_bins), dtype=np.int64) for name in self.variables}
+        self.total = {name: np.zeros(n_steps) for name in self.variables}
+        self.min = {name: np.full(n_steps, np.inf) for name in self.variables}
+        self.max = {name: np.full(n_steps, -np.inf) for name in self.variables}
+        self.failures = {name: np.zeros(n_steps, dtype=np.int64) for name in self.demands}
+
+    def update(self, result):
+        """Fold in a SimulationResult chunk shaped [n, n_steps]."""
+        step = np.arange(self.n_steps) * self.n_bins
+        for name in self.variables:
+            x = np.atleast_2d(getattr(result, name))
+            if name not in self.bounds:
+                low, high = float(x.min()), float(x.max())
+                self.bounds[name] = (low, high + max(0.5 * (high - low), 1.0))
+            if x.min() < self.bounds[name][0] or x.max() > self.bounds[name][1]:
+                self._widen(name, float(x.min()), float(x.max()))
+            low, high = self.bounds[name]
+            k = np.clip(((x - low) * (self.n_bins / (high - low))).astype(np.int64), 0, self.n_bins - 1)
+            self.counts[name] += np.bincount((k + step).reshape(-1),
+                                             minlength=self.n_steps * self.n_bins).reshape(self.n_steps, -1)
+            self.total[name] += x.sum(axis=0)
+            np.minimum(self.min[name], x.min(axis=0), out=self.min[name])
+            np.maximum(self.max[name], x.max(axis=0), out=self.max[name])
+        for name, D in self.demands.items():
+            self.failures[name] += np.sum(np.atleast_2d(getattr(result, name)) < D - self.tol, axis=0)
+        self.n_traces += len(np.atleast_2d(getattr(result, self.variables[0])))
+
+    def _widen(self, name, x_min, x_max):
+        # Grow the range by whole bins below and a power-of-two bin width, so that
+        # every old bin falls inside exactly one new bin
+        low, high = self.bounds[name]
+        width = (high - low) / self.n_bins
+        shift = max(0, int(np.ceil((low - x_min) / width)))
+        factor = 1
+        while (low - shift * width + self.n_bins * factor * width <= x_max
+               or shift + self.n_bins > self.n_bins * factor):
+            factor *= 2
+        target = (np.arange(self.n_bins) + shift) // factor
+        first = np.flatnonzero(np.diff(target, prepend=-1))
+        counts = np.zeros_like(self.counts[name])
+        counts[:, target[first]] = np.add.reduceat(self.counts[name], first, axis=1)
+        self.counts[name] = counts
+        low -= shift * width
+        self.bounds[name] = (low, low + self.n_bins * factor * width)
+
+    def mean(self, name):
+        return self.total[name] / self.n_traces
+
+    def percentiles(self, name, q):
+        """Percentiles q (0-100) of a variable at every step, shaped [len(q), n_steps]."""
+        q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        low, high = self.bounds[name]
+        width = (high - low) / self.n_bins
+        counts = self.counts[name]
+        cum = counts.cumsum(axis=1)
+        out = np.empty((len(q), self.n_steps))
+        rows = np.arange(self.n_steps)
+        for j, p in enumerate(q):
+            target = p / 100 * self.n_traces
+            k = np.minimum(np.sum(cum < target, axis=1), self.n_bins - 1)
+            before = np.where(k > 0, cum[rows, k - 1], 0)
+            inside = np.maximum(counts[rows, k], 1)
+            out[j] = low + (k + np.clip((target - before) / inside, 0.0, 1.0)) * width
+        return np.clip(out, self.min[name], self.max[name])
+
+
+def stream(chunks, writer=None, stats=None):
+    """Pass (start, SimulationResult) chunks (e.g. from simulate_chunks) to a writer and/or stats.
+
+    Only one chunk is held at a time. Returns stats.
+    """
+    for start, result in chunks:
+        if writer is not None:
+            writer.write(start, result)
+        if stats is not None:
+            stats.update(result)
+    return stats
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Parameters of the optimization models 1-5
+
+The parameter and variable names of each formulation, their validation, and the
+right-hand sides they produce for every constraint group. This is shared by
+the PuLP builders (formulations.py) and the sparse matrix assembly
+(matrix.py), so both always describe the same problem.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+SUMMER_MONTHS = (6, 7, 8)  # June-August, for the irrigation rule of models 2 and 3
+SUMMER_SHARE = 0.4  # Minimum share of the irrigation demand met in summer
+
+# Economic parameters of model 5 (example values)
+MODEL5_DEFAULTS = {
+    "Economic_Value_Water": 1,  # $/m^3
+    "Cost_Treatment": 0.2,  # $/m^3
+    "Crop_Revenue": 2.50 * 700 + 2.00 * 950 + 1.50 * 800 + 1.10 * 600,  # sum of Crop_Sales * Crop_Yields, $
+    "Irrigation_Costs": 0.30,  # $/m^3
+    "Electricity_Produced": 14.705,  # = 1/0.068 kWh/m3
+    "Price_Electricity": 0.15,  # $/kWh
+    "Hydropower_Operation_Costs": 0.03,  # $/m^3
+    "PenaltyRate": 10,  # $/m^3
+    "Spill_Share_Urban": 0.3,
+    "Spill_Share_Irrigation": 0.5,
+    "Spill_Share_Hydropower": 0.0,  # Share of the spills valued at the hydropower benefit (0.3 in simulation.py)
+    "Spill_Hydropower_Operation": 1.0,  # Hydropower O&M costs counted again in the spill costs (0 in simulation.py)
+}
+
+# Economic parameters of simulation.py (example values - insert data), read by the script and by
+# reservoir.sensitivity: its own spill shares and no hydropower O&M costs in the spill costs; the crop revenue is
+# Crop_Sales * Crop_Yields, per month
+SIMULATION_ECONOMICS = {
+    "Economic_Value_Water": 1,  # $/m^3
+    "Cost_Treatment": 0.2,  # $/m^3
+    "Irrigation_Costs": 0.30,  # $/m^3
+    "Electricity_Produced": 14.705,  # = 1/0.068 kWh/m3
+    "Price_Electricity": 0.15,  # $/kWh
+    "Hydropower_Operation_Costs": 0.03,  # $/m^3
+    "Spill_Share_Urban": 0.17,
+    "Spill_Share_Irrigation": 0.52,
+    "Spill_Share_Hydropower": 0.3,
+    "Spill_Hydropower_Operation": 0.0,
+}
+SIMULATION_CROP_SALES = 2.50  # $/kg
+
+# LP reformulations of models 3 and 5 (model3_lp, model5_lp): the binaries become continuous shortages of at
+# most SHORTAGE_BOUND, the 1-unit relaxation the binaries allow, and model 3's priorities become tiered
+# penalties per unit of shortage
+SHORTAGE_BOUND = 1.0
+SHORTAGE_WEIGHTS = {
+    "Weight_Urban": 1e-4,
+    "Weight_Irrigation": 1e-5,
+    "Weight_Hydropower": 1e-6,
+}
+RELAXATIONS = {"model3": "model3_lp", "model5": "model5_lp"}
+
+# Variable labels, as in the scripts
+LABELS = {
+    "S": "Storage",
+    "R_u": "Release_Urban",
+    "R_irr": "Release_Agricultural",
+    "R_hydro": "Release_Hydropower",
+    "Sp": "Spills",
+    "EF": "Env_Flows",
+    "EF_violation": "EF_Violation",
+    "Urban_Priority": "Urban_Priority",
+    "Agricultural_Priority": "Agricultural_Priority",
+    "Hydropower_Priority": "Hydropower_Priority",
+    "Short_u": "Urban_Shortage",
+    "Short_irr": "Agricultural_Shortage",
+    "Short_hydro": "Hydropower_Shortage",
+    "EF_shortage": "EF_Shortage",
+}
+
+ParameterSpec = namedtuple("ParameterSpec", ["series", "scalars", "defaults"])
+
+_RELEASE_SERIES = ("I", "O", "D_u", "D_irr", "D_hydro")
+
+SPECS = {
+    "model1": ParameterSpec(_RELEASE_SERIES, ("K", "S0"), {}),
+    "model2": ParameterSpec(_RELEASE_SERIES, ("K", "S0"), {}),
+    "model3": ParameterSpec(_RELEASE_SERIES, ("K", "S0", "S_min"), {}),
+    "model4": ParameterSpec(_RELEASE_SERIES, ("K", "S0", "S_min"), {}),
+    "model5": ParameterSpec(("I", "E", "P", "MinEF", "D_u", "D_irr", "D_hydro"), ("K", "S0"), MODEL5_DEFAULTS),
+    "model3_lp": ParameterSpec(_RELEASE_SERIES, ("K", "S0", "S_min"), SHORTAGE_WEIGHTS),
+    "model5_lp": ParameterSpec(("I", "E", "P", "MinEF", "D_u", "D_irr", "D_hydro"), ("K", "S0"), MODEL5_DEFAULTS),
+}
+
+
+def prepare_params(name, n_steps, params, current=None):
+    """Validate parameters of formulation `name` and convert them to float64.
+
+    Time series are broadcast to n_steps values, scalars become floats. With
+    `current`, the given parameters update a copy of it; otherwise missing
+    defaults are filled in and every required parameter must be present.
+    """
+    try:
+        spec = SPECS[name]
+    except KeyError:
+        raise ValueError(f"unknown formulation {name!r}, expected one of {sorted(SPECS)}") from None
+    out = dict(spec.defaults) if current is None else dict(current)
+    for key, value in params.items():
+        if key in spec.series:
+            out[key] = np.array(np.broadcast_to(np.asarray(value, dtype=np.float64), (n_steps,)))
+        elif key in spec.scalars or key in spec.defaults:
+            out[key] = float(value)
+        else:
+            raise TypeError(f"{name}: unknown parameter {key!r}")
+    missing = [key for key in spec.series + spec.scalars if key not in out]
+    if missing:
+        raise TypeError(f"{name}: missing parameters {missing}")
+    return out
+
+
+def right_hand_sides(name, p, summer):
+    """Right-hand side of every constraint group, one value per time step."""
+    n_steps = len(summer)
+    if name in ("model5", "model5_lp"):
+        balance = p["I"] - p["E"] + p["P"]
+    else:
+        balance = p["I"] - p["O"]
+    balance[0] += p["S0"]
+    rhs = {"balance": balance, "capacity": np.full(n_steps, p["K"]), "zero": np.zeros(n_steps)}
+    irrigation = np.where(summer, p["D_irr"] * SUMMER_SHARE, p["D_irr"])
+
+    if name in ("model1", "model2", "model4"):
+        rhs.update(urban=p["D_u"], irrigation=p["D_irr"], hydropower=p["D_hydro"])
+    if name == "model2":
+        rhs["irrigation"] = irrigation
+    if name in ("model3", "model3_lp", "model4"):
+        rhs["minimum_storage"] = np.full(n_steps, p["S_min"])
+    if name == "model3":
+        # R >= D - (1 - priority), written as R - priority >= D - 1
+        rhs.update(urban=p["D_u"] - 1, irrigation=irrigation - 1, irrigation_max=p["D_irr"],
+                   hydropower=p["D_hydro"] - 1, hydropower_max=p["D_hydro"])
+    if name == "model3_lp":
+        # R + shortage >= D
+        rhs.update(urban=p["D_u"], irrigation=irrigation, irrigation_max=p["D_irr"],
+                   hydropower=p["D_hydro"], hydropower_max=p["D_hydro"])
+    if name in ("model5", "model5_lp"):
+        rhs.update(environmental_flow=p["MinEF"], urban=p["D_u"], irrigation=p["D_irr"],
+                   hydropower=p["D_hydro"], spill=np.full(n_steps, p["S0"]))
+    return rhs
+
+
+def objective_constant(name, p):
+    """Constant term of the objective: total demand in model 4, crop revenue in model 5."""
+    if name == "model4":
+        return float(p["D_u"].sum() + p["D_irr"].sum() + p["D_hydro"].sum())
+    if name in ("model5", "model5_lp"):
+        return p["Crop_Revenue"]
+    return 0.0
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Trade-offs between storage, releases and net benefits
+
+Models 1, 3 and 5 each maximize one objective: storage, total releases and
+net benefits. This module maps the trade-off between them on the feasible
+set of one assembled LinearProgram (matrix.py), e.g. model 1, where every
+demand is met and the water left can be stored or released:
+
+    storage       sum(S)
+    releases      sum(R_u + R_irr + R_hydro)
+    net_benefits  the model 5 objective (economics.Economics.coefficients);
+                  spill and environmental-flow terms count where the
+                  formulation has those variables
+
+The program is assembled once. The epsilon-constraint method maximizes the
+first objective with a lower bound on each of the others, which only
+changes the right-hand side of a few extra rows; the weighted-sum method
+only changes the objective vector. The sweep points are solved in chunks by
+a process pool, and dominated points are dropped.
+"""
+
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+
+import numpy as np
+from scipy import sparse
+
+from .economics import Economics
+
+OBJECTIVES = ("storage", "releases", "net_benefits")
+METHODS = ("epsilon", "weighted")
+
+
+@dataclass
+class ParetoFront:
+    """Non-dominated points of a sweep; every objective is maximized."""
+    objectives: tuple  # Objective names, in the order of the columns
+    values: np.ndarray  # Objective values of the non-dominated points, [n_points, n_objectives]
+    solutions: list  # Variable values (LinearProgram.split) of each point
+    payoff: np.ndarray  # Objective values when maximizing each objective alone, [n_objectives, n_objectives]
+    n_solved: int  # Sweep points solved to optimality
+    n_points: int  # Sweep points
+    solve_time: float  # Seconds for the whole sweep
+
+
+def objective_vector(lp, name, economics=None):
+    """Coefficients (c, c0) of an objective over the variables of a LinearProgram."""
+    if name not in OBJECTIVES:
+        raise ValueError(f"unknown objective {name!r}, expected one of {OBJECTIVES}")
+    c = np.zeros(lp.n_vars)
+    c0 = 0.0
+    if name == "storage":
+        c[lp.blocks["S"]] = 1.0
+    elif name == "releases":
+        for block in ("R_u", "R_irr", "R_hydro"):
+            c[lp.blocks[block]] = 1.0
+    else:
+        economics = economics or Economics.from_params(lp.params)
+        for block, coef in economics.coefficients().items():
+            if block in lp.blocks:
+                c[lp.blocks[block]] = coef
+        c0 = economics.Crop_Revenue
+    return c, c0
+
+
+def nondominated(values, tol=1e-9):
+    """Mask of the rows of `values` not dominated by another row (all objectives maximized)."""
+    values = np.asarray(values, dtype=np.float64)
+    geq = np.all(values[:, None, :] >= values[None, :, :] - tol, axis=2)  # geq[j, i]: j at least as good as i
+    better = np.any(values[:, None, :] > values[None, :, :] + tol, axis=2)
+    dominated = np.any(geq & better, axis=0)
+    # Keep one copy of duplicated points
+    _, first = np.unique(np.round(values, 6), axis=0, return_index=True)
+    unique = np.zeros(len(values), dtype=bool)
+    unique[first] = True
+    return ~dominated & unique
+
+
+def _solve_points(lp, C, B, time_limit):
+    # Worker task: re-solve the program with each objective vector / extra right-hand side
+    n_extra = B.shape[1]
+    b_ub = lp.b_ub.copy()
+    out = []
+    for c, b in zip(C, B):
+        lp.c = c
+        if n_extra:
+            b_ub[-n_extra:] = b
+            lp.b_ub = b_ub
+        result = lp.solve(time_limit=time_limit)
+        out.append((result.status, result.values))
+    return out
+
+
+def _map(lp, C, B, time_limit, max_workers, chunk_size):
+    if max_workers == 0 or len(C) <= chunk_size:
+        return _solve_points(lp, C, B, time_limit)
+    chunks = range(0, len(C), chunk_size)
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+        futures = [pool.submit(_solve_points, lp, C[k:k + chunk_size], B[k:k + chunk_size], time_limit)
+                   for k in chunks]
+        return [point for future in futures for point in future.result()]
+
+
+def pareto_front(lp, objectives=OBJECTIVES, n_points=100, method="epsilon", economics=None, max_workers=None,
+                 chunk_size=10, time_limit=None):
+    """Sweep the trade-off between objectives on the feasible set of an assembled LinearProgram.
+
+    All objectives are maximized (see OBJECTIVES). Each one is first
+    maximized alone (the payoff table), which bounds the sweep. "epsilon"
+    maximizes the first objective subject to a grid of lower bounds on the
+    others (about n_points in total); "weighted" maximizes n_points weighted
+    sums of the objectives, normalized by their ranges. The program is not
+    modified. Returns a ParetoFront.
+    """
+    if method not in METHODS:
+        raise ValueError(f"unknown method {method!r}, expected one of {METHODS}")
+    start = time.perf_counter()
+    objectives = tuple(objectives)
+    k = len(objectives)
+    vectors = [objective_vector(lp, name, economics) for name in objectives]
+    F = np.array([c for c, _ in vectors])
+    F0 = np.array([c0 for _, c0 in vectors])
+    base = replace(lp, maximize=True)
+
+    def evaluate(points):
+        values = np.full((len(points), k), np.nan)
+        for i, (status, x) in enumerate(points):
+            if status == "Optimal":
+                values[i] = F @ np.concatenate([x[name] for name in lp.blocks]) + F0
+        return values
+
+    # Payoff table: each objective maximized alone
+    payoff = evaluate(_solve_points(base, F, np.zeros((k, 0)), time_limit))
+    if np.isnan(payoff).any():
+        raise ValueError("an objective cannot be maximized on its own (infeasible or unbounded program)")
+    low, high = payoff.min(axis=0), payoff.max(axis=0)
+    span = np.where(high > low, high - low, 1.0)
+
+    if method == "epsilon":
+        # Rows -f_j x <= -(eps_j - f0_j) for the secondary objectives, appended to A_ub
+        per_axis = max(2, int(np.ceil(n_points ** (1 / max(k - 1, 1)))))
+        grids = [np.linspace(low[j], high[j], per_axis) for j in range(1, k)]
+        eps = np.array(list(itertools.product(*grids))).reshape(-1, k - 1)
+        program = replace(base, A_ub=sparse.vstack([lp.A_ub, sparse.csr_matrix(-F[1:])], format="csr"),
+                          b_ub=np.concatenate([lp.b_ub, np.zeros(k - 1)]),
+                          ub_rows=lp.ub_rows + [(f"epsilon_{name}", 0, -1.0) for name in objectives[1:]])
+        C = np.repeat(F[:1], len(eps), axis=0)
+        B = -(eps - F0[1:])
+    else:
+        # Weights on the simplex, the corners included
+        rng = np.random.default_rng(0)
+        W = np.vstack([np.eye(k), rng.dirichlet(np.ones(k), max(n_points - k, 0))])
+        program = base
+        C = (W / span) @ F
+        B = np.zeros((len(W), 0))
+
+    points = _map(program, C, B, time_limit, max_workers, chunk_size)
+    values = evaluate(points)
+    solved = ~np.isnan(values).any(axis=1)
+    keep = np.flatnonzero(solved)[nondominated(values[solved])]
+    return ParetoFront(objectives, values[keep], [points[i][1] for i in keep], payoff, int(solved.sum()),
+                       len(points), time.perf_counter() - start)
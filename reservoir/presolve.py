@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+"""
+Feasibility pre-check of models 1-5, before any solver is called
+
+Every formulation is a single reservoir whose storage follows the water
+balance S[t] = S[t-1] + net[t] - outflow[t], with net = I - O (I - E + P in
+model 5). The constraints of each step bound the outflow (the demand floors,
+model 5's pinned releases, model 3's zero irrigation and hydropower, ...)
+and the storage (capacity, S_min, model 3's S == S_min). Two cumulative sums
+of the balance then give the least and the largest storage any solution can
+reach at every step:
+
+    lower[t] = max(S_low[t],  lower[t-1] + net[t] - outflow_max[t])
+    upper[t] = min(S_high[t], upper[t-1] + net[t] - outflow_min[t])
+
+The program is infeasible if the bounds of one step contradict each other,
+if upper falls below the storage floor (not enough water, even from a full
+reservoir) or if lower rises above capacity (more water than the releases
+and spills can take). The first such conflict is reported as its steps and
+the constraints (group, step) behind it, named as the rows of matrix.py. A
+check over a 100-year monthly record takes a few hundred microseconds, a
+fraction of a solve, so batch sweeps reject infeasible scenarios without
+building a model.
+
+For models 1, 3, 4 and 5 (with the binaries of models 3 and 5 free to take
+either value) the check is exact: when it passes, the program is feasible.
+Model 2 also caps the releases by the storage of the same step, which the
+check only uses as a storage floor, so a model 2 program that passes can
+still be infeasible.
+
+find_iis shrinks the rows of an infeasible LinearProgram to an irreducible
+infeasible subset (IIS): rows that cannot hold together, although any of
+them can be dropped to make the rest feasible. Starting from the rows of the
+conflict found by the check, it takes a few small solves.
+"""
+
+import time
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+from .parameters import SUMMER_MONTHS, SUMMER_SHARE, prepare_params
+
+EXACT = ("model1", "model3", "model3_lp", "model4", "model5", "model5_lp")  # Formulations where passing proves feasibility
+
+
+@dataclass
+class FeasibilityReport:
+    """Outcome of the feasibility pre-check of one formulation and parameter set."""
+    formulation: str  # Formulation ID, e.g. "model4"
+    feasible: bool  # False when the check proves the program infeasible
+    exact: bool  # True when passing the check also proves the program feasible
+    steps: np.ndarray  # Steps of the conflict (empty if feasible)
+    constraints: list  # (group, step) of the conflicting constraints, as the rows of matrix.py ("bounds": variable bounds)
+    message: str  # The conflict in words ("" if feasible)
+    lower: np.ndarray  # Least storage reachable at the end of each step (valid up to the conflict)
+    upper: np.ndarray  # Largest storage reachable at the end of each step (valid up to the conflict)
+    check_time: float = 0.0  # Seconds spent in the check
+    iis: list = None  # (group, step) rows of an irreducible infeasible subset, if computed
+
+
+def _bounds(name, p, axis):
+    # Candidate bounds of every outflow variable, of the total release and of the storage, as
+    # (group, values per step) pairs: the tightest candidate is the bound, its group the constraint
+    # that sets it ("bounds" for the variable bounds)
+    n = len(axis)
+    zero = np.zeros(n)
+    full = np.full(n, np.inf)
+    if name in ("model2", "model3", "model3_lp"):
+        irrigation = np.where(axis.in_months(*SUMMER_MONTHS), p["D_irr"] * SUMMER_SHARE, p["D_irr"])
+    lower, upper, total = {}, {}, []
+    S_low, S_high = [("bounds", zero)], [("capacity", np.full(n, p["K"]))]
+    if name == "model1":
+        lower = {"R_u": [("urban", p["D_u"])], "R_irr": [("irrigation", p["D_irr"])],
+                 "R_hydro": [("hydropower", p["D_hydro"])]}
+    elif name == "model2":
+        # Classes with a demand get exactly their (seasonal) demand, the others nothing;
+        # the releases come out of the storage of the same step
+        for var, group, demand, on in (("R_u", "urban", p["D_u"], p["D_u"] > 0),
+                                       ("R_irr", "irrigation", irrigation, p["D_irr"] > 0)):
+            lower[var] = [(group, np.where(on, demand, 0.0))]
+            upper[var] = [(group, np.where(on, demand, np.inf)), ("zero", np.where(on, np.inf, 0.0))]
+        upper["R_hydro"] = [("zero", np.where(p["D_hydro"] > 0, np.inf, 0.0))]
+        S_low.append(("zero", lower["R_u"][0][1] + lower["R_irr"][0][1]))
+    elif name in ("model3", "model3_lp"):
+        # R >= D - 1 with the priority binary (shortage) at its bound; S pinned to S_min
+        S_low.append(("minimum_storage", np.full(n, p["S_min"])))
+        S_high.append(("minimum_storage", np.full(n, p["S_min"])))
+        lower = {"R_u": [("urban", p["D_u"] - 1)], "R_irr": [("irrigation", irrigation - 1)],
+                 "R_hydro": [("hydropower", p["D_hydro"] - 1)]}
+        upper = {"R_irr": [("zero", zero), ("irrigation_max", p["D_irr"])],
+                 "R_hydro": [("zero", zero), ("hydropower_max", p["D_hydro"])]}
+    elif name == "model4":
+        # R_u == D_u; the irrigation and hydropower rows bound the running sums of the releases
+        S_low.append(("minimum_storage", np.full(n, p["S_min"])))
+        lower = {"R_u": [("urban", p["D_u"])], "R_irr": [], "R_hydro": []}
+        upper = {"R_u": [("urban", p["D_u"])]}
+        total = [("irrigation", p["D_irr"]), ("hydropower", p["D_hydro"])]
+    elif name in ("model5", "model5_lp"):
+        # Pinned releases, spills of at most S0, EF >= MinEF - 1 with the violation binary (shortage) at its bound
+        lower = {"R_u": [("urban", p["D_u"])], "R_irr": [("irrigation", p["D_irr"])],
+                 "R_hydro": [("hydropower", p["D_hydro"])], "Sp": [], "EF": [("environmental_flow", p["MinEF"] - 1)]}
+        upper = {"R_u": [("urban", p["D_u"])], "R_irr": [("irrigation", p["D_irr"])],
+                 "R_hydro": [("hydropower", p["D_hydro"])], "Sp": [("spill", np.full(n, p["S0"]))]}
+    else:
+        raise ValueError(f"unknown formulation {name!r}")
+    for var in set(lower) | set(upper):
+        lower.setdefault(var, []).append(("bounds", zero))
+        upper.setdefault(var, []).append(("bounds", full))
+    net = p["I"] - p["E"] + p["P"] if name in ("model5", "model5_lp") else p["I"] - p["O"]
+    return net, lower, upper, total, S_low, S_high
+
+
+def _bound(candidates, upper):
+    # Tightest candidate per step
+    if len(candidates) == 1:
+        return candidates[0][1]
+    return (np.minimum if upper else np.maximum).reduce([v for _, v in candidates])
+
+
+def _groups(candidates, upper, steps):
+    # Index of the tightest candidate at each of the steps
+    values = np.vstack([v[steps] for _, v in candidates])
+    return np.argmin(values, axis=0) if upper else np.argmax(values, axis=0)
+
+
+def _names(candidates, upper, steps):
+    # Groups of the tightest candidates over the steps, in order of appearance
+    k = _groups(candidates, upper, steps)
+    return [candidates[j][0] for j in sorted(np.unique(k), key=list(k).index)] if len(k) else []
+
+
+def _rows(groups):
+    # Sorted (group, step) pairs, without repeats, from (group, steps) pairs
+    names = sorted({g for g, _ in groups})
+    steps = np.concatenate([np.atleast_1d(ts) for _, ts in groups]).astype(np.int64)
+    codes = np.concatenate([np.full(np.size(ts), names.index(g)) for g, ts in groups])
+    key = np.unique(steps * len(names) + codes)
+    return list(zip([names[c] for c in key % len(names)], (key // len(names)).tolist()))
+
+
+def _envelope(S0, flow, bound, upper):
+    # x[t] = min(bound[t], x[t-1] + flow[t]) from x[-1] = S0 (max for the lower envelope), in closed
+    # form: x[t] = C[t] + min(S0, min over s <= t of bound[s] - C[s]), C the cumulative flow
+    C = np.cumsum(flow)
+    clip = (np.minimum if upper else np.maximum).accumulate(bound - C)
+    return C + (np.minimum if upper else np.maximum)(S0, clip), C, clip
+
+
+def _origin(C, bound, clip, S0, t, upper):
+    # Last step up to t where the envelope sat on its bound, -1 if it runs from S0
+    if (S0 <= clip[t]) if upper else (S0 >= clip[t]):
+        return -1
+    return int(np.flatnonzero(bound[:t + 1] - C[:t + 1] == clip[t])[-1])
+
+
+def _dates(axis, steps, limit=6):
+    unit = {"monthly": "M", "hourly": "h"}.get(axis.freq, "D")
+    labels = [str(np.datetime_as_string(axis.edges[t], unit=unit)) for t in steps[:limit]]
+    return ", ".join(labels) + (f", ... ({len(steps)} steps)" if len(steps) > limit else "")
+
+
+def _check(name, p, axis, tol):
+    # (feasible, steps, constraints, message, lower, upper) of one parameter set; the constraint
+    # groups are only looked up once a conflict is found
+    net, lower, upper, total, S_low, S_high = _bounds(name, p, axis)
+    eps = tol * max(1.0, p["K"], abs(p["S0"]))
+    lo = {var: _bound(lower[var], False) for var in lower}
+    hi = {var: _bound(upper[var], True) for var in upper}
+    lo["S"], hi["S"] = _bound(S_low, False), _bound(S_high, True)
+    lower["S"], upper["S"] = S_low, S_high
+    s_lo, s_hi = lo["S"], hi["S"]
+
+    # Contradictory bounds within a step
+    conflicts = []  # (variable, lower bound group, upper bound group, steps)
+    for var in lo:
+        bad = lo[var] > hi[var] + eps
+        if bad.any():
+            steps = np.flatnonzero(bad)
+            m = len(upper[var])
+            pair = _groups(lower[var], False, steps) * m + _groups(upper[var], True, steps)
+            for code in np.unique(pair):
+                i, j = divmod(int(code), m)
+                conflicts.append((var, lower[var][i][0], upper[var][j][0], steps[pair == code]))
+
+    releases = [var for var in lo if var != "S"]
+    out_min = sum(lo[var] for var in releases)
+    for _, values in total:
+        out_min = np.maximum(out_min, values)
+    out_max = sum(hi[var] for var in releases)
+    # Where the outflow is unbounded the lower envelope restarts at the floor: any drain below
+    # s_lo[t] - s_hi[t-1] does the same as long as the envelopes are consistent
+    drain = net - out_max
+    unbounded = np.isinf(out_max)
+    if unbounded.any():
+        drain[unbounded] = (s_lo - np.concatenate([[p["S0"]], s_hi[:-1]]))[unbounded]
+    low, C_low, clip_low = _envelope(p["S0"], drain, s_lo, False)
+    high, C_high, clip_high = _envelope(p["S0"], net - out_min, s_hi, True)
+
+    if conflicts:
+        steps = np.unique(np.concatenate([ts for *_, ts in conflicts]))
+        constraints = _rows([(g, ts) for _, lo_g, hi_g, ts in conflicts for g in (lo_g, hi_g)])
+        message = "; ".join(f"the {lo_g} and {hi_g} bounds of {var} contradict each other at {_dates(axis, ts)}"
+                            for var, lo_g, hi_g, ts in conflicts)
+        return False, steps, constraints, message, low, high
+
+    short = high < s_lo - eps
+    excess = low > s_hi + eps
+    if not (short.any() or excess.any()):
+        return True, np.zeros(0, dtype=np.int64), [], "", low, high
+    n = len(net)
+    t_short = int(np.argmax(short)) if short.any() else n
+    t_excess = int(np.argmax(excess)) if excess.any() else n
+
+    if t_short <= t_excess:
+        # Not enough water: from S0, or the last step the reservoir could be full, the least
+        # outflow takes the storage below its floor at t
+        t = t_short
+        o = _origin(C_high, s_hi, clip_high, p["S0"], t, True)
+        steps = np.arange(o + 1, t + 1)
+        groups = {}
+        for var in releases:
+            binding = steps[lo[var][steps] > 0]
+            groups.update(dict.fromkeys(_names(lower[var], False, binding)))
+        if total:
+            binding = steps[out_min[steps] > sum(lo[var][steps] for var in releases)]
+            groups.update(dict.fromkeys(_names(total, False, binding)))
+        floor = _names(S_low, False, [t])[0]
+        constraints = [(_names(S_high, True, [o])[0], o)] if o >= 0 else []
+        constraints = _rows(constraints + [(g, steps) for g in ["balance"] + list(groups)] + [(floor, t)])
+        origin = "the initial storage" if o < 0 else f"a full reservoir at {_dates(axis, [o])}"
+        message = (f"not enough water from {_dates(axis, [o + 1])} to {_dates(axis, [t])}: from {origin}, the least "
+                   f"outflow ({', '.join(groups)}) leaves {high[t]:.6g} in storage, below the {floor} floor "
+                   f"of {s_lo[t]:.6g}")
+    else:
+        # Too much water: from S0, or the last step the reservoir could be at its floor, the
+        # largest outflow cannot keep the storage under its limit at t
+        t = t_excess
+        o = _origin(C_low, s_lo, clip_low, p["S0"], t, False)
+        steps = np.arange(o + 1, t + 1)
+        groups = {}
+        for var in releases:
+            groups.update(dict.fromkeys(_names(upper[var], True, steps)))
+        groups.pop("bounds", None)
+        limit = _names(S_high, True, [t])[0]
+        constraints = [(_names(S_low, False, [o])[0], o)] if o >= 0 else []
+        constraints = _rows(constraints + [(g, steps) for g in ["balance"] + list(groups)] + [(limit, t)])
+        origin = "the initial storage" if o < 0 else f"the least storage at {_dates(axis, [o])}"
+        message = (f"too much water from {_dates(axis, [o + 1])} to {_dates(axis, [t])}: from {origin}, the largest "
+                   f"outflow ({', '.join(groups) or 'none'}) leaves {low[t]:.6g} in storage, above the {limit} "
+                   f"limit of {s_hi[t]:.6g}")
+    return False, steps, constraints, message, low, high
+
+
+def check_feasibility(name, axis, iis=False, tol=1e-9, backend="scipy", **params):
+    """Pre-check formulation `name` on a time axis for infeasibility, without solving it.
+
+    params are those of matrix.assemble / formulations.build_model. Bounds
+    are compared with a tolerance of tol * max(1, K, S0). With iis=True, an
+    infeasible program is also assembled and its conflict shrunk to an
+    irreducible infeasible subset (find_iis, solved with `backend`).
+    Returns a FeasibilityReport.
+    """
+    start = time.perf_counter()
+    p = prepare_params(name, len(axis), params)
+    feasible, steps, constraints, message, low, high = _check(name, p, axis, tol)
+    report = FeasibilityReport(name, feasible, name in EXACT, steps, constraints,
+                               f"{name}: {message}" if message else "", low, high, time.perf_counter() - start)
+    if iis and not feasible:
+        from .matrix import assemble
+
+        report.iis = find_iis(assemble(name, axis, **params), sorted({t for _, t in constraints}), backend)
+    return report
+
+
+def find_iis(lp, steps=None, backend="scipy"):
+    """Irreducible infeasible subset of the constraint rows of an infeasible LinearProgram.
+
+    The variable bounds are kept throughout; only rows are dropped. The
+    search starts from the rows of `steps` (e.g. the steps of
+    FeasibilityReport.constraints), or from every row if steps is None or
+    those rows are feasible on their own. Rows are dropped in halving
+    chunks (a deletion filter), one feasibility solve per trial. Returns the
+    (group, step) of each row of the subset; raises ValueError if the
+    program is feasible.
+    """
+    rows = [("ub", i, group, t) for i, (group, t, _) in enumerate(lp.ub_rows)]
+    rows += [("eq", i, group, t) for i, (group, t, _) in enumerate(lp.eq_rows)]
+    zero = np.zeros(lp.n_vars)
+
+    def infeasible(subset):
+        ub = [i for kind, i, _, _ in subset if kind == "ub"]
+        eq = [i for kind, i, _, _ in subset if kind == "eq"]
+        sub = replace(lp, c=zero, c0=0.0, A_ub=lp.A_ub[ub], b_ub=lp.b_ub[ub], A_eq=lp.A_eq[eq], b_eq=lp.b_eq[eq],
+                      ub_rows=[lp.ub_rows[i] for i in ub], eq_rows=[lp.eq_rows[i] for i in eq])
+        return sub.solve(backend=backend).status == "Infeasible"
+
+    keep = rows
+    if steps is not None:
+        steps = set(int(t) for t in steps)
+        window = [row for row in rows if row[3] in steps]
+        if infeasible(window):
+            keep = window
+    if keep is rows and not infeasible(rows):
+        raise ValueError(f"{lp.name}: the program is feasible, it has no infeasible subset")
+
+    # Deletion filter: drop a chunk of rows whenever the rest stays infeasible
+    chunk = max(1, len(keep) // 2)
+    while True:
+        i = 0
+        while i < len(keep):
+            trial = keep[:i] + keep[i + chunk:]
+            if trial and infeasible(trial):
+                keep = trial
+            else:
+                i += chunk
+        if chunk == 1:
+            break
+        chunk //= 2
+    return [(group, t) for _, _, group, t in keep]
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Headless, batched rendering of the result figures
+
+Renders the figure set of the scripts (storage vs S_min and spills, releases,
+demand vs release bars, and the BR / C_sp economics of simulation.py) to PNG
+or SVG files, without pyplot or a display: figures are drawn on the Agg
+canvas by worker processes. Each worker builds a figure template once and
+then only updates its lines, bars and reference levels for every run it
+renders, instead of building the figure again.
+
+Reporting is a separate, optional stage: a Reporter takes runs while the
+simulations go on and renders them in the background, and a disabled
+Reporter does nothing at all.
+"""
+
+import importlib.util
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Figure templates: layout and panels, each with lines and/or bars (key, color, label)
+# and an optional reference level (a key of the run, or a number)
+TEMPLATES = {
+    "storage": dict(shape=(2, 1), figsize=(12, 8), panels=[
+        dict(title="Reservoir Storage", ylabel="Storage ({units})", lines=[("S", "b", None)], level="S_min"),
+        dict(title="Reservoir Spills", ylabel="Spills ({units})", lines=[("Spills", "orange", None)], level=0.0),
+    ]),
+    "releases": dict(shape=(1, 1), figsize=(12, 8), panels=[
+        dict(title="Releases to the water users", ylabel="Releases ({units})",
+             lines=[("R_u", "black", "Urban Releases"), ("R_irr", "red", "Agricultural Releases"),
+                    ("R_hydro", "blue", "Hydropower Releases")]),
+    ]),
+    "demand_release": dict(shape=(1, 3), figsize=(15, 5), panels=[
+        dict(title="Urban Demands vs Releases", ylabel="{units}",
+             bars=[("D_u", "b", "Urban Demand"), ("R_u", "g", "Urban Releases")]),
+        dict(title="Agricultural Demands vs Releases", ylabel="{units}",
+             bars=[("D_irr", "b", "Agricultural Demand"), ("R_irr", "r", "Agricultural Releases")]),
+        dict(title="Hydropower Demands vs Releases", ylabel="{units}",
+             bars=[("D_hydro", "b", "Hydropower Demand"), ("R_hydro", "purple", "Hydropower Releases")]),
+    ]),
+    "benefits": dict(shape=(3, 1), figsize=(12, 12), panels=[
+        dict(title="Benefits from Urban Demand Coverage", ylabel="Value ($)", lines=[("BR_urban", "b", "BR_urban ($)")]),
+        dict(title="Benefits from Agricultural Demand Coverage", ylabel="Value ($)",
+             lines=[("BR_irr", "r", "BR_irr ($)")]),
+        dict(title="Benefits from Hydropower Demand Coverage", ylabel="Value ($)",
+             lines=[("BR_hydro", "purple", "BR_hydro ($)")]),
+    ]),
+    "spill_costs": dict(shape=(3, 1), figsize=(12, 12), panels=[
+        dict(title="Opportunity Costs of Spills to Urban Demand", ylabel="Value ($)",
+             lines=[("C_sp_urb", "b", "C_sp_urb ($)")]),
+        dict(title="Opportunity Costs of Spills to Agricultural Demand", ylabel="Value ($)",
+             lines=[("C_sp_irr", "r", "C_sp_irr ($)")]),
+        dict(title="Opportunity Costs of Spills to Hydropower Demand", ylabel="Value ($)",
+             lines=[("C_sp_hydro", "purple", "C_sp_hydro ($)")]),
+    ]),
+}
+FORMATS = ("png", "svg")
+BAR_WIDTH = 0.35
+
+
+def run_data(result, D_u=None, D_irr=None, D_hydro=None, S_min=None, economics=None):
+    """Collect the arrays of one run (a SimulationResult or SolveResult) for the figures.
+
+    economics is the dict of simulation.benefits_costs. Figures whose data
+    are missing are skipped.
+    """
+    values = getattr(result, "values", None) or {name: getattr(result, name) for name in
+                                                 ("S", "R_u", "R_irr", "R_hydro", "Spills")}
+    data = {"Spills" if name == "Sp" else name: np.asarray(v, dtype=np.float64) for name, v in values.items()}
+    for name, v in (("D_u", D_u), ("D_irr", D_irr), ("D_hydro", D_hydro), ("S_min", S_min)):
+        if v is not None:
+            data[name] = np.asarray(v, dtype=np.float64)
+    data.update((name, np.asarray(v, dtype=np.float64)) for name, v in (economics or {}).items())
+    return data
+
+
+def _keys(panel):
+    keys = {key for key, _, _ in panel.get("lines", []) + panel.get("bars", [])}
+    if isinstance(panel.get("level"), str):
+        keys.add(panel["level"])
+    return keys
+
+
+def _drawable(template, data):
+    # A figure is drawn if at least one of its panels has all its data; the other panels stay empty
+    return any(_keys(panel) <= set(data) for panel in template["panels"])
+
+
+class _Figure:
+    # A figure template on the Agg canvas: built once, then updated with the data of each run
+    def __init__(self, template, units):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        self.template = template
+        self.units = units
+        self.figure = Figure(figsize=template["figsize"])
+        FigureCanvasAgg(self.figure)
+        self.axes = np.atleast_1d(self.figure.subplots(*template["shape"])).reshape(-1)
+        self.n_steps = None
+
+    def _build(self, n_steps):
+        x = np.arange(1, n_steps + 1)
+        self.artists = []
+        for ax, panel in zip(self.axes, self.template["panels"]):
+            ax.clear()
+            lines = [ax.plot(x, np.zeros(n_steps), marker="o", linestyle="-", color=color, label=label)[0]
+                     for _, color, label in panel.get("lines", [])]
+            offsets = (np.arange(len(panel.get("bars", []))) - 0.5) * BAR_WIDTH
+            bars = [ax.bar(x + dx, np.zeros(n_steps), BAR_WIDTH, label=label, color=color, alpha=0.7)
+                    for dx, (_, color, label) in zip(offsets, panel.get("bars", []))]
+            level = ax.axhline(y=0, color="black", linestyle="--") if "level" in panel else None
+            ax.set_title(panel["title"])
+            ax.set_xlabel("Months")
+            ax.set_ylabel(panel["ylabel"].format(units=self.units))
+            if n_steps <= 24:
+                ax.set_xticks(x)
+            if any(label for _, _, label in panel.get("lines", []) + panel.get("bars", [])):
+                ax.legend()
+            self.artists.append((lines, bars, level))
+        self.figure.tight_layout()
+        self.n_steps = n_steps
+
+    def draw(self, data):
+        n_steps = len(next(data[key] for panel in self.template["panels"] for key in _keys(panel)
+                           if key in data and np.ndim(data[key])))
+        if n_steps != self.n_steps:
+            self._build(n_steps)
+        x = np.arange(1, n_steps + 1)
+        missing = np.full(n_steps, np.nan)
+        for ax, panel, (lines, bars, level) in zip(self.axes, self.template["panels"], self.artists):
+            for line, (key, _, _) in zip(lines, panel.get("lines", [])):
+                line.set_data(x, data.get(key, missing))
+            for container, (key, _, _) in zip(bars, panel.get("bars", [])):
+                for rect, height in zip(container.patches, data.get(key, missing)):
+                    rect.set_height(height)
+            if level is not None:
+                value = panel["level"] if not isinstance(panel["level"], str) else data.get(panel["level"])
+                level.set_visible(value is not None)
+                if value is not None:
+                    level.set_ydata([float(value)] * 2)
+            ax.relim()
+            ax.autoscale_view()
+
+    def save(self, path, dpi):
+        self.figure.savefig(path, dpi=dpi)
+
+
+_FIGURES = {}  # Templates built in this process, by (template, units)
+
+
+def _render(runs, directory, figures, formats, units, dpi):
+    # Worker task: render every figure of a batch of (name, data) runs
+    paths = []
+    for name, data in runs:
+        for figure in figures:
+            template = TEMPLATES[figure]
+            if not _drawable(template, data):
+                continue
+            key = (figure, units)
+            if key not in _FIGURES:
+                _FIGURES[key] = _Figure(template, units)
+            _FIGURES[key].draw(data)
+            for ext in formats:
+                path = os.path.join(directory, f"{name}_{figure}.{ext}")
+                _FIGURES[key].save(path, dpi)
+                paths.append(path)
+    return paths
+
+
+class Reporter:
+    """Render runs to image files in the background, in batches.
+
+    submit(name, data) queues a run (see run_data); every `batch` runs are
+    sent to a worker process, which writes <name>_<figure>.<format> files in
+    directory for each of `figures` (default: all TEMPLATES). max_workers=0
+    renders in the calling process. With enabled=False submit() does
+    nothing, so reporting can be switched off without touching the code
+    that produces the runs. close() (or leaving the with block) waits for
+    the rendering and returns the list of files written.
+    """
+
+    def __init__(self, directory, figures=None, formats=("png",), units="million m³", dpi=100,
+                 max_workers=None, batch=8, enabled=True):
+        unknown = [f for f in formats if f not in FORMATS]
+        if unknown:
+            raise ValueError(f"unsupported formats {unknown}, expected {FORMATS}")
+        self.enabled = enabled
+        self.options = (directory, tuple(figures or TEMPLATES), tuple(formats), units, dpi)
+        self.batch = batch
+        self.max_workers = max_workers
+        self._pending, self._futures, self._paths = [], [], []
+        self._pool = None
+        if enabled:
+            if importlib.util.find_spec("matplotlib") is None:
+                raise ImportError("rendering figures requires the matplotlib package")
+            os.makedirs(directory, exist_ok=True)
+            if max_workers != 0:
+                self._pool = ProcessPoolExecutor(max_workers=max_workers)
+
+    def submit(self, name, data):
+        if not self.enabled:
+            return
+        self._pending.append((name, data))
+        if len(self._pending) >= self.batch:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        runs, self._pending = self._pending, []
+        if self._pool is None:
+            self._paths += _render(runs, *self.options)
+        else:
+            self._futures.append(self._pool.submit(_render, runs, *self.options))
+
+    def close(self):
+        if self.enabled:
+            self._flush()
+            for future in self._futures:
+                self._paths += future.result()
+            self._futures = []
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+        return self._paths
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def render_report(runs, directory, **options):
+    """Render a list of (name, data) runs; options are those of Reporter. Returns the files written."""
+    with Reporter(directory, **options) as reporter:
+        for name, data in runs:
+            reporter.submit(name, data)
+    return reporter.close()
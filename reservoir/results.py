@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Result containers of the optimization models
+"""
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+
+@dataclass
+class SolveResult:
+    """Outcome of one solve of a formulation."""
+    formulation: str  # Formulation ID, e.g. "model4"
+    status: str  # Solver status, as PuLP names it: "Optimal", "Infeasible", ...
+    objective: float  # Objective value (None unless optimal)
+    values: dict = field(default_factory=dict)  # Variable name -> array over the time steps
+    build_time: float = 0.0  # Seconds spent building (or last rebuilding) the model
+    solve_time: float = 0.0  # Seconds spent in the solver call
+    backend: str = None  # Solver backend (solvers.BACKENDS), if solved through reservoir.solvers
+    iterations: int = None  # Simplex / interior point iterations, if the backend reports them
+    nodes: int = None  # Branch-and-bound nodes of a MIP, if the backend reports them
+    log: str = ""  # Captured solver output
+
+
+@dataclass
+class BatchResult:
+    """Results of one formulation solved over a table of scenarios, one row per scenario."""
+    formulation: str
+    labels: list  # Scenario labels, in input order
+    status: np.ndarray  # Solver status per scenario; "Error" if the solve raised
+    objective: np.ndarray  # Objective value per scenario (NaN unless optimal)
+    values: dict  # Variable name -> array [n_scenarios, n_steps] (NaN rows unless solved)
+    build_time: np.ndarray  # Seconds spent building or updating the model, per scenario
+    solve_time: np.ndarray  # Seconds spent in the solver, per scenario
+    errors: dict = field(default_factory=dict)  # Scenario index -> error message
+
+    @property
+    def ok(self):
+        """True for the scenarios solved to optimality."""
+        return self.status == "Optimal"
+
+    def failures(self):
+        """(label, status, error message) of every scenario not solved to optimality."""
+        return [(self.labels[i], self.status[i], self.errors.get(i, ""))
+                for i in np.flatnonzero(~self.ok)]
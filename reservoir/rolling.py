@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Rolling-horizon (model predictive control) operation with model 4
+
+At every step the minimum-unmet-demand model is solved over a look-ahead
+window with the current inflow forecast; only the first period's releases
+are committed. The reservoir then moves on with the realized inflow, and the
+realized storage becomes the initial storage of the next window. The model
+is built once and successive solves only update its right-hand sides. With
+the "highs" backend the model also stays loaded in one HiGHS instance
+(solvers.HighsModel), so every window is re-solved from the optimal basis of
+the previous one; with "pulp" and "matrix" each solve starts from scratch
+(CBC's warm start is a MIP start, which does nothing for this LP) and the
+saving is only that of not rebuilding the model.
+"""
+
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from .timeaxis import TimeAxis
+
+BACKENDS = ("pulp", "matrix", "highs")
+
+
+@dataclass
+class RollingResult:
+    """Realized trajectories of a rolling-horizon run, one value per step."""
+    S: np.ndarray  # Storage at the end of each step
+    R_u: np.ndarray  # Committed releases for urban use
+    R_irr: np.ndarray  # Committed releases for agricultural use
+    R_hydro: np.ndarray  # Committed releases for hydropower use
+    Spills: np.ndarray  # Spills above the capacity
+    status: np.ndarray  # Solver status of each decision step
+    update_time: np.ndarray  # Seconds spent building (first step) or updating the model
+    solve_time: np.ndarray  # Seconds spent in the solver
+
+
+def _window(series, t, window):
+    # Values of steps t .. t + window - 1, wrapping around past the end of the series
+    return np.take(series, np.arange(t, t + window), mode="wrap")
+
+
+def perfect_forecast(I):
+    """Forecast function returning the actual inflows (wrapping around past the horizon)."""
+    I = np.asarray(I, dtype=np.float64)
+    return lambda t, window: _window(I, t, window)
+
+
+def _build(backend, axis, params):
+    if backend in ("matrix", "highs"):
+        from .matrix import assemble
+        lp = assemble("model4", axis, **params)
+        if backend == "highs":
+            from .solvers import HighsModel
+            return HighsModel(lp)
+        return lp
+    from .formulations import build_model
+    return build_model("model4", axis, **params)
+
+
+def rolling_horizon(axis, I, O, D_u, D_irr, D_hydro, K, S0, S_min, window=12, forecast=None,
+                    backend="pulp", reuse=True):
+    """Operate the reservoir over `axis` by re-optimizing model 4 at every step.
+
+    I is the realized inflow; forecast(t, window) returns the inflows expected
+    for steps t .. t + window - 1 when deciding step t (by default the
+    realized ones, i.e. perfect foresight). O and the demands are known in
+    advance; past the end of the horizon they wrap around. backend is "pulp"
+    (CBC), "matrix" (HiGHS through SciPy) or "highs" (one persistent highspy
+    model, re-solved from the previous basis). reuse=False rebuilds the
+    model at every step, for comparison.
+
+    The committed releases are applied to the realized inflow in order of
+    priority, as far as the water allows; storage above K spills. If a window
+    has no optimal solution (e.g. the realized storage fell below S_min), the
+    step falls back to releasing the demands in order of priority.
+    Returns a RollingResult.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend {backend!r}, expected one of {BACKENDS}")
+    I, O, D_u, D_irr, D_hydro = (np.asarray(a, dtype=np.float64) for a in (I, O, D_u, D_irr, D_hydro))
+    if forecast is None:
+        forecast = perfect_forecast(I)
+    n_steps = len(axis)
+    window_axis = TimeAxis(window, axis.freq, axis.start)
+
+    S, R_u, R_irr, R_hydro, Spills = (np.empty(n_steps) for _ in range(5))
+    status = np.empty(n_steps, dtype=object)
+    update_time, solve_time = np.zeros(n_steps), np.zeros(n_steps)
+    model = None
+    s = float(S0)
+
+    for t in range(n_steps):
+        params = dict(I=forecast(t, window), O=_window(O, t, window), D_u=_window(D_u, t, window),
+                      D_irr=_window(D_irr, t, window), D_hydro=_window(D_hydro, t, window), S0=s)
+        start = time.perf_counter()
+        if model is None or not reuse:
+            model = _build(backend, window_axis, dict(params, K=K, S_min=S_min))
+        else:
+            model.update(**params)
+        update_time[t] = time.perf_counter() - start
+
+        result = model.solve()
+        status[t], solve_time[t] = result.status, result.solve_time
+        if result.status == "Optimal":
+            plan = [result.values[name][0] for name in ("R_u", "R_irr", "R_hydro")]
+        else:
+            plan = [D_u[t], D_irr[t], D_hydro[t]]
+
+        # Realized step: the committed releases, in order of priority, as far as the water allows
+        x = s + I[t] - O[t]
+        for out, r in zip((R_u, R_irr, R_hydro), plan):
+            out[t] = max(0.0, min(x, r))
+            x -= out[t]
+        Spills[t] = max(0.0, x - K)
+        s = S[t] = min(max(x, 0.0), K)
+
+    return RollingResult(S, R_u, R_irr, R_hydro, Spills, status, update_time, solve_time)
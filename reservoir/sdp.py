@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+Stochastic dynamic programming (SDP) of monthly release policies
+
+The state at the start of a month is the storage, on a grid between S_min and
+K, and the class of the month's inflow; inflow classes follow a monthly
+Markov chain fitted to a historical or synthetic series. The decision is the
+total release target, shared among the users by the urban -> irrigation ->
+hydropower priority cascade of simulation.py, with the same water balance,
+spills and storage limits. The cost of a month is the weighted shortage of
+each user, raised to `power` (> 1 favours hedging: small shortages now
+rather than a large one later).
+
+The backward recursion runs over whole years until the policy repeats from
+one year to the next. Each Bellman update is evaluated for all storages,
+inflow classes and release targets at once; the storage grid can be split
+into blocks evaluated by worker processes. The result is a ReleasePolicy, a
+lookup table [month, storage, inflow class] that simulates inflow ensembles
+with array operations.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from .engine import SimulationResult, _as_series
+
+
+def _as_seasonal(value, period):
+    # Periodic inputs (O, demands): a scalar or one value per season
+    return np.broadcast_to(np.asarray(value, dtype=np.float64), (period,)).copy()
+
+
+@dataclass
+class InflowMarkovChain:
+    """Monthly inflow classes and the probabilities of moving between them."""
+    edges: np.ndarray  # Class boundaries per season, [period, n_classes - 1]
+    values: np.ndarray  # Representative (mean) inflow of each class, [period, n_classes]
+    transition: np.ndarray  # P(class l in season j + 1 | class k in season j), [period, n_classes, n_classes]
+
+    @classmethod
+    def fit(cls, historical, n_classes=5, period=12):
+        """Fit equiprobable classes per season to a series [n_steps] or an ensemble [n_traces, n_steps].
+
+        Each trace is assumed to start at season 1; transitions from the last
+        season wrap into season 1 of the following year.
+        """
+        q = np.atleast_2d(np.asarray(historical, dtype=np.float64))
+        n_traces, n_steps = q.shape
+        if n_steps % period or n_traces * n_steps < 2 * period:
+            raise ValueError(f"inflows must cover at least two whole cycles of {period} steps")
+        season = np.arange(n_steps) % period
+        by_season = [q[:, season == j].reshape(-1) for j in range(period)]
+
+        edges = np.array([np.quantile(x, np.arange(1, n_classes) / n_classes) for x in by_season])
+        classes = np.empty(q.shape, dtype=np.intp)
+        values = np.empty((period, n_classes))
+        for j, x in enumerate(by_season):
+            c = np.searchsorted(edges[j], x, side="right")
+            classes[:, season == j] = c.reshape(n_traces, -1)
+            for k in range(n_classes):
+                values[j, k] = x[c == k].mean() if np.any(c == k) else np.quantile(x, (k + 0.5) / n_classes)
+
+        # Count the transitions within each trace; seasons without data get uniform rows
+        counts = np.zeros((period, n_classes, n_classes))
+        np.add.at(counts, (season[:-1], classes[:, :-1], classes[:, 1:]), 1.0)
+        totals = counts.sum(axis=2, keepdims=True)
+        transition = np.where(totals > 0, counts / np.where(totals > 0, totals, 1.0), 1.0 / n_classes)
+        return cls(edges, values, transition)
+
+    @property
+    def period(self):
+        return len(self.values)
+
+    def classify(self, season, I):
+        """Inflow class of inflows I observed in seasons `season` (arrays of the same shape)."""
+        edges = self.edges[season]
+        return np.sum(np.asarray(I, dtype=np.float64)[..., None] >= edges, axis=-1)
+
+
+def _operate(s, I, O, D_u, D_irr, D_hydro, target, K, S_min):
+    # One month of simulation.py, with the releases capped by the total release target
+    s = s + I - O
+    R_u = np.minimum(s, np.minimum(target, D_u))
+    s = s - R_u
+    R_irr = np.minimum(s, np.minimum(target - R_u, D_irr))
+    s = s - R_irr
+    R_hydro = np.minimum(s, np.minimum(target - R_u - R_irr, D_hydro))
+    s = s - R_hydro
+    Spills = np.maximum(0, s - K)
+    return np.minimum(np.maximum(S_min, s), K), R_u, R_irr, R_hydro, Spills
+
+
+def _interpolation(grid, x):
+    # Lower grid index and weight of the upper neighbour for linear interpolation
+    i = np.clip(np.searchsorted(grid, x, side="right") - 1, 0, len(grid) - 2)
+    w = np.clip((x - grid[i]) / (grid[i + 1] - grid[i]), 0.0, 1.0)
+    return i, w
+
+
+def _bellman(grid, s, inflows, transition, V_next, O, D_u, D_irr, D_hydro, targets, K, S_min,
+             weights, power, discount):
+    # Minimum expected cost and best release target for storages s [n_s] and every inflow class:
+    # every array below is [n_s, n_classes, n_targets]
+    s_next, R_u, R_irr, R_hydro, _ = _operate(s[:, None, None], inflows[None, :, None], O, D_u, D_irr, D_hydro,
+                                              targets[None, None, :], K, S_min)
+    cost = (weights[0] * (D_u - R_u) ** power + weights[1] * (D_irr - R_irr) ** power
+            + weights[2] * (D_hydro - R_hydro) ** power)
+    # Expected value of the next month over the next inflow class, interpolated in storage
+    i, w = _interpolation(grid, s_next)
+    V = V_next[i] * (1 - w)[..., None] + V_next[i + 1] * w[..., None]
+    Q = cost + discount * np.einsum("sctl,cl->sct", V, transition)
+    best = np.argmin(Q, axis=2)
+    return np.take_along_axis(Q, best[..., None], axis=2)[..., 0], targets[best]
+
+
+@dataclass
+class ReleasePolicy:
+    """Release targets per month, storage and inflow class, with the problem they solve."""
+    storage: np.ndarray  # Storage grid from S_min to K
+    release: np.ndarray  # Total release target, [period, n_storage, n_classes]
+    value: np.ndarray  # Expected cost-to-go (relative), [period, n_storage, n_classes]
+    inflows: InflowMarkovChain
+    O: np.ndarray  # Outflows per season
+    D_u: np.ndarray  # Demands per season
+    D_irr: np.ndarray
+    D_hydro: np.ndarray
+    K: float
+    S_min: float
+    n_years: int  # Annual sweeps of the backward recursion
+
+    def target(self, season, s, inflow_class):
+        """Release targets in one season for storages s and inflow classes (arrays of the same shape).
+
+        Storages between the grid points are interpolated linearly.
+        """
+        i, w = _interpolation(self.storage, s)
+        table = self.release[season]
+        return table[i, inflow_class] * (1 - w) + table[i + 1, inflow_class] * w
+
+    def simulate(self, I, S0, season=None):
+        """Operate the reservoir with the policy for inflow traces I [n_steps] or [n_traces, n_steps].
+
+        season gives the season index (0 = January) of each step, by default
+        t % period (e.g. TimeAxis.month - 1). Returns a SimulationResult, 1-D
+        for a single trace, like engine.simulate_batch.
+        """
+        squeeze = np.ndim(I) <= 1
+        (I,) = _as_series(I)
+        n_traces, n_steps = I.shape
+        period = self.inflows.period
+        season = np.arange(n_steps) % period if season is None else np.asarray(season)
+        classes = self.inflows.classify(np.broadcast_to(season, I.shape), I).T
+
+        out = np.empty((5, n_steps, n_traces))
+        s = np.broadcast_to(np.asarray(S0, dtype=np.float64), (n_traces,))
+        I = I.T
+        for t in range(n_steps):
+            m = season[t]
+            target = self.target(m, s, classes[t])
+            s, *releases = _operate(s, I[t], self.O[m], self.D_u[m], self.D_irr[m], self.D_hydro[m], target,
+                                    self.K, self.S_min)
+            out[0, t] = s
+            out[1:, t] = releases
+
+        result = SimulationResult(*(np.ascontiguousarray(a.T) for a in out))
+        if squeeze:
+            result = SimulationResult(*(a[0] for a in (result.S, result.R_u, result.R_irr,
+                                                      result.R_hydro, result.Spills)))
+        return result
+
+
+def solve_sdp(inflows, O, D_u, D_irr, D_hydro, K, S_min, n_storage=101, n_targets=51,
+              weights=(1.0, 1.0, 1.0), power=2.0, discount=1.0, max_years=100, max_workers=0, n_blocks=None):
+    """Compute a release policy by backward recursion over the months of the year.
+
+    inflows is a fitted InflowMarkovChain; O and the demands are scalars or one
+    value per season. The release targets range from 0 to the season's total
+    demand in n_targets steps (the last one is the standard operating policy
+    of simulation.py). weights are the costs of the urban, irrigation and
+    hydropower shortages. The recursion stops after max_years sweeps, or
+    earlier once a whole year's policy repeats; the value function is
+    re-centered every year, so discount=1 gives the average-cost policy.
+
+    max_workers=0 evaluates the Bellman updates in the calling process;
+    otherwise the storage grid is split into n_blocks blocks (default: one
+    per worker) evaluated by a process pool (max_workers=None uses all CPUs).
+    Returns a ReleasePolicy.
+    """
+    if max_years < 1:
+        raise ValueError(f"max_years must be at least 1, got {max_years}")
+    period = inflows.period
+    O, D_u, D_irr, D_hydro = (_as_seasonal(a, period) for a in (O, D_u, D_irr, D_hydro))
+    grid = np.linspace(S_min, K, n_storage)
+    weights = np.asarray(weights, dtype=np.float64)
+    n_classes = inflows.values.shape[1]
+    release = np.zeros((period, n_storage, n_classes))
+    value = np.zeros((period, n_storage, n_classes))
+    V_next = np.zeros((n_storage, n_classes))
+
+    pool = None if max_workers == 0 else ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        if pool is not None:
+            n_blocks = n_blocks or max_workers or os.cpu_count() or 1
+        blocks = np.array_split(np.arange(n_storage), n_blocks or 1)
+        for year in range(max_years):
+            previous = release.copy()
+            for m in reversed(range(period)):
+                targets = np.linspace(0.0, D_u[m] + D_irr[m] + D_hydro[m], n_targets)
+                args = (inflows.values[m], inflows.transition[m], V_next, O[m], D_u[m], D_irr[m], D_hydro[m],
+                        targets, K, S_min, weights, power, discount)
+                if pool is None:
+                    parts = [_bellman(grid, grid[b], *args) for b in blocks]
+                else:
+                    parts = [f.result() for f in [pool.submit(_bellman, grid, grid[b], *args) for b in blocks]]
+                value[m] = np.concatenate([p[0] for p in parts])
+                release[m] = np.concatenate([p[1] for p in parts])
+                V_next = value[m]
+            # Re-center the values, so that they stay bounded without discounting
+            V_next = V_next - V_next.min()
+            if year and np.array_equal(release, previous):
+                break
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return ReleasePolicy(grid, release, value, inflows, O, D_u, D_irr, D_hydro, float(K), float(S_min), year + 1)
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Global sensitivity analysis of the simulation parameters
+
+The hand-edited constants of the scripts (K, S_min, the unit values and
+costs, the spill shares, ...) are given ranges, sampled by Latin hypercube,
+Sobol (Saltelli) or Morris designs, and evaluated in chunks spread over a
+process pool. Within a chunk, every sample is one scenario of the batched
+water balance (engine / kernel), with per-sample K, S0 and S_min, and the
+economics are evaluated with per-sample coefficients, so no step loops over
+samples in Python. The outputs are reduced to one value per sample (net
+benefits, reliability of each use, spills) before leaving the worker.
+
+Indices: first-order and total Sobol indices (Saltelli / Jansen estimators)
+for the "sobol" design, Morris mu* and sigma for "morris", and Spearman rank
+correlations for plain Latin hypercube samples.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+
+import numpy as np
+
+from .economics import Economics
+from .engine import simulate_batch
+from .kernel import HAVE_NUMBA, simulate_compiled
+from .parameters import SIMULATION_CROP_SALES, SIMULATION_ECONOMICS
+
+METHODS = ("lhs", "sobol", "morris")
+OUTPUTS = ("net_benefits", "reliability_urban", "reliability_irrigation", "reliability_hydropower", "spills")
+# Parameters besides the Economics fields: reservoir scalars, crop price, and multipliers of the series
+RESERVOIR_PARAMETERS = ("K", "S0", "S_min")
+SCALING_PARAMETERS = ("Crop_Sales", "I_scale", "D_scale")
+
+_simulate = simulate_compiled if HAVE_NUMBA else simulate_batch
+
+
+@dataclass
+class SensitivityResult:
+    """Samples, outputs and sensitivity indices of a sweep."""
+    method: str
+    names: list  # Parameter names, in the order of the sample columns
+    samples: np.ndarray  # Parameter values, [n_evaluations, n_parameters]
+    outputs: dict  # Output name -> values per evaluation
+    indices: dict  # Output name -> {index name: values per parameter}
+
+
+def simulate_samples(samples, I, O, D_u, D_irr, D_hydro, K, S0, S_min, economics=None, Crop_Yields=0.0,
+                     tol=1e-9):
+    """Simulate one scenario per sample and reduce each to the OUTPUTS.
+
+    samples maps parameter names to arrays [n]: K, S0, S_min, any field of
+    economics.Economics (e.g. Spill_Share_Urban, Price_Electricity),
+    Crop_Sales (the crop revenue is Crop_Sales * sum(Crop_Yields)), I_scale
+    and D_scale (multipliers of the inflows and of all demands). Parameters
+    not sampled keep the given values; economics defaults to the economics
+    of simulation.py (parameters.SIMULATION_ECONOMICS, with a crop revenue
+    of SIMULATION_CROP_SALES * sum(Crop_Yields)), not to the model 5
+    defaults of Economics(). Returns a dict of arrays [n].
+    """
+    n = len(next(iter(samples.values())))
+    unknown = set(samples) - set(RESERVOIR_PARAMETERS) - set(SCALING_PARAMETERS) - {f.name for f in fields(Economics)}
+    if unknown:
+        raise ValueError(f"unknown parameters {sorted(unknown)}")
+    scale = samples.get("I_scale", 1.0), samples.get("D_scale", 1.0)
+    I = np.multiply.outer(np.broadcast_to(scale[0], (n,)), np.asarray(I, dtype=np.float64))
+    D_scale = np.broadcast_to(scale[1], (n,))[:, None]
+    demands = [D_scale * np.asarray(D, dtype=np.float64) for D in (D_u, D_irr, D_hydro)]
+    result = _simulate(I, O, *demands, samples.get("K", K), samples.get("S0", S0), samples.get("S_min", S_min))
+
+    # Economics with per-sample coefficients: the net benefits of simulation.py, crop revenue included
+    if economics is None:
+        economics = Economics(**SIMULATION_ECONOMICS, Crop_Revenue=SIMULATION_CROP_SALES * np.sum(Crop_Yields))
+    base = {f.name: getattr(economics, f.name) for f in fields(Economics)}
+    base.update((name, samples[name]) for name in base if name in samples)
+    if "Crop_Sales" in samples:
+        base["Crop_Revenue"] = samples["Crop_Sales"] * np.sum(Crop_Yields)
+    out = {"net_benefits": Economics(**base).net_benefits(result.R_u, result.R_irr, result.R_hydro, result.Spills)}
+    for name, D, R in zip(("urban", "irrigation", "hydropower"), demands, (result.R_u, result.R_irr, result.R_hydro)):
+        out[f"reliability_{name}"] = np.mean(R >= D - tol, axis=1)
+    out["spills"] = result.Spills.sum(axis=1)
+    return out
+
+
+def _design(method, n, d, seed, levels=4):
+    # Unit-cube design of the method, and what the index estimators need to read it back
+    from scipy.stats import qmc
+
+    rng = np.random.default_rng(seed)
+    if method == "lhs":
+        return qmc.LatinHypercube(d=d, seed=rng).random(n)
+    if method == "sobol":
+        # Saltelli: matrices A and B, then A with column i taken from B, for every i
+        AB = qmc.Sobol(d=2 * d, seed=rng).random(n)
+        A, B = AB[:, :d], AB[:, d:]
+        blocks = [A, B]
+        for i in range(d):
+            Ai = A.copy()
+            Ai[:, i] = B[:, i]
+            blocks.append(Ai)
+        return np.concatenate(blocks)
+    # Morris: n trajectories of d + 1 points on a grid of `levels` levels, one factor moved per step
+    delta = levels / (2 * (levels - 1))
+    start = rng.integers(0, levels // 2, (n, d)) / (levels - 1)
+    order = np.argsort(rng.random((n, d)), axis=1)
+    steps = np.zeros((n, d + 1, d))
+    for k in range(1, d + 1):
+        steps[:, k] = steps[:, k - 1]
+        steps[np.arange(n), k, order[:, k - 1]] = delta
+    return (start[:, None, :] + steps).reshape(-1, d)
+
+
+def _indices(method, X, y, n, d, levels=4):
+    if method == "lhs":
+        # Spearman rank correlation of each parameter with the output
+        rank = lambda a: np.argsort(np.argsort(a, axis=0), axis=0).astype(np.float64)
+        rx, ry = rank(X), rank(y)
+        rx -= rx.mean(axis=0)
+        ry -= ry.mean()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return {"spearman": rx.T @ ry / np.sqrt((rx ** 2).sum(axis=0) * (ry ** 2).sum())}
+    if method == "sobol":
+        fA, fB, fAB = y[:n], y[n:2 * n], y[2 * n:].reshape(d, n)
+        V = np.var(np.concatenate([fA, fB]))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return {"S1": np.mean(fB * (fAB - fA), axis=1) / V,  # Saltelli (2010)
+                    "ST": 0.5 * np.mean((fA - fAB) ** 2, axis=1) / V}  # Jansen (1999)
+    # Morris elementary effects, in units of the (unit-cube) step
+    delta = levels / (2 * (levels - 1))
+    y = y.reshape(n, d + 1)
+    X = X.reshape(n, d + 1, d)
+    moved = np.argmax(np.abs(np.diff(X, axis=1)), axis=2)  # [n, d]: factor moved at each step
+    effects = np.empty((n, d))
+    np.put_along_axis(effects, moved, np.diff(y, axis=1) / delta, axis=1)
+    return {"mu_star": np.abs(effects).mean(axis=0), "mu": effects.mean(axis=0), "sigma": effects.std(axis=0, ddof=1)}
+
+
+def _evaluate_chunk(names, values, base):
+    # Worker task: simulate a chunk of samples
+    return simulate_samples({name: values[:, j] for j, name in enumerate(names)}, **base)
+
+
+def run_sensitivity(ranges, n, base, method="sobol", seed=None, max_workers=None, chunk_size=10000):
+    """Sample the parameter ranges, evaluate the samples and compute sensitivity indices.
+
+    ranges maps parameter names (see simulate_samples) to (low, high).
+    base holds the other arguments of simulate_samples: I, O, D_u, D_irr,
+    D_hydro, K, S0, S_min and optionally economics, Crop_Yields and tol.
+    n is the number of samples ("lhs"), of base samples ("sobol": n must be
+    a power of 2, and n * (d + 2) evaluations are run) or of trajectories
+    ("morris": n * (d + 1) evaluations). Chunks of chunk_size samples are
+    evaluated by a process pool (max_workers=0: in the calling process).
+    Returns a SensitivityResult.
+    """
+    if method not in METHODS:
+        raise ValueError(f"unknown method {method!r}, expected one of {METHODS}")
+    names = list(ranges)
+    d = len(names)
+    low, high = np.array([ranges[name] for name in names], dtype=np.float64).T
+    U = _design(method, n, d, seed)
+    X = low + U * (high - low)
+
+    chunks = [X[start:start + chunk_size] for start in range(0, len(X), chunk_size)]
+    if max_workers == 0:
+        parts = [_evaluate_chunk(names, chunk, base) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+            parts = list(pool.map(_evaluate_chunk, [names] * len(chunks), chunks, [base] * len(chunks)))
+    outputs = {name: np.concatenate([p[name] for p in parts]) for name in OUTPUTS}
+    indices = {name: _indices(method, U, y, n, d) for name, y in outputs.items()}
+    return SensitivityResult(method, names, X, outputs, indices)
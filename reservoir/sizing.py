@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Storage-yield analysis: reliability against capacity and demand
+
+How large must the reservoir be to meet the demands at a given reliability?
+Reliability (the share of steps with a demand fully met) is evaluated for
+many candidate capacities K and demand scalings in one batched run of the
+water balance, every (scaling, K) pair being one scenario. The minimum K is
+found by bisection, all demand classes and scalings at once, inside the
+bracket given by a vectorized sequent-peak pass: the storage that meets the
+whole (scaled) demand at every step of the record.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from .engine import simulate_batch
+from .kernel import HAVE_NUMBA, simulate_compiled
+
+DEMAND_CLASSES = ("urban", "irrigation", "hydropower")
+
+_simulate = simulate_compiled if HAVE_NUMBA else simulate_batch
+
+
+def sequent_peak(I, O, demand, cycles=2):
+    """Storage needed to release `demand` at every step, by the sequent-peak algorithm.
+
+    I, O and demand are [n_steps] or [n_series, n_steps]; the record is run
+    `cycles` times, so a deficit at the end carries over to the start.
+    Returns one capacity per series (inf where the mean demand exceeds the
+    mean net inflow).
+    """
+    I, O, demand = np.broadcast_arrays(*(np.atleast_2d(np.asarray(a, dtype=np.float64)) for a in (I, O, demand)))
+    shortfall = (demand - (I - O)).T  # Time-major, so each step reads a contiguous row
+    deficit = np.zeros(shortfall.shape[1])
+    peak = np.zeros(shortfall.shape[1])
+    for _ in range(cycles):
+        for row in shortfall:
+            deficit = np.maximum(0.0, deficit + row)
+            np.maximum(peak, deficit, out=peak)
+    return np.where(shortfall.sum(axis=0) > 0, np.inf, peak)
+
+
+def _reliability(I, O, demands, K, S0, S_min, cycles, tol):
+    # Share of steps with each demand met over the last run of the record, [3, n_scenarios]
+    n_steps = np.shape(I)[-1]
+    I, O = (np.tile(np.asarray(a, dtype=np.float64), cycles) for a in (I, O))
+    result = _simulate(I, O, *(np.tile(D, (1, cycles)) for D in demands), K, S_min if S0 is None else S0, S_min)
+    return np.array([np.mean(R[:, -n_steps:] >= D - tol, axis=1) for D, R in
+                     zip(demands, (result.R_u, result.R_irr, result.R_hydro))])
+
+
+def reliability_curves(K, I, O, D_u, D_irr, D_hydro, S_min=0.0, S0=None, scales=1.0, cycles=2, tol=1e-9):
+    """Reliability of each demand class for every demand scaling and capacity, in one batched run.
+
+    K is an array of candidate capacities, scales multiplies all the demands.
+    S0=None starts each reservoir at S_min. The record is run `cycles` times
+    in a row and reliability is measured on the last run, so the first runs
+    only warm up the storage. Returns an array [n_scales, n_K, 3] (urban,
+    irrigation, hydropower).
+    """
+    K = np.atleast_1d(np.asarray(K, dtype=np.float64))
+    scales = np.atleast_1d(np.asarray(scales, dtype=np.float64))
+    n_scales, n_K = len(scales), len(K)
+    scale = np.repeat(scales, n_K)[:, None]
+    KK = np.tile(K, n_scales)
+    demands = [scale * np.asarray(D, dtype=np.float64) for D in (D_u, D_irr, D_hydro)]
+    return _reliability(I, O, demands, KK, S0, S_min, cycles, tol).T.reshape(n_scales, n_K, 3)
+
+
+@dataclass
+class YieldCurves:
+    """Minimum capacity reaching the target reliability, per demand class and demand scaling."""
+    target: float  # Reliability target
+    scales: np.ndarray  # Demand scalings
+    K: dict  # Demand class -> minimum capacity per scaling (nan: not reached below K_max)
+    full_yield: np.ndarray  # Sequent-peak capacity for the whole scaled demand, per scaling
+
+
+def yield_curves(target, I, O, D_u, D_irr, D_hydro, S_min=0.0, S0=None, scales=1.0, classes=DEMAND_CLASSES,
+                 K_max=None, atol=1e-3, max_iter=60, cycles=2, tol=1e-9):
+    """Minimum capacity meeting each demand class with reliability >= target, by bisection.
+
+    Every (class, scaling) pair is bisected at the same time: each iteration
+    is one batched simulation of all the midpoints. The bracket is [S_min,
+    K_max], with K_max defaulting to S_min plus the sequent-peak capacity of
+    the whole demand, which meets every demand at every step; when the demand
+    exceeds the inflow, to S_min plus the total net inflow of the record, which
+    a reservoir starting at S_min can never fill. Reliability grows with K
+    when every capacity starts from the same storage (S0=None: S_min); see
+    reliability_curves for `cycles`. Bisection stops when the bracket is
+    narrower than atol. Returns YieldCurves.
+    """
+    scales = np.atleast_1d(np.asarray(scales, dtype=np.float64))
+    D = [np.asarray(d, dtype=np.float64) for d in (D_u, D_irr, D_hydro)]
+    full_yield = sequent_peak(I, O, scales[:, None] * (D[0] + D[1] + D[2]))
+    if K_max is None:
+        inflow = cycles * np.sum(np.maximum(np.asarray(I, dtype=np.float64) - O, 0.0))
+        K_max = np.where(np.isfinite(full_yield), full_yield, inflow) + S_min
+    K_max = np.broadcast_to(np.asarray(K_max, dtype=np.float64), scales.shape)
+
+    # One row per (class, scaling)
+    index = [DEMAND_CLASSES.index(c) for c in classes]
+    rows_class = np.repeat(index, len(scales))
+    rows_scale = np.tile(scales, len(index))
+    lo = np.full(len(rows_class), float(S_min))
+    hi = np.tile(K_max, len(index)).copy()
+    demands = [rows_scale[:, None] * d for d in D]
+    rows = np.arange(len(rows_class))
+
+    def reliability(K):
+        return _reliability(I, O, demands, K, S0, S_min, cycles, tol)[rows_class, rows]
+
+    reached = reliability(hi) >= target
+    for _ in range(max_iter):
+        if np.all(hi - lo <= atol):
+            break
+        mid = 0.5 * (lo + hi)
+        ok = reliability(mid) >= target
+        hi = np.where(ok, mid, hi)
+        lo = np.where(ok, lo, mid)
+    K = np.where(reached, hi, np.nan).reshape(len(index), len(scales))
+    return YieldCurves(target, scales, {c: K[j] for j, c in enumerate(classes)}, full_yield)
@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+"""
+Solver backends shared by models 1-5
+
+Any formulation (a PuLP problem of the scripts or of formulations.py, or a
+LinearProgram of matrix.py / joint.py) can be solved by:
+
+    "cbc"    CBC, bundled with PuLP
+    "highs"  HiGHS through its own Python interface (highspy)
+    "scipy"  HiGHS through scipy.optimize.linprog / milp
+
+with the same options: time_limit (seconds), mip_gap (relative MIP gap) and
+threads. Problems are handed over in the backend's native form: PuLP
+problems go to CBC as they are, and are turned into sparse arrays for the
+other two; LinearPrograms go to HiGHS as they are, and are turned into a
+PuLP problem for CBC. Solver logs are written to a temporary file and kept
+in the returned record instead of being printed.
+
+Every solve returns a SolveRun: backend, status, solve time, iterations,
+branch-and-bound nodes and the log, so backends can be compared per
+formulation (compare_backends).
+"""
+
+import os
+import re
+import tempfile
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from scipy import sparse
+
+BACKENDS = ("cbc", "highs", "scipy")
+
+# HiGHS status codes of scipy.optimize.linprog / milp, as PuLP names them
+SCIPY_STATUS = {0: "Optimal", 1: "Not Solved", 2: "Infeasible", 3: "Unbounded", 4: "Not Solved"}
+
+
+@dataclass
+class SolveRun:
+    """Outcome of one solver call."""
+    backend: str
+    status: str  # As PuLP names it: "Optimal", "Infeasible", ...
+    x: np.ndarray  # Variable values, in the order of the matrix form (NaN unless optimal)
+    solve_time: float  # Seconds, including the conversion into the backend's input
+    iterations: int = None  # Simplex / interior point iterations, if the backend reports them
+    nodes: int = None  # Branch-and-bound nodes of a MIP, if the backend reports them
+    log: str = ""  # Solver output
+
+
+@dataclass
+class MatrixForm:
+    """optimize c @ x + c0 subject to A_ub @ x <= b_ub, A_eq @ x == b_eq, lb <= x <= ub."""
+    maximize: bool
+    c: np.ndarray
+    c0: float
+    A_ub: sparse.csr_matrix
+    b_ub: np.ndarray
+    A_eq: sparse.csr_matrix
+    b_eq: np.ndarray
+    lb: np.ndarray
+    ub: np.ndarray
+    integrality: np.ndarray  # 1 for integer variables
+
+
+def matrix_form(problem):
+    """Sparse arrays of a PuLP problem, with the variables in the order of problem.variables()."""
+    import pulp
+
+    variables = problem.variables()
+    index = {v.name: j for j, v in enumerate(variables)}
+    n = len(variables)
+    c = np.zeros(n)
+    objective = problem.objective if problem.objective is not None else pulp.LpAffineExpression()
+    for v, a in objective.items():
+        c[index[v.name]] = a
+    rows = {"ub": ([], [], [], []), "eq": ([], [], [], [])}  # row, column, value; rhs
+    for constraint in problem.constraints.values():
+        kind = "eq" if constraint.sense == pulp.LpConstraintEQ else "ub"
+        sign = -1.0 if constraint.sense == pulp.LpConstraintGE else 1.0  # ">=" rows are negated
+        r, j, a, b = rows[kind]
+        k = len(b)
+        for v, coef in constraint.items():
+            r.append(k)
+            j.append(index[v.name])
+            a.append(sign * coef)
+        b.append(-sign * constraint.constant)
+
+    def matrix(kind):
+        r, j, a, b = rows[kind]
+        return sparse.csr_matrix((a, (r, j)), shape=(len(b), n)), np.array(b, dtype=np.float64)
+
+    A_ub, b_ub = matrix("ub")
+    A_eq, b_eq = matrix("eq")
+    lb = np.array([-np.inf if v.lowBound is None else v.lowBound for v in variables], dtype=np.float64)
+    ub = np.array([np.inf if v.upBound is None else v.upBound for v in variables], dtype=np.float64)
+    integrality = np.array([v.cat == pulp.LpInteger for v in variables], dtype=np.uint8)
+    return MatrixForm(problem.sense == pulp.LpMaximize, c, float(objective.constant), A_ub, b_ub, A_eq, b_eq,
+                      lb, ub, integrality)
+
+
+def _pulp_problem(form):
+    # A PuLP problem with one variable x<j> per column of a matrix form
+    import pulp
+
+    problem = pulp.LpProblem("Reservoir_Optimization", pulp.LpMaximize if form.maximize else pulp.LpMinimize)
+    x = [pulp.LpVariable(f"x{j}", None if lb == -np.inf else lb, None if ub == np.inf else ub,
+                         pulp.LpInteger if integer else pulp.LpContinuous)
+         for j, (lb, ub, integer) in enumerate(zip(form.lb, form.ub, form.integrality))]
+    problem += pulp.LpAffineExpression([(x[j], a) for j, a in enumerate(form.c) if a], constant=form.c0)
+    for A, b, sense in ((form.A_ub, form.b_ub, pulp.LpConstraintLE), (form.A_eq, form.b_eq, pulp.LpConstraintEQ)):
+        A = sparse.csr_matrix(A)
+        for i in range(A.shape[0]):
+            s = slice(A.indptr[i], A.indptr[i + 1])
+            expr = pulp.LpAffineExpression(zip((x[j] for j in A.indices[s]), A.data[s]))
+            problem += pulp.LpConstraint(expr, sense=sense, name=f"r{i}_{sense + 1}", rhs=float(b[i]))
+    return problem, x
+
+
+def _read_log(path):
+    try:
+        with open(path, errors="replace") as f:
+            return f.read()
+    except OSError:
+        return ""
+
+
+def _cbc(problem, time_limit, mip_gap, threads, warm_start):
+    # CBC on a PuLP problem; the solution stays on the problem's variables
+    import pulp
+
+    fd, path = tempfile.mkstemp(suffix=".log")
+    os.close(fd)
+    try:
+        solver = pulp.PULP_CBC_CMD(msg=False, logPath=path, timeLimit=time_limit, gapRel=mip_gap, threads=threads,
+                                   warmStart=warm_start)
+        problem.solve(solver)
+        log = _read_log(path)
+    finally:
+        os.remove(path)
+    match = re.search(r"Total iterations:\s*(\d+)", log) or re.search(r"(\d+) iterations", log)
+    nodes = re.search(r"Enumerated nodes:\s*(\d+)", log)
+    return (pulp.LpStatus[problem.status], int(match.group(1)) if match else None,
+            int(nodes.group(1)) if nodes else None, log)
+
+
+def _scipy(form, time_limit, mip_gap, threads):
+    # HiGHS through SciPy (threads is not an option of linprog / milp)
+    from scipy.optimize import Bounds, LinearConstraint, linprog, milp
+
+    c = -form.c if form.maximize else form.c
+    options = {}
+    if time_limit is not None:
+        options["time_limit"] = time_limit
+    if form.integrality.any():
+        if mip_gap is not None:
+            options["mip_rel_gap"] = mip_gap
+        constraints = [LinearConstraint(form.A_ub, -np.inf, form.b_ub),
+                       LinearConstraint(form.A_eq, form.b_eq, form.b_eq)]
+        res = milp(c, constraints=[con for con in constraints if con.A.shape[0]],
+                   integrality=form.integrality, bounds=Bounds(form.lb, form.ub), options=options)
+    else:
+        res = linprog(c, A_ub=form.A_ub if form.A_ub.shape[0] else None,
+                      b_ub=form.b_ub if form.A_ub.shape[0] else None,
+                      A_eq=form.A_eq if form.A_eq.shape[0] else None,
+                      b_eq=form.b_eq if form.A_eq.shape[0] else None,
+                      bounds=np.column_stack([form.lb, form.ub]), method="highs", options=options)
+    status = SCIPY_STATUS.get(res.status, "Undefined")
+    x = np.asarray(res.x) if status == "Optimal" else None
+    nodes = getattr(res, "mip_node_count", None) if form.integrality.any() else None
+    return status, x, getattr(res, "nit", None), nodes, res.message
+
+
+def _import_highspy():
+    try:
+        import highspy
+    except ImportError as exc:
+        raise ImportError('the "highs" backend requires the highspy package') from exc
+    return highspy
+
+
+def _highs_lp(highspy, form):
+    # A HighsLp of a matrix form, with the rows of A_ub and A_eq as one row-bounded matrix
+    A = sparse.vstack([form.A_ub, form.A_eq]).tocsc()
+    lp = highspy.HighsLp()
+    lp.num_col_, lp.num_row_ = A.shape[1], A.shape[0]
+    lp.sense_ = highspy.ObjSense.kMaximize if form.maximize else highspy.ObjSense.kMinimize
+    lp.offset_ = float(form.c0)
+    lp.col_cost_ = np.asarray(form.c, dtype=np.float64)
+    lp.col_lower_ = np.asarray(form.lb, dtype=np.float64)
+    lp.col_upper_ = np.asarray(form.ub, dtype=np.float64)
+    lp.row_lower_, lp.row_upper_ = _highs_row_bounds(highspy, form)
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+    lp.a_matrix_.start_ = A.indptr
+    lp.a_matrix_.index_ = A.indices
+    lp.a_matrix_.value_ = A.data
+    if form.integrality.any():
+        lp.integrality_ = [highspy.HighsVarType.kInteger if i else highspy.HighsVarType.kContinuous
+                           for i in form.integrality]
+    return lp
+
+
+def _highs_row_bounds(highspy, form):
+    lower = np.concatenate([np.full(len(form.b_ub), -highspy.kHighsInf), form.b_eq])
+    upper = np.concatenate([form.b_ub, form.b_eq])
+    return lower, upper
+
+
+def _highs_status(highspy, h):
+    names = {highspy.HighsModelStatus.kOptimal: "Optimal", highspy.HighsModelStatus.kInfeasible: "Infeasible",
+             highspy.HighsModelStatus.kUnboundedOrInfeasible: "Infeasible",
+             highspy.HighsModelStatus.kUnbounded: "Unbounded"}
+    return names.get(h.getModelStatus(), "Not Solved")
+
+
+def _highs(form, time_limit, mip_gap, threads):
+    # HiGHS through highspy, on a fresh Highs instance
+    highspy = _import_highspy()
+    lp = _highs_lp(highspy, form)
+    fd, path = tempfile.mkstemp(suffix=".log")
+    os.close(fd)
+    h = highspy.Highs()
+    try:
+        h.setOptionValue("log_to_console", False)
+        h.setOptionValue("log_file", path)
+        for name, value in (("time_limit", time_limit), ("mip_rel_gap", mip_gap), ("threads", threads)):
+            if value is not None:
+                h.setOptionValue(name, float(value) if name != "threads" else int(value))
+        h.passModel(lp)
+        h.run()
+        status = _highs_status(highspy, h)
+        info = h.getInfo()
+        x = np.asarray(h.getSolution().col_value) if status == "Optimal" else None
+        h.setOptionValue("log_file", "")  # Close the log before reading it
+        log = _read_log(path)
+    finally:
+        os.remove(path)
+    iterations = info.simplex_iteration_count + max(info.ipm_iteration_count, 0)
+    nodes = info.mip_node_count if form.integrality.any() else None
+    return status, x, iterations, nodes, log
+
+
+class HighsModel:
+    """A LinearProgram kept loaded in one highspy Highs instance, for repeated solves.
+
+    update() changes the program's parameters as LinearProgram.update does
+    and passes only the new right-hand sides (row bounds) and objective
+    constant to HiGHS, which keeps the optimal basis of the previous solve:
+    the next solve() restarts the dual simplex from it instead of from
+    scratch. If the update changes the structure of the program, the model
+    is passed to HiGHS again. time_limit (seconds) and threads apply to every
+    solve; nothing is logged.
+    """
+
+    def __init__(self, lp, time_limit=None, threads=None):
+        self.highspy = _import_highspy()
+        self.lp = lp
+        self.h = self.highspy.Highs()
+        self.h.setOptionValue("output_flag", False)
+        for name, value in (("time_limit", time_limit), ("threads", threads)):
+            if value is not None:
+                self.h.setOptionValue(name, float(value) if name != "threads" else int(value))
+        self._pass()
+
+    def _pass(self):
+        self.h.passModel(_highs_lp(self.highspy, self.lp))
+        self.A_ub, self.A_eq = self.lp.A_ub, self.lp.A_eq
+
+    @property
+    def build_time(self):
+        return self.lp.build_time
+
+    def update(self, **params):
+        start = time.perf_counter()
+        self.lp.update(**params)
+        if self.lp.A_ub is not self.A_ub or self.lp.A_eq is not self.A_eq:
+            self._pass()  # Structure changed: the program was assembled again
+        else:
+            lower, upper = _highs_row_bounds(self.highspy, self.lp)
+            self.h.changeRowsBounds(len(lower), np.arange(len(lower), dtype=np.int32), lower, upper)
+            self.h.changeObjectiveOffset(float(self.lp.c0))
+        self.lp.build_time = time.perf_counter() - start
+        return self
+
+    def solve(self):
+        """Solve from the kept basis and return a SolveResult."""
+        from .results import SolveResult
+
+        start = time.perf_counter()
+        self.h.run()
+        status = _highs_status(self.highspy, self.h)
+        x = np.asarray(self.h.getSolution().col_value) if status == "Optimal" else np.full(self.lp.n_vars, np.nan)
+        iterations = self.h.getInfo().simplex_iteration_count
+        if status != "Optimal":
+            self.h.clearSolver()  # No basis worth keeping: the next solve starts from scratch
+        solve_time = time.perf_counter() - start
+        objective = float(self.lp.c @ x + self.lp.c0) if status == "Optimal" else None
+        return SolveResult(self.lp.name, status, objective, self.lp.split(x), self.lp.build_time, solve_time,
+                           "highs", iterations)
+
+
+def solve_form(form, backend="scipy", time_limit=None, mip_gap=None, threads=None):
+    """Solve a matrix form (a MatrixForm, LinearProgram or NetworkProgram) and return a SolveRun."""
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend {backend!r}, expected one of {BACKENDS}")
+    start = time.perf_counter()
+    if backend == "cbc":
+        problem, variables = _pulp_problem(form)
+        status, iterations, nodes, log = _cbc(problem, time_limit, mip_gap, threads, False)
+        x = np.array([np.nan if v.varValue is None else v.varValue for v in variables], dtype=np.float64)
+    else:
+        solver = _highs if backend == "highs" else _scipy
+        status, x, iterations, nodes, log = solver(form, time_limit, mip_gap, threads)
+    if status != "Optimal" or x is None:
+        x = np.full(len(form.c), np.nan)
+    return SolveRun(backend, status, x, time.perf_counter() - start, iterations, nodes, log)
+
+
+def solve_problem(problem, backend="cbc", time_limit=None, mip_gap=None, threads=None, warm_start=False):
+    """Solve a PuLP problem with any backend and return a SolveRun.
+
+    As with problem.solve(), the status and the solution are stored on the
+    problem and its variables, so pulp.value() and varValue read them.
+    warm_start passes the current variable values to CBC.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend {backend!r}, expected one of {BACKENDS}")
+    import pulp
+
+    start = time.perf_counter()
+    if backend == "cbc":
+        status, iterations, nodes, log = _cbc(problem, time_limit, mip_gap, threads, warm_start)
+        variables = problem.variables()
+        x = np.array([np.nan if v.varValue is None else v.varValue for v in variables], dtype=np.float64)
+        return SolveRun(backend, status, x, time.perf_counter() - start, iterations, nodes, log)
+    form = matrix_form(problem)
+    run = solve_form(form, backend, time_limit, mip_gap, threads)
+    codes = {name: code for code, name in pulp.LpStatus.items()}
+    problem.assignStatus(codes.get(run.status, pulp.LpStatusUndefined))
+    for v, value in zip(problem.variables(), run.x):
+        v.varValue = None if np.isnan(value) else float(value)
+    run.solve_time = time.perf_counter() - start
+    return run
+
+
+def compare_backends(model, backends=BACKENDS, repeats=1, **options):
+    """Solve a model (ReservoirModel or LinearProgram) with each backend; one record per solve.
+
+    options are passed to model.solve (time_limit, mip_gap, threads).
+    Backends that cannot be imported are recorded with the status "Error".
+    Returns a list of dicts: backend, repeat, status, objective, build_time,
+    solve_time, iterations, nodes.
+    """
+    records = []
+    for backend in backends:
+        for repeat in range(repeats):
+            try:
+                result = model.solve(backend=backend, **options)
+            except ImportError:
+                records.append(dict(backend=backend, repeat=repeat, status="Error", objective=None,
+                                    build_time=model.build_time, solve_time=np.nan, iterations=None, nodes=None))
+                break
+            records.append(dict(backend=backend, repeat=repeat, status=result.status, objective=result.objective,
+                                build_time=result.build_time, solve_time=result.solve_time,
+                                iterations=result.iterations, nodes=result.nodes))
+    return records
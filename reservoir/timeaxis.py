@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Time axis shared by the simulation and the optimization models
+
+A TimeAxis is a sequence of monthly, weekly, daily or hourly steps starting
+at a calendar date. It knows the calendar month of every step, so seasonal
+rules (e.g. the June-August irrigation rule of models 2 and 3) and monthly
+input data can be mapped onto horizons of any length.
+"""
+
+import numpy as np
+
+FREQUENCIES = ("monthly", "weekly", "daily", "hourly")
+METHODS = ("step", "linear")
+
+
+class TimeAxis:
+    """Monthly, weekly, daily or hourly time steps from a start date."""
+
+    def __init__(self, n_steps, freq="monthly", start="2000-01-01"):
+        if freq not in FREQUENCIES:
+            raise ValueError(f"freq must be one of {FREQUENCIES}, got {freq!r}")
+        self.n_steps = int(n_steps)
+        self.freq = freq
+        self.start = np.datetime64(start, "D")
+
+        # Step boundaries as calendar days, or hours (n_steps + 1 edges)
+        k = np.arange(self.n_steps + 1)
+        if freq == "monthly":
+            self.edges = (self.start.astype("datetime64[M]") + k).astype("datetime64[D]")
+        elif freq == "hourly":
+            self.edges = self.start.astype("datetime64[h]") + k
+        else:
+            self.edges = self.start + k * (7 if freq == "weekly" else 1)
+
+        # Each step belongs to the calendar month it starts in
+        first = self.edges[:-1].astype("datetime64[M]")
+        self.days = np.diff(self.edges) / np.timedelta64(1, "D")  # Length of each step in days
+        self.month = first.astype(np.int64) % 12 + 1  # Calendar month 1-12
+        self.year = first.astype("datetime64[Y]").astype(np.int64) + 1970
+        self.month_index = (first - self.start.astype("datetime64[M]")).astype(np.int64)  # 0, 1, 2, ...
+        self._month_days = ((first + 1).astype("datetime64[D]") - first.astype("datetime64[D]")).astype(np.float64)
+
+    @classmethod
+    def years(cls, n_years, freq="monthly", start="2000-01-01"):
+        """Axis covering n_years calendar years from start."""
+        start = np.datetime64(start, "D")
+        if freq == "monthly":
+            return cls(12 * n_years, freq, start)
+        # Same day of the month, n_years later
+        first_of_month = start.astype("datetime64[M]")
+        end = (first_of_month + 12 * n_years).astype("datetime64[D]") + (start - first_of_month.astype("datetime64[D]"))
+        n_days = int((end - start).astype(np.int64))
+        if freq == "hourly":
+            return cls(24 * n_days, freq, start)
+        return cls(n_days if freq == "daily" else -(-n_days // 7), freq, start)
+
+    def __len__(self):
+        return self.n_steps
+
+    def __repr__(self):
+        return f"TimeAxis(n_steps={self.n_steps}, freq={self.freq!r}, start='{self.start}')"
+
+    @property
+    def steps(self):
+        """Step indices 0 .. n_steps - 1."""
+        return range(self.n_steps)
+
+    @property
+    def n_months(self):
+        """Number of calendar months touched by the axis."""
+        return int(self.month_index[-1]) + 1 if self.n_steps else 0
+
+    def in_months(self, *months):
+        """Boolean mask of the steps falling in the given calendar months."""
+        return np.isin(self.month, months)
+
+    def from_monthly(self, values, kind="volume", method="step"):
+        """Map monthly data onto the steps of the axis, as a float64 array.
+
+        values holds either 12 values (January-December, repeated every year)
+        or one value per month of the axis, along its last axis; leading axes
+        (e.g. one row per trace) are kept. kind="volume" is for quantities
+        accumulated over a step (inflows, demands, evaporation): a month's
+        volume is shared between its steps in proportion to their length (a
+        weekly step takes the month it starts in).
+        kind="level" is for quantities that do not depend on the step length
+        (capacities, prices) and repeats the monthly value unchanged.
+
+        method="linear" interpolates below the monthly step instead: levels,
+        or volumes per day, are interpolated linearly between the middles of
+        the months, and the volumes are then rescaled so that every month
+        keeps its total. Demands and evaporation thus change smoothly from
+        day to day instead of jumping at the first of the month. A monthly
+        axis gets the monthly values either way.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if kind not in ("volume", "level"):
+            raise ValueError(f"kind must be 'volume' or 'level', got {kind!r}")
+        if method not in METHODS:
+            raise ValueError(f"method must be one of {METHODS}, got {method!r}")
+        calendar = values.shape[-1:] == (12,)
+        if calendar:
+            per_step = values[..., self.month - 1]
+        elif values.shape[-1:] == (self.n_months,):
+            per_step = values[..., self.month_index]
+        else:
+            raise ValueError(f"expected 12 or {self.n_months} monthly values, got shape {values.shape}")
+        if kind == "volume":
+            per_step = per_step * (self.days / self._month_days)
+        if method == "step" or self.n_steps == 0:
+            return per_step
+
+        # Monthly values with one month of padding at each end (the calendar wraps around,
+        # a series of months repeats its first and last one), per day for volumes
+        months = np.arange(-1, self.n_months + 1)
+        first = self.start.astype("datetime64[M]")
+        if calendar:
+            padded = values[..., (first.astype(np.int64) + months) % 12]
+        else:
+            padded = values[..., np.clip(months, 0, self.n_months - 1)]
+        if kind == "volume":
+            starts = first + months
+            padded = padded / ((starts + 1).astype("datetime64[D]") - starts.astype("datetime64[D]")).astype(np.float64)
+
+        # Middle of every step, in months from the start of the first month; month m is
+        # centred at m + 0.5, which is entry m + 1 of the padded values
+        month_start = (self.edges[:-1].astype("datetime64[M]").astype(self.edges.dtype) - self.edges[0])
+        middle = (np.asarray(self.edges[:-1] - self.edges[0]) / np.timedelta64(1, "D") + 0.5 * self.days
+                  - month_start / np.timedelta64(1, "D"))
+        position = self.month_index + middle / self._month_days + 0.5
+        left = np.floor(position).astype(np.int64)
+        weight = position - left
+        interpolated = (1 - weight) * padded[..., left] + weight * padded[..., left + 1]
+        if kind == "level":
+            return interpolated
+
+        # Rescale the steps of each month to the month's volume
+        interpolated = interpolated * self.days
+        month_first = np.flatnonzero(np.diff(self.month_index, prepend=-1))
+        target = np.add.reduceat(per_step, month_first, axis=-1)
+        total = np.add.reduceat(interpolated, month_first, axis=-1)
+        scale = np.divide(target, total, out=np.ones_like(total), where=total != 0)
+        counts = np.diff(np.append(month_first, self.n_steps))
+        scaled = interpolated * np.repeat(scale, counts, axis=-1)
+        return np.where(np.repeat(total != 0, counts, axis=-1), scaled, per_step)